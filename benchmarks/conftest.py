@@ -0,0 +1,58 @@
+"""Fixtures for the savantaudio benchmarks.
+
+The benchmarks run the integration inside a test Home Assistant instance
+against the simulated switch from tests/simulator.py.  Every benchmark adds
+its numbers to a report that is written as JSON at the end of the session,
+to the file given by --bench-output (bench_output.json by default).
+"""
+from __future__ import annotations
+
+import json
+import platform
+import time
+
+import pytest
+
+from tests.simulator import SimulatorConfig, SwitchSimulator
+
+from .util import BenchmarkReport
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+# round trip time of the simulated switch, in seconds
+LATENCY = 0.002
+
+
+def pytest_addoption(parser):
+    """Add the benchmark options."""
+    parser.addoption(
+        "--bench-output",
+        default="bench_output.json",
+        help="file the benchmark results are written to",
+    )
+
+
+@pytest.fixture(scope="session")
+def report(request):
+    """Collect the results of all benchmarks and write them out."""
+    report = BenchmarkReport()
+    yield report
+    with open(request.config.getoption("--bench-output"), "w") as file:
+        json.dump(
+            {
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "python": platform.python_version(),
+                "simulator_latency": LATENCY,
+                "results": report.results,
+            },
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+
+
+@pytest.fixture(name="simulator")
+async def simulator_fixture(socket_enabled):
+    """Run a simulated switch with a realistic round trip time."""
+    async with SwitchSimulator(SimulatorConfig(latency=LATENCY)) as simulator:
+        yield simulator
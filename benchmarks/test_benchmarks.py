@@ -0,0 +1,161 @@
+"""Benchmarks for the savantaudio integration.
+
+Run with ``python -m pytest benchmarks --no-cov``; see conftest.py for the
+report this produces.
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+from homeassistant.components.media_player import (
+    ATTR_GROUP_MEMBERS,
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    DOMAIN as MP_DOMAIN,
+    SERVICE_JOIN,
+    SERVICE_SELECT_SOURCE,
+)
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    EVENT_STATE_CHANGED,
+    SERVICE_VOLUME_SET,
+)
+import pytest
+
+from custom_components.savantaudio.const import DOMAIN, ENTRY_DATA
+from custom_components.savantaudio.metrics import POLL
+
+from .util import LoopMonitor, setup_entry
+
+ITERATIONS = 50
+ZONES = 20
+
+
+@pytest.mark.parametrize("zones", [1, 10, 20])
+async def test_setup_time(hass, enable_custom_integrations, simulator, report, zones):
+    """Wall time and round trips to set up an entry."""
+    monitor = LoopMonitor()
+    monitor.start()
+    elapsed = await setup_entry(hass, simulator.host, simulator.port, zones)
+    report.add(
+        f"setup_{zones}_zones",
+        wall_ms=elapsed * 1000,
+        commands=len(simulator.commands),
+        **await monitor.stop(),
+    )
+
+
+async def test_poll_cycle(hass, enable_custom_integrations, simulator, report):
+    """Round trips and wall time of one coordinator refresh."""
+    await setup_entry(hass, simulator.host, simulator.port, ZONES)
+    coordinator = hass.data[DOMAIN][ENTRY_DATA][f"bench{ZONES}"].coordinator
+
+    samples = []
+    simulator.reset_stats()
+    exchanges = _exchanges(coordinator.switch)
+    monitor = LoopMonitor()
+    monitor.start()
+    for _ in range(ITERATIONS // 5):
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        samples.append(time.perf_counter() - start)
+    loop = await monitor.stop()
+
+    report.add_timings(
+        "poll_cycle",
+        samples,
+        zones=ZONES,
+        round_trips=(_exchanges(coordinator.switch) - exchanges) / len(samples),
+        commands=len(simulator.commands) / len(samples),
+        command_counts=dict(simulator.command_counts),
+        **loop,
+    )
+
+
+def _exchanges(switch) -> int:
+    """Return the number of request/reply exchanges (commands or batches) so far."""
+    return sum(
+        histogram.count
+        for operation, histogram in switch.metrics.latency.items()
+        if operation != POLL
+    )
+
+
+async def _time_service(hass, entity_ids, service, make_data):
+    """Time service calls until the first state write and until they return."""
+    written: dict[str, float] = {}
+
+    def _state_changed(event):
+        if event.data[ATTR_ENTITY_ID] in entity_ids:
+            written.setdefault(event.data[ATTR_ENTITY_ID], time.perf_counter())
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _state_changed)
+    to_state, to_return = [], []
+    monitor = LoopMonitor()
+    monitor.start()
+    try:
+        for i in range(ITERATIONS):
+            written.clear()
+            start = time.perf_counter()
+            await hass.services.async_call(MP_DOMAIN, service, make_data(i), blocking=True)
+            to_return.append(time.perf_counter() - start)
+            # the last member to be written is the one the user waits for
+            if written:
+                to_state.append(max(written.values()) - start)
+            await hass.async_block_till_done()
+    finally:
+        unsub()
+    return to_state, to_return, await monitor.stop()
+
+
+@pytest.mark.parametrize(
+    ("service", "make_data"),
+    [
+        (
+            SERVICE_SELECT_SOURCE,
+            lambda i: {
+                ATTR_ENTITY_ID: "media_player.savant_zone_1",
+                ATTR_INPUT_SOURCE: f"Source {i % 8 + 1}",
+            },
+        ),
+        (
+            SERVICE_VOLUME_SET,
+            lambda i: {
+                ATTR_ENTITY_ID: "media_player.savant_zone_1",
+                ATTR_MEDIA_VOLUME_LEVEL: (i % 38) / 38,
+            },
+        ),
+        (
+            SERVICE_JOIN,
+            lambda i: {
+                ATTR_ENTITY_ID: f"media_player.savant_zone_{i % 2 + 1}",
+                ATTR_GROUP_MEMBERS: [
+                    f"media_player.savant_zone_{number}" for number in range(3, ZONES + 1)
+                ],
+            },
+        ),
+    ],
+)
+async def test_service_latency(
+    hass, enable_custom_integrations, simulator, report, service, make_data
+):
+    """Latency from a service call to the state write, per service."""
+    # all zones play, and the join leaders have different sources
+    simulator.links.update({number: 1 for number in range(1, ZONES + 1)})
+    simulator.links[2] = 2
+    await setup_entry(hass, simulator.host, simulator.port, ZONES)
+    entity_ids = {f"media_player.savant_zone_{number}" for number in range(1, ZONES + 1)}
+
+    simulator.reset_stats()
+    to_state, to_return, loop = await _time_service(hass, entity_ids, service, make_data)
+    report.add_timings(f"{service}_to_state", to_state)
+    report.add_timings(
+        f"{service}_to_return",
+        to_return,
+        commands=len(simulator.commands) / ITERATIONS,
+        **loop,
+    )
+    # let coalesced writes settle before the entry is torn down
+    await asyncio.sleep(0.5)
+    await hass.async_block_till_done()
@@ -0,0 +1,129 @@
+"""Helpers for the savantaudio benchmarks."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterable
+import statistics
+import time
+from typing import Any
+
+from homeassistant.const import CONF_ENABLED, CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.savantaudio.const import (
+    CONF_NUMBER,
+    CONF_SOURCES,
+    CONF_ZONES,
+    DEFAULT_SOURCE,
+    DOMAIN,
+)
+
+
+class BenchmarkReport:
+    """Results of a benchmark session, keyed by benchmark name."""
+
+    def __init__(self) -> None:
+        """Initialize the report."""
+        self.results: dict[str, dict[str, Any]] = {}
+
+    def add(self, name: str, **values: Any) -> None:
+        """Record the values of one benchmark."""
+        self.results.setdefault(name, {}).update(values)
+
+    def add_timings(self, name: str, samples: Iterable[float], **values: Any) -> None:
+        """Record the distribution of timings in seconds, as milliseconds."""
+        samples = sorted(samples)
+        self.add(
+            name,
+            samples=len(samples),
+            p50_ms=percentile(samples, 50) * 1000,
+            p99_ms=percentile(samples, 99) * 1000,
+            mean_ms=statistics.fmean(samples) * 1000,
+            max_ms=samples[-1] * 1000,
+            **values,
+        )
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Return a percentile of sorted samples (nearest rank)."""
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples) + 0.5) - 1))
+    return samples[rank]
+
+
+class LoopMonitor:
+    """Measure how long the event loop is blocked.
+
+    A probe sleeps for a fixed interval over and over; whatever it oversleeps
+    is time in which the loop ran something else without yielding.
+    """
+
+    def __init__(self, interval: float = 0.001) -> None:
+        """Initialize the monitor."""
+        self._interval = interval
+        self._task: asyncio.Task | None = None
+        self.lags: list[float] = []
+
+    async def _probe(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self.lags.append(max(0.0, time.perf_counter() - start - self._interval))
+
+    def start(self) -> None:
+        """Start measuring."""
+        self.lags.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    async def stop(self) -> dict[str, float]:
+        """Stop measuring and return a summary in milliseconds."""
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        lags = sorted(self.lags) or [0.0]
+        return {
+            "loop_lag_p99_ms": percentile(lags, 99) * 1000,
+            "loop_lag_max_ms": lags[-1] * 1000,
+            "loop_blocked_ms": sum(lag for lag in lags if lag > self._interval) * 1000,
+        }
+
+
+def entry_config(host: str, port: int, zones: int) -> dict[str, Any]:
+    """Return an entry config with zones on outputs 1..zones."""
+    return {
+        CONF_HOST: host,
+        CONF_PORT: port,
+        CONF_NAME: "Savant",
+        CONF_SOURCES: {
+            str(number): {CONF_NAME: f"Source {number}", CONF_ENABLED: True}
+            for number in range(1, 9)
+        },
+        CONF_ZONES: {
+            f"savant_zone_{number}": {
+                CONF_NUMBER: number,
+                CONF_NAME: f"Zone {number}",
+                CONF_ENABLED: True,
+                DEFAULT_SOURCE: 1,
+            }
+            for number in range(1, zones + 1)
+        },
+    }
+
+
+async def setup_entry(hass: HomeAssistant, host: str, port: int, zones: int) -> float:
+    """Set up an entry with the given number of zones; return the wall time."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=entry_config(host, port, zones),
+        entry_id=f"bench{zones}",
+        unique_id=f"sn=bench{zones}",
+    )
+    config_entry.add_to_hass(hass)
+    start = time.perf_counter()
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    elapsed = time.perf_counter() - start
+    assert hass.states.get(f"media_player.savant_zone_{zones}") is not None
+    return elapsed
@@ -1,22 +1,51 @@
 """Support for Savant Audio Switches (SSA-3220)."""
 import asyncio
-import datetime
 import logging
 
 from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
-import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
 
-from .const import CONF_SOURCES, CONF_ZONES, DOMAIN, PLATFORMS, STARTUP_MESSAGE
+from .const import (
+    CONF_TIE_LINES,
+    DEFAULT_PORT,
+    DOMAIN,
+    ENTRY_DATA,
+    KNOWN_HOSTS,
+    PLATFORMS,
+    STARTUP_MESSAGE,
+    TIE_LINES,
+)
+from .cache import SwitchCache
+from .connection import async_get_registry
+from .coordinator import SavantAudioCoordinator
+from .media_player import async_apply_options, command_rate, timeouts, trace_size
+from .models import SavantAudioEntryData
+from .routing import TIE_LINE_SCHEMA, TieLineMap
+from .services import async_setup_services
 
 _LOGGER = logging.getLogger(__name__)
 
+# the switches themselves are set up through config entries; the yaml
+# configuration of the domain only describes how they are cascaded
+CONFIG_SCHEMA = vol.Schema(
+    {
+        DOMAIN: vol.Schema(
+            {vol.Optional(CONF_TIE_LINES, default=[]): [TIE_LINE_SCHEMA]},
+            extra=vol.ALLOW_EXTRA,
+        )
+    },
+    extra=vol.ALLOW_EXTRA,
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant, entry: ConfigEntry
 ) -> bool:
     """Set up platform from a ConfigEntry."""
-    _LOGGER.info(f'async_setup_entry: {DOMAIN}')
+    _LOGGER.debug("async_setup_entry: %s", DOMAIN)
     if hass.data.get(DOMAIN) is None:
         hass.data.setdefault(DOMAIN, {})
         _LOGGER.info(STARTUP_MESSAGE)
@@ -26,20 +55,78 @@ async def async_setup_entry(
     if entry.options:
         config.update(entry.options)
 
-    hass.data[DOMAIN][entry.entry_id] = config
-    entry.async_on_unload(entry.add_update_listener(update_listener))
+    host = config[CONF_HOST]
+    port = config.get(CONF_PORT, DEFAULT_PORT)
+
+    # with a cached copy of the switch the entities are created right away
+    # and the switch is only contacted in the background
+    cache = SwitchCache(hass, entry.entry_id)
+    cached = await cache.async_load()
+    registry = async_get_registry(hass)
+    try:
+        switch = await registry.async_acquire(
+            host, port, connect=cached is None, timeouts=timeouts(config)
+        )
+    except (OSError, ValueError) as err:
+        # only this entry is retried; other switches are not held up
+        raise ConfigEntryNotReady(
+            f"Unable to connect to switch at {host}:{port}: {err}"
+        ) from err
+
+    coordinator = None
+    try:
+        switch.timeouts = timeouts(config)
+        switch.scheduler.set_rate(*command_rate(config))
+        switch.async_set_trace(trace_size(config))
+        coordinator = SavantAudioCoordinator(hass, switch, config[CONF_NAME], cache)
+        coordinator.supervisor.async_start()
+        if switch.loaded:
+            # the initial connect already read all outputs and links
+            coordinator.async_set_updated_data(switch.state)
+            cache.async_save(switch)
+        else:
+            await switch.async_restore(cached)
+            coordinator.data = switch.state
+            coordinator.last_update_success = False
+            entry.async_create_background_task(
+                hass, coordinator.async_load(), f"{DOMAIN} connect {host}:{port}"
+            )
+
+        coordinator.async_update_device()
+
+        sn = switch.attributes["sn"]
+        hass.data[DOMAIN].setdefault(ENTRY_DATA, {})[entry.entry_id] = SavantAudioEntryData(
+            coordinator
+        )
+        hass.data[DOMAIN].setdefault(KNOWN_HOSTS, {})[sn] = switch
+        hass.data[DOMAIN][entry.entry_id] = config
+        entry.async_on_unload(entry.add_update_listener(update_listener))
 
-    # Forward the setup to the media_player platform.
-    for platform in PLATFORMS:
-        await hass.config_entries.async_forward_entry_setups(entry, [platform])
+        # Forward the setup to the media_player platform.
+        for platform in PLATFORMS:
+            await hass.config_entries.async_forward_entry_setups(entry, [platform])
+    except Exception:
+        # release the switch, or its connection stays open until restart
+        if coordinator is not None:
+            coordinator.dispatcher.async_stop()
+            coordinator.coalescer.async_cancel()
+            coordinator.supervisor.async_stop()
+        hass.data[DOMAIN].get(ENTRY_DATA, {}).pop(entry.entry_id, None)
+        hass.data[DOMAIN].pop(entry.entry_id, None)
+        known_hosts = hass.data[DOMAIN].get(KNOWN_HOSTS, {})
+        if known_hosts.get(switch.attributes.get("sn")) is switch:
+            del known_hosts[switch.attributes["sn"]]
+        registry.async_release(switch)
+        raise
     return True
 
+
 async def async_unload_entry(
     hass: HomeAssistant, 
     entry: ConfigEntry
 ) -> bool:
     """Unload a config entry."""
-    _LOGGER.info(f'async_unload_entry: {DOMAIN}')
+    _LOGGER.debug("async_unload_entry: %s", DOMAIN)
     unload_ok = all(
         await asyncio.gather(
             *[hass.config_entries.async_forward_entry_unload(entry, platform)
@@ -50,20 +137,49 @@ async def async_unload_entry(
     # Remove config entry from domain.
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        entry_data = hass.data[DOMAIN].get(ENTRY_DATA, {}).pop(entry.entry_id, None)
+        if entry_data is not None:
+            switch = entry_data.coordinator.switch
+            known_hosts = hass.data[DOMAIN].get(KNOWN_HOSTS, {})
+            if known_hosts.get(switch.attributes["sn"]) is switch:
+                del known_hosts[switch.attributes["sn"]]
+            entry_data.coordinator.dispatcher.async_stop()
+            entry_data.coordinator.coalescer.async_cancel()
+            entry_data.coordinator.supervisor.async_stop()
+            async_get_registry(hass).async_release(entry_data.coordinator.switch)
 
     return unload_ok
 
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the cached switch state of a deleted entry."""
+    await SwitchCache(hass, entry.entry_id).async_remove()
+
+
 async def update_listener(hass: HomeAssistant, config_entry: ConfigEntry) -> None:
     """Update listener."""
-    _LOGGER.info(f'update_listener: {DOMAIN}')
+    _LOGGER.debug("update_listener: %s", DOMAIN)
+    config = dict(config_entry.data)
+    if config_entry.options:
+        config.update(config_entry.options)
+
+    if async_apply_options(hass, config_entry, config):
+        hass.data[DOMAIN][config_entry.entry_id] = config
+        return
     await hass.config_entries.async_reload(config_entry.entry_id)
 
+
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Savant component from yaml configuration."""
-    _LOGGER.info(f'async_setup: {DOMAIN}')
+    _LOGGER.debug("async_setup: %s", DOMAIN)
     hass.data.setdefault(DOMAIN, {})
+    hass.data[DOMAIN][TIE_LINES] = TieLineMap.from_config(
+        config.get(DOMAIN, {}).get(CONF_TIE_LINES, [])
+    )
+    async_setup_services(hass)
     return True
 
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Reload config entry."""
     await async_unload_entry(hass, entry)
@@ -0,0 +1,42 @@
+"""Persistent cache of Savant Audio Switch state."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .client import SavantSwitch
+from .const import CACHE_SAVE_DELAY, DOMAIN
+
+STORAGE_VERSION = 1
+
+
+class SwitchCache:
+    """Last known attributes and output state of the switch of an entry.
+
+    Lets the entry create its devices and entities before the switch has
+    answered, so startup does not depend on the switch being reachable.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+
+    async def async_load(self) -> dict[str, Any] | None:
+        """Return the cached switch state, if there is any."""
+        data = await self._store.async_load()
+        if not data or "sn" not in data.get("attributes", {}):
+            return None
+        return data
+
+    @callback
+    def async_save(self, switch: SavantSwitch) -> None:
+        """Save the current switch state a little later."""
+        self._store.async_delay_save(switch.as_dict, CACHE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Remove the cache."""
+        await self._store.async_remove()
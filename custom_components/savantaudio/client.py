@@ -0,0 +1,371 @@
+"""Savant Audio Switch client extensions."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+import logging
+import re
+import time
+from typing import Any, NamedTuple
+
+from homeassistant.core import callback
+import savantaudio.client as sa
+
+from .const import (
+    BATCH_CHUNK,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_REFRESH_TIMEOUT,
+)
+from .dispatcher import SavantAudioDispatcher
+from .exceptions import SwitchTimeoutError
+from .metrics import BATCH, SwitchMetrics, command_operation
+from .scheduler import CommandScheduler, Priority, command_priority, use_priority
+from .state import OutputState, SwitchState
+from .trace import WireTrace
+from .transport import SwitchTransport
+
+_LOGGER = logging.getLogger(__name__)
+
+OUTPUT_REPLY = re.compile(r"aoutput-[a-z\-]+?(\d+):")
+LINK_REPLY = re.compile(r"switch(\d+)\.(\d+)")
+STATE_REPLY = re.compile(r"(?:ainput|aoutput)-[a-z\-]+?\d+:|switch\d+\.\d+|err")
+FWREV_REPLY = re.compile(r"fwrevPrimary; (.*)")
+FPGA_REPLY = re.compile(r"fpga-rev(.*)")
+STATUS_REPLY = re.compile(r"statusAPI1.0; (.*)")
+
+# command of the trace records of notifications pushed by the switch
+PUSH = "(push)"
+
+
+@dataclass
+class OutputChange:
+    """Changes to apply to one output; None leaves a field alone.
+
+    A source of 0 disconnects the output.
+    """
+
+    number: int
+    source: int | None = None
+    volume: int | None = None
+    mute: bool | None = None
+    stereo: bool | None = None
+    passthru: bool | None = None
+
+    def commands(self) -> list[str]:
+        """Return the protocol commands for this change."""
+        commands = []
+        if self.source == 0:
+            commands.append(f"switch-set{self.number}.disconnect")
+        elif self.source is not None:
+            commands.append(f"switch-set{self.number}.{self.source}")
+        if self.volume is not None:
+            if self.volume < -38 or self.volume > 0:
+                raise ValueError(f"Invalid volume level: {self.volume}dB")
+            commands.append(f"aoutput-vol-set{self.number}:{self.volume}dB")
+        if self.mute is not None:
+            commands.append(f"aoutput-mute-set{self.number}:{'on' if self.mute else 'off'}")
+        if self.stereo is not None:
+            commands.append(f"aoutput-mono-set{self.number}:{'off' if self.stereo else 'on'}")
+        if self.passthru is not None:
+            commands.append(
+                f"aoutput-conf-set{self.number}:{'passthru' if self.passthru else 'processed'}"
+            )
+        return commands
+
+
+class Timeouts(NamedTuple):
+    """Deadlines in seconds of the operations on a switch."""
+
+    connect: float = DEFAULT_CONNECT_TIMEOUT
+    command: float = DEFAULT_COMMAND_TIMEOUT
+    refresh: float = DEFAULT_REFRESH_TIMEOUT
+
+
+def output_state(output: sa.Output) -> OutputState:
+    """Return the state of an output."""
+    return OutputState(
+        output.volume,
+        output.mute,
+        output.stereo,
+        output.passthru,
+        tuple(output.delay),
+    )
+
+
+class SavantSwitch(sa.Switch):
+    """Savant switch client that reports output changes as events.
+
+    The stock client only raises 'link-changed' events; output replies update
+    the cached `Output` silently.  This subclass raises 'output-updated'
+    whenever a reply (solicited or not) changes an output.  Every reply is
+    also recorded in `state`, the compact store the zones read from.
+
+    Commands go through a SwitchTransport instead of the stock connection,
+    so several of them can be in flight and notifications the switch pushes
+    are read as they arrive, not only while a command is waiting.
+    """
+
+    def __init__(self, host: str, port: int, model=sa.Model.SSA_3220D) -> None:
+        super().__init__(host, port, model)
+        self._connection = SwitchTransport(host, port, self._async_received)
+        self.metrics = SwitchMetrics()
+        self.state = SwitchState(self._noutputs)
+        # wire-level trace of commands and replies, only kept when enabled
+        self.trace: WireTrace | None = None
+        self.dispatcher = SavantAudioDispatcher(self)
+        self.scheduler = CommandScheduler()
+        self.timeouts = Timeouts()
+        # True once attributes and state were read from the switch itself
+        self.loaded = False
+        # monotonic time of the last line read from the switch
+        self.last_activity = 0.0
+
+    @property
+    def transport(self) -> SwitchTransport:
+        """Return the connection to the switch."""
+        return self._connection
+
+    async def connect(self):
+        async with self._deadline(self.timeouts.connect, "connect"):
+            await super().connect()
+        self.loaded = True
+
+    async def async_open(self) -> None:
+        """Open the connection again, without reading the switch."""
+        async with self._deadline(self.timeouts.connect, "connect"):
+            await self._connection.connect()
+
+    @contextmanager
+    def _timeout(self, seconds: float, what: str) -> Iterator[None]:
+        """Report a timeout of the commands of an operation as SwitchTimeoutError."""
+        try:
+            yield
+        except TimeoutError as err:
+            raise SwitchTimeoutError(
+                f"No reply from switch at {self.host}:{self.port} to {what} within {seconds:g}s"
+            ) from err
+
+    @asynccontextmanager
+    async def _deadline(self, seconds: float, what: str) -> AsyncIterator[None]:
+        """Give up on an operation after `seconds`.
+
+        Commands have deadlines of their own that run from their write, see
+        SwitchTransport; this one bounds an operation as a whole, like
+        connecting.
+        """
+        with self._timeout(seconds, what):
+            async with asyncio.timeout(seconds):
+                yield
+
+    async def refresh(self):
+        """Read the device attributes, then every output and link, pipelined."""
+        # reading the switch is the one time a dropped connection is opened
+        # again by anyone but the connection supervisor
+        await self._connection.connect()
+        replies = await self.async_send_batch(["fwrev", "fpga-rev", "status"])
+        for reply in (line for lines in replies for line in lines):
+            if m := FWREV_REPLY.match(reply):
+                self._attributes["fwrev"] = m.group(1)
+            elif m := FPGA_REPLY.match(reply):
+                self._attributes["fpgarev"] = m.group(1)
+            elif m := STATUS_REPLY.match(reply):
+                self._parse_status(m.group(1))
+        await self.async_read_snapshot(command_priority.get())
+
+    def _parse_status(self, status: str) -> None:
+        # same fields as the stock client reads from the status reply
+        for part in (part.strip() for part in status.split(";")):
+            if part.startswith(("pn", "sn", "rev")):
+                self._attributes[part.split("=", 1)[0]] = part
+            elif part in ("ready=yes", "ready=no"):
+                self._ready = part == "ready=yes"
+            elif part == "Standalone-Audio-Switch-With-Delay":
+                self._model = sa.Model.SSA_3220D
+            elif part == "Standalone-Audio-Switch":
+                self._model = sa.Model.SSA_3220
+
+    async def _async_received(self, line: str, push: bool) -> None:
+        """Apply a line read from the switch, a reply or a notification."""
+        self.last_activity = time.monotonic()
+        if push and self.trace is not None:
+            self.trace.record(PUSH, (line,), time.monotonic())
+        if STATE_REPLY.match(line):
+            await self.parse(line)
+        elif push:
+            _LOGGER.debug("Ignoring %r from %s:%d", line, self.host, self.port)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the device attributes and output state for caching."""
+        return {
+            "attributes": dict(self.attributes),
+            "model": self.model.value,
+            "links": {str(number): source for number, source in self.links.items()},
+            "outputs": {
+                str(output.number): {
+                    "volume": output.volume,
+                    "mute": output.mute,
+                    "stereo": output.stereo,
+                    "passthru": output.passthru,
+                    "delay": list(output.delay),
+                }
+                for output in self.outputs
+            },
+        }
+
+    async def async_restore(self, data: dict[str, Any]) -> None:
+        """Restore state saved by as_dict without talking to the switch.
+
+        The cached state is replayed as switch replies, so it ends up exactly
+        where a refresh would have put it.
+        """
+        self.attributes.update(data["attributes"])
+        self._model = sa.Model(data["model"])
+        for number, source in data["links"].items():
+            await self.parse(f"switch{number}.{source}")
+        for number, output in data["outputs"].items():
+            for reply in (
+                f"aoutput-vol{number}:{output['volume']}dB",
+                f"aoutput-mute{number}:{'on' if output['mute'] else 'off'}",
+                f"aoutput-mono{number}:{'off' if output['stereo'] else 'on'}",
+                f"aoutput-conf{number}:{'passthru' if output['passthru'] else 'processed'}",
+                f"aoutput-delayleft{number}:{output['delay'][0]}ms",
+                f"aoutput-delayright{number}:{output['delay'][1]}ms",
+            ):
+                await self.parse(reply)
+
+    async def async_close(self) -> None:
+        """Close the connection to the switch."""
+        await self._connection.close()
+
+    @callback
+    def async_abort(self) -> None:
+        """Drop the socket without waiting for the commands in flight.
+
+        Unlike async_close this does not wait for the socket to close, so it
+        also works when a command hangs on a half-open connection.
+        """
+        self._connection.abort()
+
+    @callback
+    def async_set_trace(self, size: int | None) -> None:
+        """Keep a trace of the last `size` commands, or none if size is None."""
+        if size is None:
+            self.trace = None
+        elif self.trace is None or self.trace.size != size:
+            self.trace = WireTrace(size)
+
+    async def send_command(self, command: str):
+        # the reply is parsed by the reader of the transport; unlike the stock
+        # client no debug log is formatted per reply, the wire trace records
+        # them when needed
+        trace = self.trace
+        started = time.monotonic()
+        timeout = self.timeouts.command
+        with self.metrics.measure(command_operation(command)):
+            try:
+                async with self.scheduler.async_slot():
+                    replies = await self._connection.async_write([command], timeout)
+                # the deadline of the command runs from the write, so the
+                # time it waited for the scheduler does not count
+                with self._timeout(timeout, command):
+                    (lines,) = await replies
+            except Exception as err:
+                if trace is not None:
+                    trace.record(command, (), started, err)
+                raise
+        if trace is not None:
+            trace.record(command, lines, started)
+
+    @property
+    def all_outputs(self) -> list[sa.Output]:
+        """Return every output of the switch, not only those used so far."""
+        return [self.output(number) for number in range(1, self._noutputs + 1)]
+
+    def snapshot_commands(self) -> list[str]:
+        """Return the commands that read back the state of the whole switch."""
+        outputs = self.all_outputs
+        commands = [f"switch-get{output.number}" for output in outputs]
+        for output in outputs:
+            number = output.number
+            commands += [
+                f"aoutput-vol-get{number}",
+                f"aoutput-conf-get{number}",
+                f"aoutput-mute-get{number}",
+                f"aoutput-mono-get{number}",
+            ]
+            if number < 17 and self.model == sa.Model.SSA_3220D:
+                commands.append(f"aoutput-delayboth-get{number}")
+        return commands
+
+    async def async_read_snapshot(
+        self, priority: Priority = Priority.BACKGROUND
+    ) -> SwitchState:
+        """Read every output and link in one pipelined batch.
+
+        The switch has no bulk query, so this is one command per value, but
+        they all go out in a single write; a full sweep costs about one round
+        trip plus the time the switch takes to answer.
+        """
+        with use_priority(priority):
+            await self.async_send_batch(self.snapshot_commands(), self.timeouts.refresh)
+        return self.state
+
+    async def async_apply(self, changes: Iterable[OutputChange]) -> None:
+        """Apply changes to several outputs in one pipelined batch."""
+        commands = [command for change in changes for command in change.commands()]
+        if commands:
+            await self.async_send_batch(commands)
+
+    async def async_send_batch(
+        self, commands: list[str], timeout: float | None = None
+    ) -> list[list[str]]:
+        """Send commands pipelined and return the reply lines of each.
+
+        Commands are written in chunks without waiting for replies, so the
+        batch is limited by the scheduler's rate and the switch, not by the
+        round trip time.  Every chunk takes its own slot from the scheduler,
+        so more urgent commands get in between the chunks of a long batch.
+        Every chunk has to be answered within `timeout` of its write, by
+        default the command timeout.
+        """
+        trace = self.trace
+        started = time.monotonic()
+        timeout = timeout or self.timeouts.command
+        pending = []
+        with self.metrics.measure(BATCH):
+            try:
+                for start in range(0, len(commands), BATCH_CHUNK):
+                    chunk = commands[start : start + BATCH_CHUNK]
+                    async with self.scheduler.async_slot(len(chunk)):
+                        pending.append(await self._connection.async_write(chunk, timeout))
+                with self._timeout(timeout, f"a batch of {len(commands)} commands"):
+                    replies = [
+                        lines for chunk in await asyncio.gather(*pending) for lines in chunk
+                    ]
+            except Exception as err:
+                # collect the failures of the other chunks too
+                await asyncio.gather(*pending, return_exceptions=True)
+                if trace is not None:
+                    for command in commands:
+                        trace.record(command, (), started, err, batch=True)
+                raise
+        if trace is not None:
+            for command, lines in zip(commands, replies):
+                trace.record(command, lines, started, batch=True)
+        return replies
+
+    async def parse(self, value: str):
+        if m := OUTPUT_REPLY.match(value):
+            output = self.output(int(m.group(1)))
+            result = await super().parse(value)
+            if self.state.set_output(output.number, output_state(output)):
+                await self._updated("output-updated", output)
+            return result
+
+        if m := LINK_REPLY.match(value):
+            # the store is updated before the client raises 'link-changed'
+            self.state.set_link(int(m.group(1)), int(m.group(2)))
+        return await super().parse(value)
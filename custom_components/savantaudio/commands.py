@@ -0,0 +1,123 @@
+"""Command helpers for Savant Audio Switches."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+import logging
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+import savantaudio.client as sa
+
+from .const import COALESCE_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+SOURCE = "source"
+VOLUME = "volume"
+MUTE = "mute"
+STEREO = "stereo"
+PASSTHRU = "passthru"
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+class OutputCommandCoalescer:
+    """Coalesce volume and mute writes per output.
+
+    The first write to an output is sent right away.  Writes that arrive
+    while it is in flight, or within COALESCE_INTERVAL after it, only replace
+    the pending target, and the latest target is sent once the interval has
+    passed.  A slider drag therefore costs a few commands instead of one per
+    step, and the final value always reaches the switch.
+
+    Every request returns a future that is done once the write carrying
+    its value (or a later one that replaced it) was answered, and fails
+    with the error of that write.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        switch: sa.Switch,
+        on_settled: Callable[[sa.Output], None],
+        interval: float = COALESCE_INTERVAL,
+    ) -> None:
+        """Initialize the coalescer."""
+        self._hass = hass
+        self._switch = switch
+        self._on_settled = on_settled
+        self._interval = interval
+        self._pending: dict[int, dict[str, Any]] = {}
+        self._waiters: dict[int, list[asyncio.Future[None]]] = {}
+        self._tasks: dict[int, asyncio.Task] = {}
+
+    @callback
+    def async_set_volume(self, number: int, volume: int) -> asyncio.Future[None]:
+        """Request a volume (-38..0 dB) for an output."""
+        if volume < -38 or volume > 0:
+            raise ValueError(f"Invalid volume level: {volume}dB")
+        return self._async_queue(number, VOLUME, volume)
+
+    @callback
+    def async_set_mute(self, number: int, mute: bool) -> asyncio.Future[None]:
+        """Request a mute state for an output."""
+        return self._async_queue(number, MUTE, mute)
+
+    @callback
+    def _async_queue(self, number: int, field: str, value: Any) -> asyncio.Future[None]:
+        self._pending.setdefault(number, {})[field] = value
+        written = self._hass.loop.create_future()
+        # nobody may wait for it, like a request made from a script
+        written.add_done_callback(_retrieve)
+        self._waiters.setdefault(number, []).append(written)
+        if number not in self._tasks:
+            self._tasks[number] = self._hass.async_create_task(
+                self._async_flush(number)
+            )
+        return written
+
+    async def _async_flush(self, number: int) -> None:
+        output = self._switch.output(number)
+        try:
+            while pending := self._pending.pop(number, None):
+                waiters = self._waiters.pop(number, [])
+                error: Exception | None = None
+                try:
+                    if VOLUME in pending:
+                        await output.set_volume(pending[VOLUME])
+                    if MUTE in pending:
+                        await output.set_mute(pending[MUTE])
+                except (OSError, ValueError) as err:
+                    _LOGGER.debug(
+                        "Failed to update output %d of switch at %s: %s",
+                        number,
+                        self._switch.host,
+                        err,
+                    )
+                    error = err
+                for written in waiters:
+                    if written.done():
+                        continue
+                    if error is None:
+                        written.set_result(None)
+                    else:
+                        written.set_exception(error)
+                await asyncio.sleep(self._interval)
+        finally:
+            self._pending.pop(number, None)
+            self._tasks.pop(number, None)
+            for written in self._waiters.pop(number, []):
+                if not written.done():
+                    written.set_exception(ConnectionAbortedError("write dropped"))
+        # publish what the switch reported now that nothing is in flight
+        self._on_settled(output)
+
+    @callback
+    def async_cancel(self) -> None:
+        """Drop everything that has not been sent yet."""
+        for task in list(self._tasks.values()):
+            task.cancel()
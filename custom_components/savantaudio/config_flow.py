@@ -15,7 +15,6 @@ from homeassistant.helpers.entity_registry import (
     async_get,
 )
 from homeassistant.util import slugify
-import savantaudio.client as sa
 import voluptuous as vol
 
 from custom_components.savantaudio.media_player import (
@@ -29,20 +28,48 @@ from custom_components.savantaudio.media_player import (
 )
 
 from .const import (
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_TIMEOUT,
+    CONF_CONNECT_TIMEOUT,
     CONF_NUMBER,
+    CONF_REFRESH_TIMEOUT,
+    CONF_TRACE,
+    CONF_TRACE_SIZE,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
     DEFAULT_NAME,
     DEFAULT_PORT,
+    DEFAULT_REFRESH_TIMEOUT,
     DEFAULT_SOURCE,
+    DEFAULT_TRACE_SIZE,
     DOMAIN,
     SOURCE_RANGE,
+    VALIDATE_TIMEOUT,
     ZONE_RANGE,
 )
+from .discovery import SwitchInfo, async_probe, async_scan, async_scan_hosts
 
 _LOGGER = logging.getLogger(__name__)
 
+# options of the advanced step, kept as they are when it is not shown
+ADVANCED_OPTIONS = (
+    CONF_TRACE,
+    CONF_TRACE_SIZE,
+    CONF_CONNECT_TIMEOUT,
+    CONF_COMMAND_TIMEOUT,
+    CONF_REFRESH_TIMEOUT,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_BURST,
+)
+TIMEOUT = vol.All(vol.Coerce(float), vol.Range(min=1, max=300))
+
 USER_SCHEMA = vol.Schema(
     {
-        vol.Required(CONF_HOST): cv.string,
+        # left empty, the local network is searched for switches
+        vol.Optional(CONF_HOST, default=""): cv.string,
         vol.Optional(CONF_PORT, default=DEFAULT_PORT): int,
         vol.Optional(CONF_NAME, default=DEFAULT_NAME): cv.string,
     }
@@ -56,46 +83,116 @@ class SavantAudioCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     def __init__(self):
         self.discovered_ip = None
+        self.discovered_port = DEFAULT_PORT
         self.discovered_name = None
+        self._name = DEFAULT_NAME
+        self._discovered: Dict[str, SwitchInfo] = {}
 
     async def _async_validate_or_error(self, host, port: int = DEFAULT_PORT):
-        # self._async_abort_entries_match({CONF_HOST: host})
-        _LOGGER.debug(f'_async_validate_or_error: {DOMAIN}, host={host}, port={port}')
-
-        info = {}
-        try:
-            _LOGGER.debug(f'Trying to connect to switch on {host}:{port} with {sa} -> {sa.Switch}')
-            switch = sa.Switch(host, port)
-            await switch.connect()
-            _LOGGER.debug('Connected')
-
-            info = {CONF_HOST: host, CONF_PORT: port, "unique_id": switch.attributes['sn']}
-        except ValueError:
-            _LOGGER.exception(f"Failed to connect to switch at {host}:{port}")
+        """Identify the switch at host:port with a probe."""
+        _LOGGER.debug("_async_validate_or_error: %s, host=%s, port=%d", DOMAIN, host, port)
+        # a status command on a connection of its own, closed right after;
+        # the entry setup that follows opens the connection it keeps
+        info = await async_probe(host, port, VALIDATE_TIMEOUT)
+        if info is None:
+            _LOGGER.warning("No switch answered at %s:%d", host, port)
             return None, "cannot_connect"
-
         return info, None
 
     async def async_step_user(self, user_input: Optional[Dict[str, Any]] = None):
         """Invoked when a user initiates a flow via the user interface."""
-        _LOGGER.info(f'async_step_user: {DOMAIN}')
+        _LOGGER.debug("async_step_user: %s", DOMAIN)
         errors: Dict[str, str] = {}
         if user_input is not None:
+            self._name = user_input.get(CONF_NAME, DEFAULT_NAME)
+            if not user_input.get(CONF_HOST):
+                return await self.async_step_pick_switch()
+            # other flows do not probe a host this flow is setting up
+            self.context[CONF_HOST] = user_input[CONF_HOST]
             info, error = await self._async_validate_or_error(user_input[CONF_HOST], user_input[CONF_PORT])
             if error:
-                return self.async_abort(reason=error)
-
-            await self.async_set_unique_id(info["unique_id"], raise_on_progress=False)
-            self._abort_if_unique_id_configured(updates={CONF_HOST: user_input[CONF_HOST], CONF_PORT: user_input[CONF_PORT]})
+                errors["base"] = error
+            else:
+                await self.async_set_unique_id(info.unique_id, raise_on_progress=False)
+                self._abort_if_unique_id_configured(updates={CONF_HOST: user_input[CONF_HOST], CONF_PORT: user_input[CONF_PORT]})
 
-            self.data = user_input
-            # Return the form of the next step.
-            return self.async_create_entry(title="Savant Audio", data=self.data)
+                self.data = user_input
+                # Return the form of the next step.
+                return self.async_create_entry(title="Savant Audio", data=self.data)
 
         return self.async_show_form(
             step_id="user", data_schema=USER_SCHEMA, errors=errors
         )
 
+    async def async_step_import(self, import_config: Dict[str, Any]):
+        """Import a switch set up on the media_player platform in YAML."""
+        _LOGGER.debug("async_step_import: %s", DOMAIN)
+        host = import_config[CONF_HOST]
+        port = import_config.get(CONF_PORT, DEFAULT_PORT)
+        self.context[CONF_HOST] = host
+        info, error = await self._async_validate_or_error(host, port)
+        if error:
+            return self.async_abort(reason=error)
+
+        await self.async_set_unique_id(info.unique_id, raise_on_progress=False)
+        self._abort_if_unique_id_configured(updates={CONF_HOST: host, CONF_PORT: port})
+
+        # entries keep the source numbers as strings, like the options flow
+        return self.async_create_entry(
+            title="Savant Audio",
+            data={
+                CONF_HOST: host,
+                CONF_PORT: port,
+                CONF_NAME: import_config.get(CONF_NAME, DEFAULT_NAME),
+                CONF_SOURCES: {
+                    str(source_id): dict(extra)
+                    for source_id, extra in import_config.get(CONF_SOURCES, {}).items()
+                },
+                CONF_ZONES: {
+                    entity_id: dict(extra)
+                    for entity_id, extra in import_config.get(CONF_ZONES, {}).items()
+                },
+            },
+        )
+
+    async def _async_discover(self) -> list[SwitchInfo]:
+        """Search the local network for switches that are not set up yet."""
+        # hosts of entries and of other flows are not probed again
+        skip = {entry.data.get(CONF_HOST) for entry in self._async_current_entries()}
+        skip.update(
+            progress["context"].get(CONF_HOST) for progress in self._async_in_progress()
+        )
+        hosts = await async_scan_hosts(self.hass)
+        _LOGGER.debug("Searching %d hosts for switches", len(hosts))
+        found = await async_scan(hosts, skip=skip)
+        configured = set(self._async_current_ids())
+        configured.update(
+            progress["context"].get("unique_id") for progress in self._async_in_progress()
+        )
+        return [info for info in found if info.unique_id not in configured]
+
+    async def async_step_pick_switch(self, user_input: Optional[Dict[str, Any]] = None):
+        """Pick one of the switches found on the local network."""
+        if user_input is not None:
+            info = self._discovered[user_input[CONF_HOST]]
+            self.discovered_ip = info.host
+            self.discovered_port = info.port
+            return await self.async_step_discovery_confirm()
+
+        self._discovered = {info.host: info for info in await self._async_discover()}
+        if not self._discovered:
+            return self.async_show_form(
+                step_id="user", data_schema=USER_SCHEMA, errors={"base": "no_devices_found"}
+            )
+        switches = {
+            host: f"{info.model} {info.serial} ({host})"
+            for host, info in sorted(self._discovered.items())
+        }
+        return self.async_show_form(
+            step_id="pick_switch",
+            data_schema=vol.Schema({vol.Required(CONF_HOST): vol.In(switches)}),
+        )
+
     # async def async_step_dhcp(self, discovery_info: dhcp.DhcpServiceInfo) -> FlowResult:
     #     """Handle DHCP discovery."""
     #     self.discovered_ip = discovery_info.ip
@@ -114,14 +211,21 @@ class SavantAudioCustomConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         self._async_abort_entries_match({CONF_HOST: self.discovered_ip})
 
-        info, error = await self._async_validate_or_error(self.discovered_ip)
+        info, error = await self._async_validate_or_error(self.discovered_ip, self.discovered_port)
         if error:
             return self.async_abort(reason=error)
 
-        await self.async_set_unique_id(info["unique_id"], raise_on_progress=False)
+        await self.async_set_unique_id(info.unique_id, raise_on_progress=False)
         self._abort_if_unique_id_configured({CONF_HOST: self.discovered_ip})
 
-        return self.async_create_entry(title="Savant Audio", data=info)
+        return self.async_create_entry(
+            title="Savant Audio",
+            data={
+                CONF_HOST: self.discovered_ip,
+                CONF_PORT: self.discovered_port,
+                CONF_NAME: self._name,
+            },
+        )
 
     @staticmethod
     @callback
@@ -137,6 +241,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         self.config_entry = config_entry
         self._updated_sources = {}
         self._updated_zones = {}
+        self._updated_options = {}
 
     async def async_step_init(
         self, user_input: Dict[str, Any] = None
@@ -319,12 +424,16 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
                 z.pop('__entity_id', None)
 
             if not errors:
+                self._updated_options = {CONF_ZONES: new_zones, CONF_SOURCES: self._updated_sources}
+                if self.show_advanced_options:
+                    return await self.async_step_advanced()
+                # keep the advanced settings as they are
+                for key in ADVANCED_OPTIONS:
+                    if key in self.config_entry.options:
+                        self._updated_options[key] = self.config_entry.options[key]
                 # Value of data will be set on the options property of our config_entry
                 # instance.
-                return self.async_create_entry(
-                    title="",
-                    data={CONF_ZONES: new_zones, CONF_SOURCES: self._updated_sources},
-                )
+                return self.async_create_entry(title="", data=self._updated_options)
 
         zones_list = {}
         for zone_id in ZONE_RANGE:
@@ -338,3 +447,45 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         return self.async_show_form(
             step_id="zone_defaults", data_schema=vol.Schema(zones_list), errors=errors
         )
+
+    async def async_step_advanced(
+        self, user_input: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """Manage the troubleshooting options."""
+        if user_input is not None:
+            self._updated_options.update(user_input)
+            return self.async_create_entry(title="", data=self._updated_options)
+
+        options = self.config_entry.options
+        return self.async_show_form(
+            step_id="advanced",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_TRACE, default=options.get(CONF_TRACE, False)): bool,
+                    vol.Required(
+                        CONF_TRACE_SIZE,
+                        default=options.get(CONF_TRACE_SIZE, DEFAULT_TRACE_SIZE),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=10, max=2000)),
+                    vol.Required(
+                        CONF_CONNECT_TIMEOUT,
+                        default=options.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+                    ): TIMEOUT,
+                    vol.Required(
+                        CONF_COMMAND_TIMEOUT,
+                        default=options.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT),
+                    ): TIMEOUT,
+                    vol.Required(
+                        CONF_REFRESH_TIMEOUT,
+                        default=options.get(CONF_REFRESH_TIMEOUT, DEFAULT_REFRESH_TIMEOUT),
+                    ): TIMEOUT,
+                    vol.Required(
+                        CONF_COMMAND_RATE,
+                        default=options.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=1, max=1000)),
+                    vol.Required(
+                        CONF_COMMAND_BURST,
+                        default=options.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=200)),
+                }
+            ),
+        )
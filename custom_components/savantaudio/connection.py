@@ -0,0 +1,260 @@
+"""Shared connections to Savant Audio Switches."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+import logging
+import random
+import time
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+from .client import SavantSwitch, Timeouts
+from .const import (
+    DOMAIN,
+    HEARTBEAT_INTERVAL,
+    HEARTBEAT_TIMEOUT,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+    RELEASE_DELAY,
+    SWITCHES,
+)
+from .scheduler import Priority, use_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _SwitchRef:
+    switch: SavantSwitch
+    users: int = 0
+    close_later: CALLBACK_TYPE | None = field(default=None, repr=False)
+
+
+class SwitchRegistry:
+    """Hand out one live switch per host:port.
+
+    Each user (config entry, yaml platform) acquires the switch and releases
+    it when done.  The connection is closed RELEASE_DELAY after the last user
+    released it, so an entry reload reuses the same socket.  The config flow
+    does not use the registry; it identifies a switch with a probe on a
+    connection of its own.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the registry."""
+        self._hass = hass
+        self._switches: dict[str, _SwitchRef] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_shutdown)
+
+    @staticmethod
+    def _key(host: str, port: int) -> str:
+        return f"{host}:{port}"
+
+    async def async_acquire(
+        self,
+        host: str,
+        port: int,
+        connect: bool = True,
+        timeouts: Timeouts | None = None,
+    ) -> SavantSwitch:
+        """Return the switch at host:port.
+
+        With connect, the switch attributes and state are loaded first if
+        that has not happened yet.  Without it the switch is returned right
+        away and connects on its first command.  timeouts replaces the
+        deadlines of the switch before it connects.
+        """
+        key = self._key(host, port)
+        # one lock per switch so a slow switch does not hold up the others
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            if (ref := self._switches.get(key)) is None:
+                ref = _SwitchRef(SavantSwitch(host=host, port=port))
+            if timeouts is not None:
+                ref.switch.timeouts = timeouts
+            if connect and not ref.switch.loaded:
+                try:
+                    await ref.switch.connect()
+                except BaseException:
+                    if key not in self._switches:
+                        await ref.switch.async_close()
+                    raise
+                _LOGGER.debug("Connected to switch at %s", key)
+            self._switches[key] = ref
+            if ref.close_later is not None:
+                ref.close_later()
+                ref.close_later = None
+            ref.users += 1
+            return ref.switch
+
+    @callback
+    def async_release(self, switch: SavantSwitch) -> None:
+        """Release a switch returned by async_acquire."""
+        key = self._key(switch.host, switch.port)
+        ref = self._switches.get(key)
+        if ref is None or ref.switch is not switch:
+            return
+        ref.users -= 1
+        if ref.users > 0:
+            return
+
+        @callback
+        def _async_close(_now) -> None:
+            ref.close_later = None
+            if ref.users == 0 and self._switches.get(key) is ref:
+                del self._switches[key]
+                _LOGGER.debug("Closing idle connection to switch at %s", key)
+                self._hass.async_create_task(switch.async_close())
+
+        ref.close_later = async_call_later(self._hass, RELEASE_DELAY, _async_close)
+
+    async def _async_shutdown(self, _event: Event) -> None:
+        refs = list(self._switches.values())
+        self._switches.clear()
+        for ref in refs:
+            if ref.close_later is not None:
+                ref.close_later()
+        await asyncio.gather(
+            *(ref.switch.async_close() for ref in refs), return_exceptions=True
+        )
+
+
+@callback
+def async_get_registry(hass: HomeAssistant) -> SwitchRegistry:
+    """Return the switch registry, creating it on first use."""
+    data = hass.data.setdefault(DOMAIN, {})
+    if (registry := data.get(SWITCHES)) is None:
+        registry = data[SWITCHES] = SwitchRegistry(hass)
+    return registry
+
+
+class ConnectionSupervisor:
+    """Watch the connection to a switch and bring it back when it drops.
+
+    The transport reports the connections the switch closes; a heartbeat
+    detects dead or half-open sockets when the switch has been quiet for
+    HEARTBEAT_INTERVAL.  Once the connection is lost, reconnects are
+    attempted with jittered exponential backoff until one succeeds; the
+    supervisor is the only one that reconnects.  on_lost and on_restored are
+    called once per outage.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        switch: SavantSwitch,
+        on_lost: Callable[[Exception], None],
+        on_restored: Callable[[], Awaitable[None]],
+    ) -> None:
+        """Initialize the supervisor."""
+        self._hass = hass
+        self._switch = switch
+        self._on_lost = on_lost
+        self._on_restored = on_restored
+        self._cancel_heartbeat: CALLBACK_TYPE | None = None
+        self._remove_disconnect_listener: Callable[[], None] | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self.reconnects = 0
+
+    @property
+    def connected(self) -> bool:
+        """Return False while the connection is being re-established."""
+        return self._reconnect_task is None
+
+    @callback
+    def async_start(self) -> None:
+        """Start the heartbeat and listen for dropped connections."""
+        if self._cancel_heartbeat is None:
+            self._cancel_heartbeat = async_track_time_interval(
+                self._hass, self._async_heartbeat, HEARTBEAT_INTERVAL
+            )
+        if self._remove_disconnect_listener is None:
+            self._remove_disconnect_listener = (
+                self._switch.transport.add_disconnect_listener(self.async_connection_lost)
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop the heartbeat and any reconnect in progress."""
+        if self._cancel_heartbeat is not None:
+            self._cancel_heartbeat()
+            self._cancel_heartbeat = None
+        if self._remove_disconnect_listener is not None:
+            self._remove_disconnect_listener()
+            self._remove_disconnect_listener = None
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+
+    async def _async_ping(self) -> None:
+        try:
+            async with asyncio.timeout(HEARTBEAT_TIMEOUT.total_seconds()):
+                with use_priority(Priority.BACKGROUND):
+                    await self._switch.refresh_link(1)
+        except TimeoutError as err:
+            # the socket is probably half-open; do not wait for the lock
+            self._switch.async_abort()
+            raise OSError("no reply to heartbeat") from err
+
+    async def _async_heartbeat(self, _now=None) -> None:
+        if not self.connected:
+            return
+        idle = time.monotonic() - self._switch.last_activity
+        if idle < HEARTBEAT_INTERVAL.total_seconds():
+            return
+        try:
+            await self._async_ping()
+        except (OSError, ValueError) as err:
+            self.async_connection_lost(err)
+
+    @callback
+    def async_connection_lost(self, err: Exception) -> None:
+        """Report a broken connection and start reconnecting."""
+        if not self.connected:
+            return
+        _LOGGER.warning(
+            "Lost connection to switch at %s:%d: %s",
+            self._switch.host,
+            self._switch.port,
+            err,
+        )
+        self._switch.async_abort()
+        # queued sweeps would only fail one after the other
+        self._switch.scheduler.async_drop(Priority.BACKGROUND)
+        self._reconnect_task = self._hass.async_create_background_task(
+            self._async_reconnect(), f"{DOMAIN} reconnect {self._switch.host}"
+        )
+        self._on_lost(err)
+
+    async def _async_reconnect(self) -> None:
+        attempt = 0
+        while True:
+            delay = min(RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2**attempt)
+            await asyncio.sleep(random.uniform(delay / 2, delay))
+            attempt += 1
+            try:
+                await self._switch.async_open()
+                await self._async_ping()
+            except (OSError, ValueError) as err:
+                _LOGGER.debug(
+                    "Reconnect %d to switch at %s failed: %s",
+                    attempt,
+                    self._switch.host,
+                    err,
+                )
+                continue
+            break
+
+        _LOGGER.info(
+            "Reconnected to switch at %s:%d after %d attempts",
+            self._switch.host,
+            self._switch.port,
+            attempt,
+        )
+        self.reconnects += 1
+        self._reconnect_task = None
+        await self._on_restored()
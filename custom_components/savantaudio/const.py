@@ -1,3 +1,5 @@
+import datetime
+
 import savantaudio.client as sa
 
 NAME = "Savant Audio Switch Custom Component"
@@ -8,6 +10,10 @@ ISSUE_URL = "https://github.com/akropp/savantaudio-homeassistant/issues"
 
 KNOWN_ZONES = "known_zones"
 KNOWN_HOSTS = "known_hosts"
+ENTRY_DATA = "entry_data"
+SWITCHES = "switches"
+PRESETS = "presets"
+TIE_LINES = "tie_lines"
 DEFAULT_PORT = 8085
 DEFAULT_NAME = "Savant"
 DEFAULT_SOURCE = "default"
@@ -16,12 +22,53 @@ CONF_NUMBER = "number"
 SOURCE_RANGE = range(1,33)
 ZONE_RANGE = range(1,21)
 
+DEFAULT_SCAN_INTERVAL = datetime.timedelta(minutes=1)
+MAX_SCAN_INTERVAL = datetime.timedelta(minutes=30)
+RELEASE_DELAY = datetime.timedelta(seconds=30)
+COALESCE_INTERVAL = 0.25  # seconds between volume/mute writes to one output
+CONFIRM_TIMEOUT = datetime.timedelta(seconds=5)
+CACHE_SAVE_DELAY = 30  # seconds
+HEARTBEAT_INTERVAL = datetime.timedelta(seconds=30)
+HEARTBEAT_TIMEOUT = datetime.timedelta(seconds=10)
+RECONNECT_MIN_DELAY = 2  # seconds, doubled per failed attempt
+RECONNECT_MAX_DELAY = 300  # seconds
+# conservative until measured on a device, and advanced options: a sweep of
+# the switch (116 commands) is throttled after one in-flight window and
+# takes about a second, so commands of users get in between its chunks
+DEFAULT_COMMAND_RATE = 100  # commands per second a switch is sent at most
+DEFAULT_COMMAND_BURST = 40  # commands sent before the rate applies
+BATCH_CHUNK = 20  # commands per write of a batch
+MAX_IN_FLIGHT = 40  # commands written to a switch before it answered them
+MAX_MISSED_REPLIES = 3  # writes in a row that time out before the connection is dropped
+DEFAULT_CONNECT_TIMEOUT = 15.0  # seconds to connect and read the switch
+DEFAULT_COMMAND_TIMEOUT = 5.0  # seconds for a command or batch of commands
+DEFAULT_REFRESH_TIMEOUT = 30.0  # seconds for a sweep of the whole switch
+PROBE_TIMEOUT = 1.0  # seconds for a host to answer a discovery probe
+VALIDATE_TIMEOUT = 5.0  # seconds for a host entered in the config flow to answer
+PROBE_CONCURRENCY = 128  # hosts probed at the same time
+MIN_SCAN_PREFIX = 22  # larger networks are narrowed to the /24 around our address
+
 CONF_SOURCES = "sources"
 CONF_ZONES = "zones"
+CONF_TIE_LINES = "tie_lines"
+CONF_TRACE = "trace"
+CONF_TRACE_SIZE = "trace_size"
+CONF_CONNECT_TIMEOUT = "connect_timeout"
+CONF_COMMAND_TIMEOUT = "command_timeout"
+CONF_REFRESH_TIMEOUT = "refresh_timeout"
+CONF_COMMAND_RATE = "command_rate"
+CONF_COMMAND_BURST = "command_burst"
+DEFAULT_TRACE_SIZE = 200
+
+# services
+SERVICE_BATCH = "batch"
+SERVICE_SNAPSHOT = "snapshot"
+SERVICE_RESTORE = "restore"
 
 # platforms
 MEDIA_PLAYER = "media_player"
-PLATFORMS = [MEDIA_PLAYER]
+SENSOR = "sensor"
+PLATFORMS = [MEDIA_PLAYER, SENSOR]
 
 STARTUP_MESSAGE = f"""
 -------------------------------------------------------------------
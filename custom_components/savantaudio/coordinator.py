@@ -0,0 +1,172 @@
+"""Data update coordinator for Savant Audio Switches."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from .cache import SwitchCache
+from .client import SavantSwitch
+from .commands import OutputCommandCoalescer
+from .connection import ConnectionSupervisor
+from .const import DEFAULT_SCAN_INTERVAL, DOMAIN, MAX_SCAN_INTERVAL
+from .metrics import POLL
+from .state import SwitchState
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SavantAudioCoordinator(DataUpdateCoordinator[SwitchState]):
+    """Refresh every output and link of one switch in a single cycle.
+
+    All zone entities of a switch share one coordinator and read their state
+    from its data, the SwitchState store of the switch.  A refresh reads the
+    whole switch in one pipelined batch; events pushed by the switch update
+    the store in between.
+
+    Entities are updated from switch events as they arrive; the poll is only
+    a reconciliation sweep.  Its interval doubles (up to MAX_SCAN_INTERVAL)
+    while the switch keeps pushing notifications, halves after a silent
+    interval and drops back to DEFAULT_SCAN_INTERVAL after the switch comes
+    back from a failure.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        switch: SavantSwitch,
+        name: str,
+        cache: SwitchCache | None = None,
+    ) -> None:
+        """Initialize the coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {name}",
+            update_interval=DEFAULT_SCAN_INTERVAL,
+        )
+        self.switch = switch
+        self.cache = cache
+        self.device_name = name
+        self.dispatcher = switch.dispatcher
+        self.coalescer = OutputCommandCoalescer(
+            hass,
+            switch,
+            lambda output: self.dispatcher.async_notify("output-updated", output),
+        )
+        self.supervisor = ConnectionSupervisor(
+            hass, switch, self._async_connection_lost, self._async_connection_restored
+        )
+        # the transport's count of pushed lines at the last sweep; replies to
+        # our own commands, refreshes included, are not pushes
+        self._pushes = switch.transport.pushes
+        self._refreshing = False
+        self.dispatcher.async_start()
+
+    @property
+    def _events(self) -> int:
+        """Return the number of notifications pushed since the last sweep."""
+        return self.switch.transport.pushes - self._pushes
+
+    @property
+    def refreshing(self) -> bool:
+        """Return True while a refresh is reading the switch."""
+        return self._refreshing
+
+    @callback
+    def _async_connection_lost(self, err: Exception) -> None:
+        """Mark all zones unavailable at once."""
+        self.async_set_update_error(err)
+
+    async def _async_connection_restored(self) -> None:
+        """Resync everything after a reconnect."""
+        self.async_tighten()
+        if not self.switch.loaded:
+            await self.async_load()
+            return
+        await self.async_refresh()
+
+    async def async_load(self) -> None:
+        """Read the attributes and state of a switch set up from the cache.
+
+        The cached firmware, serial and model may be out of date, so they are
+        read again together with the state and the device is updated.
+        """
+        self._refreshing = True
+        try:
+            await self.switch.connect()
+        except (OSError, ValueError) as err:
+            _LOGGER.debug("%s: switch not reachable yet: %s", self.name, err)
+            self.supervisor.async_connection_lost(err)
+            return
+        finally:
+            self._refreshing = False
+        self.async_update_device()
+        self.async_set_updated_data(self.switch.state)
+        if self.cache is not None:
+            self.cache.async_save(self.switch)
+
+    @callback
+    def async_update_device(self) -> None:
+        """Create the device of the switch or update it from the attributes."""
+        switch = self.switch
+        dr.async_get(self.hass).async_get_or_create(
+            config_entry_id=self.config_entry.entry_id,
+            identifiers={(DOMAIN, switch.attributes["sn"])},
+            manufacturer="Savant",
+            name=self.device_name,
+            model=str(switch.model),
+            sw_version=switch.attributes["fwrev"],
+            hw_version=switch.attributes["rev"],
+        )
+
+    @callback
+    def async_tighten(self) -> None:
+        """Fall back to the fastest reconciliation interval."""
+        self._pushes = self.switch.transport.pushes
+        self.update_interval = DEFAULT_SCAN_INTERVAL
+
+    @callback
+    def _async_adapt_interval(self) -> None:
+        if self._events:
+            interval = min(self.update_interval * 2, MAX_SCAN_INTERVAL)
+        else:
+            interval = max(self.update_interval / 2, DEFAULT_SCAN_INTERVAL)
+        if interval != self.update_interval:
+            _LOGGER.debug(
+                "%s: %d events since last sweep, next sweep in %s",
+                self.name,
+                self._events,
+                interval,
+            )
+        self._pushes = self.switch.transport.pushes
+        self.update_interval = interval
+
+    async def _async_update_data(self) -> SwitchState:
+        """Fetch the state of all outputs and links from the switch."""
+        if not self.supervisor.connected:
+            raise UpdateFailed(
+                f"Reconnecting to switch at {self.switch.host}:{self.switch.port}"
+            )
+        self._refreshing = True
+        try:
+            with self.switch.metrics.measure(POLL, queued=False):
+                state = await self.switch.async_read_snapshot()
+        except (OSError, ValueError) as err:
+            self.async_tighten()
+            self.supervisor.async_connection_lost(err)
+            raise UpdateFailed(
+                f"Error communicating with switch at {self.switch.host}:{self.switch.port}: {err}"
+            ) from err
+        finally:
+            self._refreshing = False
+
+        if self.last_update_success:
+            self._async_adapt_interval()
+        else:
+            self.async_tighten()
+        if self.cache is not None:
+            self.cache.async_save(self.switch)
+        return state
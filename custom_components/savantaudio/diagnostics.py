@@ -0,0 +1,87 @@
+"""Diagnostics support for Savant Audio Switches."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_HOST
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, ENTRY_DATA
+
+# "sn" is the serial number the switch reports in its status
+TO_REDACT = {CONF_HOST, "sn"}
+
+
+def _redact_trace(trace: list[dict[str, Any]], secrets: set[str]) -> list[dict[str, Any]]:
+    """Return the trace records with the secrets replaced in the text they hold."""
+
+    def redact(text: str) -> str:
+        for secret in secrets:
+            text = text.replace(secret, REDACTED)
+        return text
+
+    return [
+        {
+            **record,
+            "command": redact(record["command"]),
+            "replies": [redact(reply) for reply in record["replies"]],
+            "error": None if record["error"] is None else redact(record["error"]),
+        }
+        for record in trace
+    ]
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    diagnostics: dict[str, Any] = {
+        "data": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": async_redact_data(dict(entry.options), TO_REDACT),
+    }
+    entry_data = hass.data.get(DOMAIN, {}).get(ENTRY_DATA, {}).get(entry.entry_id)
+    if entry_data is None:
+        return diagnostics
+
+    coordinator = entry_data.coordinator
+    switch = coordinator.switch
+    # the trace is protocol text, so the host and serial are redacted in it
+    # wherever they appear, not just under their keys
+    secrets = {
+        str(value)
+        for value in (entry.data.get(CONF_HOST), switch.attributes.get("sn"))
+        if value
+    }
+    trace = None
+    if switch.trace is not None:
+        trace = _redact_trace(switch.trace.as_list(), secrets)
+    diagnostics.update(
+        {
+            "switch": {
+                "attributes": async_redact_data(dict(switch.attributes), TO_REDACT),
+                "model": switch.model.value,
+                "loaded": switch.loaded,
+                "links": dict(switch.links),
+            },
+            "coordinator": {
+                "last_update_success": coordinator.last_update_success,
+                "update_interval": str(coordinator.update_interval),
+            },
+            "connection": {
+                "connected": coordinator.supervisor.connected,
+                "reconnects": coordinator.supervisor.reconnects,
+                "in_flight": switch.transport.in_flight,
+                "pushes": switch.transport.pushes,
+            },
+            "scheduler": {
+                "rate": switch.scheduler.rate,
+                "burst": switch.scheduler.burst,
+                "waiting": switch.scheduler.waiting,
+            },
+            "metrics": switch.metrics.as_dict(),
+            "trace": trace,
+        }
+    )
+    return diagnostics
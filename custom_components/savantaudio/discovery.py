@@ -0,0 +1,118 @@
+"""Discovery of Savant Audio switches on the local network."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Container, Iterable
+from dataclasses import dataclass
+from ipaddress import IPv4Network
+import logging
+
+from homeassistant.components import network
+from homeassistant.core import HomeAssistant
+
+from .client import STATUS_REPLY
+from .const import DEFAULT_PORT, MIN_SCAN_PREFIX, PROBE_CONCURRENCY, PROBE_TIMEOUT
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SwitchInfo:
+    """A switch that answered a probe."""
+
+    host: str
+    port: int
+    serial: str
+    model: str
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique id of the switch's config entry."""
+        # the status field as a connected switch reports it in attributes["sn"]
+        return f"sn={self.serial}"
+
+
+def parse_status(status: str) -> dict[str, str]:
+    """Return the key=value fields of the reply to a status command."""
+    fields = {}
+    for part in (part.strip() for part in status.split(";")):
+        key, sep, value = part.partition("=")
+        if sep:
+            fields[key] = value
+    return fields
+
+
+async def async_probe(
+    host: str, port: int = DEFAULT_PORT, timeout: float = PROBE_TIMEOUT
+) -> SwitchInfo | None:
+    """Identify the switch at host:port, or return None if there is none.
+
+    The probe is a single status command on a connection of its own that is
+    closed again right after, so probing never reads the whole switch.
+    """
+    writer = None
+    try:
+        async with asyncio.timeout(timeout):
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.write(b"status\r\n")
+            await writer.drain()
+            # skip the notifications the switch may push before the reply
+            while data := await reader.readline():
+                if m := STATUS_REPLY.match(data.decode("ascii", "replace").strip()):
+                    fields = parse_status(m.group(1))
+                    if "sn" not in fields:
+                        return None
+                    return SwitchInfo(host, port, fields["sn"], fields.get("pn", ""))
+    except (OSError, TimeoutError) as err:
+        _LOGGER.debug("No switch at %s:%d: %r", host, port, err)
+    finally:
+        if writer is not None:
+            writer.close()
+    return None
+
+
+async def async_scan(
+    hosts: Iterable[str],
+    port: int = DEFAULT_PORT,
+    skip: Container[str] = (),
+    concurrency: int = PROBE_CONCURRENCY,
+    timeout: float = PROBE_TIMEOUT,
+) -> list[SwitchInfo]:
+    """Probe hosts in parallel and return the switches that answered.
+
+    At most `concurrency` probes are open at a time; hosts in `skip` are
+    not probed at all.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def probe(host: str) -> SwitchInfo | None:
+        async with semaphore:
+            return await async_probe(host, port, timeout)
+
+    results = await asyncio.gather(*(probe(host) for host in hosts if host not in skip))
+    return [info for info in results if info is not None]
+
+
+async def async_scan_hosts(hass: HomeAssistant) -> list[str]:
+    """Return the addresses of the networks Home Assistant is configured to use."""
+    hosts: dict[str, None] = {}
+    for adapter in await network.async_get_adapters(hass):
+        if not adapter["enabled"]:
+            continue
+        for address in adapter["ipv4"]:
+            subnet = IPv4Network(
+                f"{address['address']}/{address['network_prefix']}", strict=False
+            )
+            if subnet.is_loopback or subnet.is_link_local:
+                continue
+            if subnet.prefixlen < MIN_SCAN_PREFIX:
+                _LOGGER.debug(
+                    "Network %s is too large to scan, scanning around %s",
+                    subnet,
+                    address["address"],
+                )
+                subnet = IPv4Network(f"{address['address']}/24", strict=False)
+            for host in subnet.hosts():
+                if str(host) != address["address"]:
+                    hosts[str(host)] = None
+    return list(hosts)
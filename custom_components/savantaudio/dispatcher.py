@@ -0,0 +1,95 @@
+"""Switch event dispatcher for Savant Audio Switches."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+import savantaudio.client as sa
+
+_LOGGER = logging.getLogger(__name__)
+
+EventListener = Callable[[str, Any], None]
+
+
+class SavantAudioDispatcher:
+    """Route the events of one switch to the listener of the affected output.
+
+    The dispatcher is the only callback registered on the switch.  Each
+    'output-updated' or 'link-changed' event is looked up by output number,
+    so the cost per event does not depend on the number of zones.
+    """
+
+    def __init__(self, switch: sa.Switch) -> None:
+        """Initialize the dispatcher."""
+        self._switch = switch
+        self._outputs: dict[int, EventListener] = {}
+        self._listeners: list[EventListener] = []
+        self._registered = False
+        self._active = False
+
+    @callback
+    def async_start(self) -> None:
+        """Start dispatching the events of the switch."""
+        if not self._registered:
+            # the client has no way to remove a callback, so it is only
+            # ever registered once and gated by _active afterwards
+            self._switch.add_callback(self._async_dispatch)
+            self._registered = True
+        self._active = True
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop dispatching and drop all listeners."""
+        self._active = False
+        self._outputs.clear()
+        self._listeners.clear()
+
+    @callback
+    def async_add_output_listener(
+        self, number: int, listener: EventListener
+    ) -> CALLBACK_TYPE:
+        """Listen for the events of one output."""
+        self._outputs[number] = listener
+
+        @callback
+        def remove_listener() -> None:
+            if self._outputs.get(number) is listener:
+                del self._outputs[number]
+
+        return remove_listener
+
+    @callback
+    def async_add_listener(self, listener: EventListener) -> CALLBACK_TYPE:
+        """Listen for all events of the switch."""
+        self._listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return remove_listener
+
+    async def _async_dispatch(self, event: str, obj) -> None:
+        self.async_notify(event, obj)
+
+    @callback
+    def async_notify(self, event: str, obj) -> None:
+        """Deliver an event as if the switch had raised it."""
+        if not self._active:
+            return
+
+        self._switch.metrics.record_event()
+        for listener in self._listeners:
+            listener(event, obj)
+
+        if event == "output-updated":
+            number = obj.number
+        elif event == "link-changed":
+            number = obj[0]
+        else:
+            return
+        if (listener := self._outputs.get(number)) is not None:
+            listener(event, obj)
@@ -0,0 +1,10 @@
+"""Exceptions for the Savant Audio integration."""
+from homeassistant.exceptions import HomeAssistantError
+
+
+class SwitchTimeoutError(TimeoutError):
+    """The switch did not answer within the deadline of an operation."""
+
+
+class SavantAudioTimeoutError(HomeAssistantError):
+    """A service call gave up waiting for the switch."""
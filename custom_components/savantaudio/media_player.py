@@ -1,19 +1,23 @@
 """Support for Savant Audio Switches (SSA-3220)."""
 from __future__ import annotations
 
-import datetime
-from http.client import SWITCHING_PROTOCOLS
+from collections.abc import Awaitable
+from functools import partial
 import logging
 
 # from homeassistant.components.media_player.const import DOMAIN
 from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+    DOMAIN as MP_DOMAIN,
     PLATFORM_SCHEMA,
     MediaPlayerDeviceClass,
     MediaPlayerEntity,
     MediaPlayerEntityFeature,
 )
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
 from homeassistant.const import (
-    ATTR_ENTITY_ID,
     CONF_ENABLED,
     CONF_HOST,
     CONF_NAME,
@@ -21,27 +25,50 @@ from homeassistant.const import (
     STATE_OFF,
     STATE_ON,
 )
-from homeassistant.core import HomeAssistant, ServiceCall
-from homeassistant.exceptions import ConfigEntryError, HomeAssistantError
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import device_registry as dr, entity_registry as er
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_call_later
 from homeassistant.helpers.typing import ConfigType, DiscoveryInfoType
-from homeassistant.util import slugify
-import savantaudio.client as sa
-from typing_extensions import Required
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
 import voluptuous as vol
 
 from .const import (
+    CONF_COMMAND_BURST,
+    CONF_COMMAND_RATE,
+    CONF_COMMAND_TIMEOUT,
+    CONF_CONNECT_TIMEOUT,
     CONF_NUMBER,
+    CONF_REFRESH_TIMEOUT,
     CONF_SOURCES,
+    CONF_TRACE,
+    CONF_TRACE_SIZE,
     CONF_ZONES,
+    CONFIRM_TIMEOUT,
+    DEFAULT_COMMAND_BURST,
+    DEFAULT_COMMAND_RATE,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_CONNECT_TIMEOUT,
     DEFAULT_NAME,
     DEFAULT_PORT,
+    DEFAULT_REFRESH_TIMEOUT,
     DEFAULT_SOURCE,
+    DEFAULT_TRACE_SIZE,
     DOMAIN,
+    ENTRY_DATA,
+    KNOWN_HOSTS,
     KNOWN_ZONES,
+    TIE_LINES,
 )
+from .client import OutputChange, Timeouts
+from .commands import MUTE, PASSTHRU, SOURCE, STEREO, VOLUME
+from .coordinator import SavantAudioCoordinator
+from .exceptions import SavantAudioTimeoutError, SwitchTimeoutError
+from .routing import TieLineMap, plan_route
+from .scheduler import context_priority, use_priority
+from .services import async_apply_changes
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -63,8 +90,6 @@ SUPPORT_SAVANTAUDIO = (
     | MediaPlayerEntityFeature.VOLUME_STEP
 )
 
-KNOWN_HOSTS: list[str] = []
-
 SOUND_MODE_LIST = ['stereo', 'mono', 'stereo,passthru', 'mono,passthru']
 
 DEFAULT_SOURCES = { n: {"name": f'Source {n}'} for n in range(1,32) }
@@ -94,190 +119,192 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
     }
 )
 
-SOURCE_IDS = vol.All(vol.Coerce(int), vol.Range(min=1, max=32))
-SOURCE_SCHEMA = vol.Schema({
-    vol.Required(CONF_NAME, default="Unknown Source"): cv.string,
-    vol.Required(CONF_ENABLED, default=True): bool,
-})
-
-ZONE_IDS = vol.All( vol.Coerce(int), vol.Range(min=1, max=20) )
-ZONE_SCHEMA = vol.Schema({
-    vol.Required(CONF_NUMBER): ZONE_IDS,
-    vol.Required(CONF_NAME, default="Audio Zone"): cv.string,
-    vol.Optional(DEFAULT_SOURCE): cv.positive_int,
-    vol.Required(CONF_ENABLED, default=True): bool,
-})
-
-
-SCAN_INTERVAL = datetime.timedelta(minutes=1)
-
-
 TIMEOUT_MESSAGE = "Timeout waiting for response."
 
+
 async def async_setup_entry(
-    hass: core.HomeAssistant,
-    config_entry: config_entries.ConfigEntry,
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
     async_add_entities: AddEntitiesCallback,
 ):
-    """Setup sensors from a config entry created in the integrations UI."""
-    _LOGGER.info(f'media_player.async_setup_entry: {DOMAIN}')
+    """Set up the zones of the switch of a config entry."""
+    _LOGGER.debug("media_player.async_setup_entry: %s", DOMAIN)
     config = hass.data[DOMAIN][config_entry.entry_id]
-    known_zones = hass.data[DOMAIN].setdefault(KNOWN_ZONES, [])
+    entry_data = hass.data[DOMAIN][ENTRY_DATA][config_entry.entry_id]
+    entry_data.async_add_entities = async_add_entities
+    coordinator = entry_data.coordinator
 
-    devices: list[SavantAudioZone] = []
+    if CONF_SOURCES in config and CONF_ZONES in config:
+        sources = _enabled_sources(config)
+        for entity_id, extra in _enabled_zones(config).values():
+            zone = _create_zone(coordinator, config, entity_id, extra, sources)
+            entry_data.zones[zone.number] = zone
 
-    try:
-        host = config[CONF_HOST]
-        port = config.get(CONF_PORT, DEFAULT_PORT)
-        if host is None or port is None:
-            raise RequiredParameterMissing
-            
-        switch = sa.Switch(host=host, port=port)
-        try:
-            await switch.connect()
-        except:
-            raise HomeAssistantError
-
-        # add device for switch
-        device_registry = dr.async_get(hass)
-        entity_registry = er.async_get(hass)
-
-        device_registry.async_get_or_create(
-            config_entry_id=config_entry.entry_id,
-            identifiers={(DOMAIN, switch.attributes['sn'])},
-            manufacturer="Savant",
-            name=config[CONF_NAME],
-            model=str(switch.model),
-            sw_version=switch.attributes['fwrev'],
-            hw_version=switch.attributes['rev'],
-        )
+    _async_remove_stale_zones(hass, config_entry, entry_data.zones.values())
+    async_add_entities(entry_data.zones.values())
 
-        sn = switch.attributes['sn']
-        device_ids = []
-        entity_ids = []
-        if CONF_SOURCES in config and CONF_ZONES in config:
-            sources = {
-                int(source_id): extra[CONF_NAME] for source_id, extra in config[CONF_SOURCES].items() if extra.get(CONF_ENABLED, True)
-            }
-            for entity_id, extra in config[CONF_ZONES].items():
-                if extra.get(CONF_ENABLED, True):
-                    zonedevice = SavantAudioZone(
-                            switch,
-                            entity_id,
-                            sources,
-                            switch.output(int(extra[CONF_NUMBER])),
-                            extra[CONF_NAME],
-                            switch_name=config.get(CONF_NAME),
-                            default_source=extra.get(DEFAULT_SOURCE, None),
-                        )
-                    known_zones.append(zonedevice)
-                    devices.append(zonedevice)
-                    device_ids.append(zonedevice.unique_id)
-                    entity_ids.append(zonedevice.entity_id)
-        if sn not in KNOWN_HOSTS:
-            KNOWN_HOSTS.append(sn)
-        unknown_entities = [zone for zone in known_zones if zone.switch.attributes['sn'] == sn and zone.entity_id not in entity_ids]
-        for zone in unknown_entities:
-            entity_registry.async_remove(zone.entity_id)
-            _LOGGER.debug(f'Removed Zone Entity id={zone.entity_id}, name={zone.name}')
-        unknown_zones = [zone for zone in known_zones if zone.switch.attributes['sn'] == sn and zone.unique_id not in device_ids]
-        for zone in unknown_zones:
-            known_zones.remove(zone)
-            device = device_registry.async_get_device(zone.device_info["identifiers"])
-            if device is not None:
-                device_registry.async_remove_device(device.id)
-            _LOGGER.debug(f'Removed Zone Device id={device.id}, name={zone.name}')
 
-    except OSError:
-        _LOGGER.error("Unable to connect to Savant Audio Switch at %s:%d", host, port)
-    async_add_entities(devices, True)
+@callback
+def _async_remove_stale_zones(hass: HomeAssistant, config_entry: ConfigEntry, zones) -> None:
+    """Remove the zone entities and devices of this entry that are not configured.
+
+    Zone devices are the ones connected via the switch device.
+    """
+    unique_ids = {zone.unique_id for zone in zones}
+    entity_registry = er.async_get(hass)
+    for entity in er.async_entries_for_config_entry(entity_registry, config_entry.entry_id):
+        if entity.domain == MP_DOMAIN and entity.unique_id not in unique_ids:
+            entity_registry.async_remove(entity.entity_id)
+            _LOGGER.debug("Removed zone entity %s", entity.entity_id)
+
+    device_registry = dr.async_get(hass)
+    zone_ids = {(DOMAIN, unique_id) for unique_id in unique_ids}
+    for device in dr.async_entries_for_config_entry(device_registry, config_entry.entry_id):
+        if device.via_device_id is not None and not device.identifiers & zone_ids:
+            device_registry.async_remove_device(device.id)
+            _LOGGER.debug("Removed zone device %s", device.name)
 
 
-async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Unload a config entry."""
-    _LOGGER.info(f'media_player.async_unload_entry: {DOMAIN}')
-    known_zones = hass.data[DOMAIN].setdefault(KNOWN_ZONES, [])
-    to_remove = [ zone for zone in known_zones if zone.switch.attributes['sn'] == entry.unique_id ]
-    for zone in to_remove:
-        known_zones.remove(zone)
+def timeouts(config) -> Timeouts:
+    return Timeouts(
+        config.get(CONF_CONNECT_TIMEOUT, DEFAULT_CONNECT_TIMEOUT),
+        config.get(CONF_COMMAND_TIMEOUT, DEFAULT_COMMAND_TIMEOUT),
+        config.get(CONF_REFRESH_TIMEOUT, DEFAULT_REFRESH_TIMEOUT),
+    )
 
+
+def command_rate(config) -> tuple[float, int]:
+    return (
+        config.get(CONF_COMMAND_RATE, DEFAULT_COMMAND_RATE),
+        config.get(CONF_COMMAND_BURST, DEFAULT_COMMAND_BURST),
+    )
+
+
+def trace_size(config) -> int | None:
+    if not config.get(CONF_TRACE, False):
+        return None
+    return config.get(CONF_TRACE_SIZE, DEFAULT_TRACE_SIZE)
+
+
+def _enabled_sources(config) -> dict[int, str]:
+    return {
+        int(source_id): extra[CONF_NAME] for source_id, extra in config[CONF_SOURCES].items() if extra.get(CONF_ENABLED, True)
+    }
+
+
+def _enabled_zones(config) -> dict[int, tuple[str, dict]]:
+    return {
+        int(extra[CONF_NUMBER]): (entity_id, extra) for entity_id, extra in config.get(CONF_ZONES, {}).items() if extra.get(CONF_ENABLED, True)
+    }
+
+
+def _create_zone(coordinator, config, entity_id, extra, sources) -> SavantAudioZone:
+    return SavantAudioZone(
+        coordinator,
+        entity_id,
+        sources,
+        coordinator.switch.output(int(extra[CONF_NUMBER])),
+        extra[CONF_NAME],
+        switch_name=config.get(CONF_NAME),
+        default_source=extra.get(DEFAULT_SOURCE, None),
+    )
+
+
+@callback
+def async_apply_options(hass: HomeAssistant, config_entry: ConfigEntry, config: dict) -> bool:
+    """Apply new options to the running zones of an entry.
+
+    Renames, source lists and default sources are changed in place and only
+    the zones that were enabled or disabled are added or removed.  Returns
+    False if the change needs a full reload of the entry instead.
+    """
+    entry_data = hass.data[DOMAIN].get(ENTRY_DATA, {}).get(config_entry.entry_id)
+    old_config = hass.data[DOMAIN].get(config_entry.entry_id)
+    if entry_data is None or old_config is None:
+        return False
+    if any(old_config.get(key) != config.get(key) for key in (CONF_HOST, CONF_PORT, CONF_NAME)):
+        return False
+    if CONF_SOURCES not in config or CONF_ZONES not in config:
+        return False
+
+    coordinator = entry_data.coordinator
+    coordinator.switch.async_set_trace(trace_size(config))
+    coordinator.switch.timeouts = timeouts(config)
+    coordinator.switch.scheduler.set_rate(*command_rate(config))
+    sources = _enabled_sources(config)
+    zones = _enabled_zones(config)
+
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+    for number in set(entry_data.zones) - set(zones):
+        zone = entry_data.zones.pop(number)
+        entity_registry.async_remove(zone.entity_id)
+        device = device_registry.async_get_device(zone.device_info["identifiers"])
+        if device is not None:
+            device_registry.async_remove_device(device.id)
+        _LOGGER.debug("Removed zone %s (%s)", zone.entity_id, zone.name)
+
+    new_zones = []
+    for number, (entity_id, extra) in zones.items():
+        zone = entry_data.zones.get(number)
+        if zone is None:
+            zone = _create_zone(coordinator, config, entity_id, extra, sources)
+            entry_data.zones[number] = zone
+            new_zones.append(zone)
+            continue
+
+        changed = False
+        if zone.name != extra[CONF_NAME]:
+            zone.set_name(extra[CONF_NAME])
+            device = device_registry.async_get_device(zone.device_info["identifiers"])
+            if device is not None:
+                device_registry.async_update_device(device.id, name=extra[CONF_NAME])
+            changed = True
+        if zone.source_mapping != sources:
+            zone.set_sources(sources)
+            changed = True
+        zone.set_default_source(extra.get(DEFAULT_SOURCE, None))
+        if changed:
+            zone.async_confirm()
+
+    if new_zones:
+        entry_data.async_add_entities(new_zones)
     return True
 
+
 async def async_setup_platform(
     hass: HomeAssistant,
     config: ConfigType,
     async_add_entities: AddEntitiesCallback,
     discovery_info: DiscoveryInfoType | None = None,
 ) -> None:
-    """Set up the SAVANTAUDIO platform."""
-    _LOGGER.info(f'media_player.async_setup_platform: {DOMAIN}')
-    known_zones = hass.data[DOMAIN].setdefault(KNOWN_ZONES, [])
-
-    devices: list[SavantAudioZone] = []
-
-    try:
-        host = config[CONF_HOST]
-        port = config.get(CONF_PORT, DEFAULT_PORT)
-        if host is None or port is None:
-            raise ConfigEntryError(f'missing host or port')
-
-        switch = sa.Switch(host=host, port=port)
-        try:
-            await switch.connect()
-        except:
-            raise HomeAssistantError
-
-        if switch.attributes['sn'] in KNOWN_HOSTS:
-            _LOGGER.info(f"Already added switch {switch.attributes['sn']} at {host}:{port}")
-            return
-
-        # add device for switch
-        device_registry = dr.async_get(hass)
-
-        device_registry.async_get_or_create(
-            config_entry_id=config_entry.entry_id,
-            identifiers={(DOMAIN, switch.attributes['sn'])},
-            manufacturer="Savant",
-            name=config[CONF_NAME],
-            model=str(switch.model),
-            sw_version=switch.attributes['fwrev'],
-            hw_version=switch.attributes['rev'],
+    """Import a switch configured on the media_player platform in YAML.
+
+    The switch is set up from the config entry the import creates, so it
+    gets the same connection handling as any other entry.
+    """
+    _LOGGER.debug("media_player.async_setup_platform: %s", DOMAIN)
+    _LOGGER.warning(
+        "Configuring %s on the media_player platform is deprecated; "
+        "the switch at %s is imported into a config entry",
+        DOMAIN,
+        config[CONF_HOST],
+    )
+    hass.async_create_task(
+        hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": SOURCE_IMPORT}, data=dict(config)
         )
+    )
 
-        if CONF_SOURCES in config:
-            sources = { int(source_id): extra[CONF_NAME] for source_id, extra in config[CONF_SOURCES].items() }
-        else:
-            sources = { n: f'Input {n}' for n in range(1,33) }
-        for entity_id, extra in config[CONF_ZONES].items():
-            if extra.get(CONF_ENABLED, True):
-                zonedevice = SavantAudioZone(
-                        switch,
-                        entity_id,
-                        sources,
-                        switch.output(int(extra[CONF_NUMBER])),
-                        extra[CONF_NAME],
-                        switch_name=config.get(CONF_NAME),
-                        default_source=extra.get(DEFAULT_SOURCE, None),
-                    )
-                known_zones.append(zonedevice)
-                devices.append(zonedevice)
-        KNOWN_HOSTS.append(switch.attributes['sn'])
-    except OSError:
-        _LOGGER.error("Unable to connect to Savant Audio Switch at %s:%d", host, port)
-    except:
-        raise
-    _LOGGER.info(f'media_player.async_setup_entry: {DOMAIN}: calling async_add_entities')
-    async_add_entities(devices, True)
-
-
-class SavantAudioZone(MediaPlayerEntity):
+
+class SavantAudioZone(CoordinatorEntity[SavantAudioCoordinator], MediaPlayerEntity):
     """Representation of an SAVANTAUDIO device."""
 
     _attr_supported_features = SUPPORT_SAVANTAUDIO
 
     def __init__(
         self,
-        switch,
+        coordinator: SavantAudioCoordinator,
         entity_id,
         sources,
         output,
@@ -286,16 +313,12 @@ class SavantAudioZone(MediaPlayerEntity):
         default_source: int = None
     ):
         """Initialize the SAVANTAUDIO Receiver."""
+        super().__init__(coordinator)
+        switch = coordinator.switch
         self._switch = switch
+        self._store = switch.state
         self._output = output
         self.entity_id = f'media_player.{entity_id}'
-        async def _output_updated(event: str, obj):
-            if event == 'output-updated' and obj.number == self._output.number:
-                await self._sync_output()
-            elif event == 'link-updated' and obj[1] == self._output.number:
-                await self._sync_link()
-
-        self._switch.add_callback(_output_updated)
         self._switch_name = switch_name if switch_name is not None else f'{switch.model}'
         self._default_source = default_source
 
@@ -311,11 +334,14 @@ class SavantAudioZone(MediaPlayerEntity):
         if sources is None:
             sources = DEFAULT_SOURCES
         self.set_sources(sources)
-        self._current_source = None
-        self._attributes = {}
-        self._volume = 0
-        self._mute = False
-        self._pwstate = STATE_OFF
+        # values sent to the switch but not confirmed yet, the command (a
+        # token) that sent each, and the rollback timer of each command
+        self._expected = {}
+        self._expected_by = {}
+        self._rollbacks = {}
+        self._selected_source = None
+        # fingerprint of the state last written to HA
+        self._published = None
 
     def set_sources(self, sources):
         self._source_list = list(sources.values())
@@ -325,35 +351,193 @@ class SavantAudioZone(MediaPlayerEntity):
     def set_name(self, name: str):
         self._attr_name = name
 
-    async def _sync_link(self):
-        self._current_source = await self._switch.get_link(self._output.number)
-        if self._current_source is not None:
-            self._pwstate = STATE_ON
-        else:
-            self._pwstate = STATE_OFF
-            # self._attributes.pop(ATTR_PASSTHRU, None)
-            # self._attributes.pop(ATTR_STEREO, None)
-            # self._attributes.pop(ATTR_DELAY_LEFT, None)
-            # self._attributes.pop(ATTR_DELAY_RIGHT, None)
+    def set_default_source(self, default_source: int | None):
+        self._default_source = default_source
 
-    async def _sync_output(self):
-        volume_raw = self._output.volume
-        self._mute = self._output.mute
+    @property
+    def source_mapping(self):
+        return self._source_mapping
+
+    def _confirm(self, **actual):
+        for field, value in actual.items():
+            if field in self._expected and self._expected[field] == value:
+                del self._expected[field]
+                del self._expected_by[field]
+        self._cancel_settled_rollbacks()
+
+    def _cancel_settled_rollbacks(self):
+        """Cancel the timers of commands that have no values left to confirm."""
+        waiting = set(self._expected_by.values())
+        for token in [token for token in self._rollbacks if token not in waiting]:
+            self._rollbacks.pop(token)()
+
+    def _sync(self):
+        """Drop the expected values the switch has confirmed."""
+        if not self._expected:
+            return
+        store = self._store
+        number = self._output.number
+        self._confirm(**{
+            SOURCE: store.source(number),
+            VOLUME: store.volume[number],
+            MUTE: bool(store.mute[number]),
+            STEREO: bool(store.stereo[number]),
+            PASSTHRU: bool(store.passthru[number]),
+        })
+
+    @callback
+    def async_expect(self, **expected) -> object:
+        """Show the expected state now and roll back unless the switch confirms it.
+
+        Return a token for the command; only the values it set are rolled
+        back, and none that a later command set again.
+        """
+        token = object()
+        self._expected.update(expected)
+        for field in expected:
+            self._expected_by[field] = token
+        self._rollbacks[token] = async_call_later(
+            self.hass, CONFIRM_TIMEOUT, partial(self._async_rollback, token)
+        )
+        self._cancel_settled_rollbacks()
+        self.async_confirm()
+        return token
+
+    @callback
+    def async_expect_change(self, change: OutputChange) -> object:
+        """Expect the result of a change to our output."""
+        expected = {}
+        if change.source is not None:
+            expected[SOURCE] = change.source or None
+        if change.volume is not None:
+            expected[VOLUME] = change.volume
+        if change.mute is not None:
+            expected[MUTE] = change.mute
+        if change.stereo is not None:
+            expected[STEREO] = change.stereo
+        if change.passthru is not None:
+            expected[PASSTHRU] = change.passthru
+        return self.async_expect(**expected)
+
+    def _fingerprint(self) -> tuple:
+        """Return everything the published state is built from."""
+        number = self._output.number
+        return (
+            self.available,
+            self.name,
+            self._source_list,
+            self.current_source,
+            self._selected_source,
+            self._volume_raw,
+            self.is_volume_muted,
+            self._stereo,
+            self._passthru,
+            self._store.delay_left[number],
+            self._store.delay_right[number],
+        )
 
-        # savant volume is between -38dB and 0dB
-        self._volume = (volume_raw + 38.0) / 38.0
+    @callback
+    def async_confirm(self) -> None:
+        """Check the expected state against the switch and publish it.
 
-        self._attributes[ATTR_PASSTHRU] = self._output.passthru
-        self._attributes[ATTR_STEREO] = self._output.stereo
-        self._attributes[ATTR_DELAY_LEFT] = self._output.delay[0]
-        self._attributes[ATTR_DELAY_RIGHT] = self._output.delay[1]
+        Nothing is written when the state is the same as the last one that
+        was published; those writes are only counted.
+        """
+        self._sync()
+        if self.hass is None:
+            return
+        fingerprint = self._fingerprint()
+        if fingerprint == self._published:
+            self._switch.metrics.suppressed_writes += 1
+            return
+        self._published = fingerprint
+        self._switch.metrics.state_writes += 1
+        self.async_write_ha_state()
+
+    @callback
+    def _async_rollback(self, token: object, _now=None) -> None:
+        """Drop the values of a command the switch did not confirm in time."""
+        if (cancel := self._rollbacks.pop(token, None)) is not None and _now is None:
+            # called directly when the command failed, before the timer fired
+            cancel()
+        fields = [field for field, by in self._expected_by.items() if by is token]
+        if not fields:
+            return
+        _LOGGER.error(
+            "%s: switch at %s did not confirm %s, rolling back",
+            self.entity_id,
+            self._switch.host,
+            ", ".join(f"{field}={self._expected[field]}" for field in fields),
+        )
+        for field in fields:
+            del self._expected[field]
+            del self._expected_by[field]
+        self.async_confirm()
+        self.hass.async_create_task(self.coordinator.async_request_refresh())
+
+    async def _async_command(self, command: Awaitable, **expected) -> None:
+        """Send a command with an optimistic update of the expected state."""
+        token = self.async_expect(**expected)
+        try:
+            with use_priority(context_priority(self._context)):
+                await command
+        except SwitchTimeoutError as err:
+            self._async_rollback(token)
+            raise SavantAudioTimeoutError(f"{TIMEOUT_MESSAGE} {err}") from err
+        except (OSError, ValueError) as err:
+            self._async_rollback(token)
+            raise HomeAssistantError(
+                f'Command to switch at {self._switch.host} failed: {err}'
+            ) from err
+        # the reply was parsed already; no event is raised if nothing changed
+        self.async_confirm()
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the events of our output and make the zone known.
+
+        Services find zones by entity id; the one of the registry is only
+        known now and may differ from the one set in __init__ if the user
+        renamed the entity.
+        """
+        await super().async_added_to_hass()
+        self.hass.data[DOMAIN].setdefault(KNOWN_ZONES, {})[self.entity_id] = self
+        # the state is written once the entity has been added
+        self._published = self._fingerprint()
+        self.async_on_remove(
+            self.coordinator.dispatcher.async_add_output_listener(
+                self._output.number, self._async_switch_event
+            )
+        )
 
-    async def async_update(self):
-        """Get the latest state from the device."""
-        await self._output.refresh()
-        await self._switch.refresh_link(self._output.number)
-        await self._sync_output()
-        await self._sync_link()
+    async def async_will_remove_from_hass(self) -> None:
+        """Drop the pending rollbacks and forget the zone."""
+        await super().async_will_remove_from_hass()
+        known_zones = self.hass.data[DOMAIN].get(KNOWN_ZONES, {})
+        if known_zones.get(self.entity_id) is self:
+            del known_zones[self.entity_id]
+        for cancel in self._rollbacks.values():
+            cancel()
+        self._rollbacks.clear()
+
+    @callback
+    def _async_switch_event(self, event: str, obj) -> None:
+        """Publish an output or link change pushed by the switch."""
+        if self.coordinator.refreshing:
+            # published once, when the sweep is done
+            return
+        if self._store.pop_change(self._output.number) or self._expected:
+            self.async_confirm()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Publish the state read by the last refresh, if it changed."""
+        if (
+            self._store.pop_change(self._output.number)
+            or self._expected
+            or self._published is None
+            or self._published[0] != self.available
+        ):
+            self.async_confirm()
 
     @property
     def device_info(self):
@@ -378,26 +562,39 @@ class SavantAudioZone(MediaPlayerEntity):
     def number(self):
         return self._output.number
 
+    @property
+    def current_source(self) -> int | None:
+        """Return the input linked to our output, or None when off."""
+        return self._expected.get(SOURCE, self._store.source(self._output.number))
+
+    @property
+    def _volume_raw(self) -> int:
+        return self._expected.get(VOLUME, self._store.volume[self._output.number])
+
     @property
     def state(self):
         """Return the state of the device."""
-        return self._pwstate
+        return STATE_OFF if self.current_source is None else STATE_ON
 
     @property
     def volume_level(self):
         """Return the volume level of the media player (0..1)."""
-        return self._volume
+        # savant volume is between -38dB and 0dB
+        return (self._volume_raw + 38.0) / 38.0
 
     @property
     def is_volume_muted(self):
         """Return boolean indicating mute status."""
-        return self._mute
+        return self._expected.get(MUTE, bool(self._store.mute[self._output.number]))
 
     @property
     def source(self):
         """Return the current source source of the device."""
-        if self._current_source is not None:
-            return self._source_mapping[self._current_source]
+        source = self.current_source
+        if source is None:
+            source = self._selected_source
+        if source is not None:
+            return self._source_mapping.get(source)
         else:
             return None
 
@@ -406,19 +603,33 @@ class SavantAudioZone(MediaPlayerEntity):
         """List of available source sources."""
         return self._source_list
 
+    @property
+    def _stereo(self) -> bool:
+        return self._expected.get(STEREO, bool(self._store.stereo[self._output.number]))
+
+    @property
+    def _passthru(self) -> bool:
+        return self._expected.get(PASSTHRU, bool(self._store.passthru[self._output.number]))
+
     @property
     def extra_state_attributes(self):
         """Return device specific state attributes."""
-        return self._attributes
+        number = self._output.number
+        return {
+            ATTR_PASSTHRU: self._passthru,
+            ATTR_STEREO: self._stereo,
+            ATTR_DELAY_LEFT: self._store.delay_left[number],
+            ATTR_DELAY_RIGHT: self._store.delay_right[number],
+        }
 
     @property
     def sound_mode(self):
         modes = []
-        if self._output.stereo:
+        if self._stereo:
             modes.append('stereo')
         else:
             modes.append('mono')
-        if self._output.passthru: modes.append('passthru')
+        if self._passthru: modes.append('passthru')
         return ','.join(modes)
 
     @property
@@ -431,8 +642,9 @@ class SavantAudioZone(MediaPlayerEntity):
 
     async def async_turn_off(self):
         """Turn the media player off."""
-        await self._switch.unlink(self._output.number)
-        self._pwstate = STATE_OFF
+        await self._async_command(
+            self._switch.unlink(self._output.number), **{SOURCE: None}
+        )
 
     async def async_set_volume_level(self, volume):
         """
@@ -440,43 +652,61 @@ class SavantAudioZone(MediaPlayerEntity):
 
         For the switch, the actual volume level is -38..0
         """
-        await self._output.set_volume(int(volume * 38.0 - 38.0))
+        await self._async_set_volume_raw(int(volume * 38.0 - 38.0))
 
     async def async_volume_up(self):
         """Increase volume by 1 step."""
-        if self._output.volume < 0:
-            await self._output.set_volume(self._output.volume + 1)
+        volume_raw = self._volume_raw
+        if volume_raw < 0:
+            await self._async_set_volume_raw(volume_raw + 1)
 
     async def async_volume_down(self):
         """Decrease volume by 1 step."""
-        if self._output.volume > 38:
-            await self._output.set_volume(self._output.volume - 1)
+        volume_raw = self._volume_raw
+        if volume_raw > -38:
+            await self._async_set_volume_raw(volume_raw - 1)
+
+    async def _async_set_volume_raw(self, volume_raw: int):
+        # wait for the coalesced write that carries this value, so its
+        # failure reaches the caller
+        with use_priority(context_priority(self._context)):
+            written = self.coordinator.coalescer.async_set_volume(
+                self._output.number, volume_raw
+            )
+        await self._async_command(written, **{VOLUME: volume_raw})
 
     async def async_mute_volume(self, mute):
         """Mute (true) or unmute (false) media player."""
-        await self._output.set_mute(mute)
+        with use_priority(context_priority(self._context)):
+            written = self.coordinator.coalescer.async_set_mute(self._output.number, mute)
+        await self._async_command(written, **{MUTE: mute})
 
     async def async_turn_on(self):
         """Turn the media player on."""
-        if self._pwstate == STATE_OFF:
-            if self._current_source is not None:
-                await self._switch.link(self._output.number, self._current_source)
-            elif self._default_source is not None:
-                await self._switch.link(self._output.number, self._default_source)
-                self._current_source = self._default_source
-            self._pwstate = STATE_ON
+        if self.state == STATE_OFF:
+            source = self._selected_source
+            if source is None:
+                source = self._default_source
+            if source is not None:
+                await self._async_command(
+                    self._switch.link(self._output.number, source), **{SOURCE: source}
+                )
 
     async def async_select_source(self, source):
         """Set the source source."""
         if source is not None:
             if source in self._source_list:
                 source = self._reverse_mapping[source]
-            self._current_source = source
-            if self._pwstate == STATE_ON:
-                await self._switch.link(self._output.number, source)
+            self._selected_source = source
+            if self.state == STATE_ON:
+                await self._async_command(
+                    self._switch.link(self._output.number, source), **{SOURCE: source}
+                )
         else:
-            await self._switch.unlink(self._output.number)
-            self._current_source = None
+            self._selected_source = None
+            await self._async_command(
+                self._switch.unlink(self._output.number), **{SOURCE: None}
+            )
 
     async def async_select_sound_mode(self, sound_mode: str):
         """Set the sound mode."""
@@ -489,27 +719,100 @@ class SavantAudioZone(MediaPlayerEntity):
                 stereo = False
             elif m == 'passthru':
                 passthru = True
-        await self._output.set_mono(~stereo)
-        await self._output.set_passthru(passthru)
 
-    async def async_join_players(self, group_members: list[str]) -> None:
-        """Join `group_members` as a player group with the current player."""
-        zone_ids = {
-            p.entity_id: p for p in self.hass.data[DOMAIN][KNOWN_ZONES]
+        async def _set_sound_mode():
+            await self._output.set_mono(not stereo)
+            await self._output.set_passthru(passthru)
+
+        await self._async_command(
+            _set_sound_mode(), **{STEREO: stereo, PASSTHRU: passthru}
+        )
+
+    def output_change(self, data: dict) -> OutputChange:
+        """Translate media player attributes into a change for our output."""
+        change = OutputChange(self._output.number)
+        if ATTR_INPUT_SOURCE in data:
+            source = data[ATTR_INPUT_SOURCE]
+            if source is None:
+                change.source = 0
+            else:
+                change.source = self._reverse_mapping.get(source)
+                if change.source is None:
+                    raise HomeAssistantError(f'Unknown source {source} for {self.entity_id}')
+        if ATTR_MEDIA_VOLUME_LEVEL in data:
+            change.volume = int(data[ATTR_MEDIA_VOLUME_LEVEL] * 38.0 - 38.0)
+        if ATTR_MEDIA_VOLUME_MUTED in data:
+            change.mute = data[ATTR_MEDIA_VOLUME_MUTED]
+        return change
+
+    def preset_state(self) -> dict:
+        """Return the routing, volume, mute and mode of our output."""
+        return {
+            SOURCE: self.current_source,
+            VOLUME: self._volume_raw,
+            MUTE: self.is_volume_muted,
+            STEREO: self._stereo,
+            PASSTHRU: self._passthru,
         }
 
+    def preset_change(self, preset: dict) -> OutputChange | None:
+        """Return the change that restores a preset_state, or None if nothing differs."""
+        current = self.preset_state()
+        diff = {
+            field: value
+            for field, value in preset.items()
+            if field in current and current[field] != value
+        }
+        if not diff:
+            return None
+        if SOURCE in diff:
+            diff[SOURCE] = diff[SOURCE] or 0
+        return OutputChange(self._output.number, **diff)
+
+    async def async_join_players(self, group_members: list[str]) -> None:
+        """Join `group_members` as a player group with the current player.
+
+        Members on other switches are reached through the configured tie
+        lines; all link commands go out in one batch per switch.
+        """
+        data = self.hass.data[DOMAIN]
+        known_zones = data[KNOWN_ZONES]
+        if (source := self.current_source) is None:
+            _LOGGER.info("%s has no source. Not syncing", self.entity_id)
+            return
+
+        members = []
         for other_player in group_members:
-            if other := zone_ids.get(other_player) and other._switch.host == self._switch.host:
-                await other.async_select_source(self.source)
+            if (other := known_zones.get(other_player)) is not None:
+                members.append(other)
             else:
                 _LOGGER.info(
                     "Could not find player_id for %s. Not syncing", other_player
                 )
+        plan = plan_route(
+            data.get(TIE_LINES) or TieLineMap(),
+            data.get(KNOWN_HOSTS, {}).values(),
+            self._switch,
+            source,
+            {other.switch for other in members},
+        )
+        changes = []
+        for other in members:
+            if (input := plan.inputs.get(other.switch)) is None:
+                _LOGGER.info(
+                    "No tie line reaches the switch of %s. Not syncing", other.entity_id
+                )
+                continue
+            changes.append((other, OutputChange(other.number, source=input)))
+        with use_priority(context_priority(self._context)):
+            await async_apply_changes(self.hass, changes, plan.links)
 
     async def async_unjoin_player(self) -> None:
         """Remove this player from any group."""
-        await self._switch.unlink(self._output.number)
-        self._current_source = None
+        self._selected_source = None
+        await self._async_command(
+            self._switch.unlink(self._output.number), **{SOURCE: None}
+        )
 
     @property
     def icon(self):
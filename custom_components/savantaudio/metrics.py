@@ -0,0 +1,178 @@
+"""Command metrics for Savant Audio Switches."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter, deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+import re
+import time
+from typing import Any
+
+# upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+# window over which the event rate is reported, in seconds
+EVENT_WINDOW = 60
+
+LINK = "link"
+UNLINK = "unlink"
+GET_LINK = "get_link"
+SET_VOLUME = "set_volume"
+SET_MUTE = "set_mute"
+REFRESH = "refresh"
+BATCH = "batch"
+POLL = "poll"
+OTHER = "other"
+
+_OPERATIONS = (
+    (re.compile(r"switch-set\d+\.(disconnect|0)$"), UNLINK),
+    (re.compile(r"switch-set"), LINK),
+    (re.compile(r"switch-get"), GET_LINK),
+    (re.compile(r"aoutput-vol-set"), SET_VOLUME),
+    (re.compile(r"aoutput-mute-set"), SET_MUTE),
+    (re.compile(r"[a-z\-]+-get|fwrev$|fpga-rev$|status$"), REFRESH),
+)
+
+
+def command_operation(command: str) -> str:
+    """Return the operation a protocol command is counted under."""
+    for pattern, operation in _OPERATIONS:
+        if pattern.match(command):
+            return operation
+    return OTHER
+
+
+class LatencyHistogram:
+    """Latency distribution in fixed buckets; cheap enough for every command."""
+
+    __slots__ = ("buckets", "count", "total", "max", "last")
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add one sample."""
+        ms = seconds * 1000
+        self.buckets[bisect_left(LATENCY_BUCKETS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.last = ms
+        if ms > self.max:
+            self.max = ms
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean latency in milliseconds."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the upper bound of the bucket holding a percentile, in ms."""
+        if not self.count:
+            return None
+        rank = pct / 100 * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        labels = [f"<={bound}ms" for bound in LATENCY_BUCKETS] + [
+            f">{LATENCY_BUCKETS[-1]}ms"
+        ]
+        return {
+            "count": self.count,
+            "mean_ms": self.mean,
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "max_ms": self.max,
+            "last_ms": self.last,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class SwitchMetrics:
+    """Timings and counters of the traffic with one switch."""
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.latency: dict[str, LatencyHistogram] = {}
+        self.errors: Counter[str] = Counter()
+        # errors that were timeouts, also counted in errors
+        self.timeouts: Counter[str] = Counter()
+        self.pending = 0
+        self.max_pending = 0
+        self.events = 0
+        self._event_times: deque[float] = deque()
+        # zone state writes made and skipped because nothing had changed
+        self.state_writes = 0
+        self.suppressed_writes = 0
+
+    @contextmanager
+    def measure(self, operation: str, queued: bool = True) -> Iterator[None]:
+        """Time an operation.
+
+        Queued operations (commands and batches) count as pending while they
+        wait for the connection and run; the pending count is the queue depth.
+        """
+        if queued:
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+        start = time.monotonic()
+        try:
+            yield
+        except TimeoutError:
+            self.errors[operation] += 1
+            self.timeouts[operation] += 1
+            raise
+        except BaseException:
+            self.errors[operation] += 1
+            raise
+        else:
+            if (histogram := self.latency.get(operation)) is None:
+                histogram = self.latency[operation] = LatencyHistogram()
+            histogram.record(time.monotonic() - start)
+        finally:
+            if queued:
+                self.pending -= 1
+
+    def record_event(self) -> None:
+        """Count an event raised by the switch."""
+        now = time.monotonic()
+        self.events += 1
+        self._event_times.append(now)
+        while self._event_times[0] < now - EVENT_WINDOW:
+            self._event_times.popleft()
+
+    @property
+    def event_rate(self) -> float:
+        """Return the events per minute over the last EVENT_WINDOW."""
+        cutoff = time.monotonic() - EVENT_WINDOW
+        while self._event_times and self._event_times[0] < cutoff:
+            self._event_times.popleft()
+        return len(self._event_times) * 60 / EVENT_WINDOW
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all metrics for diagnostics."""
+        return {
+            "latency": {
+                operation: histogram.as_dict()
+                for operation, histogram in sorted(self.latency.items())
+            },
+            "errors": dict(self.errors),
+            "timeouts": dict(self.timeouts),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "events": self.events,
+            "events_per_minute": self.event_rate,
+            "state_writes": self.state_writes,
+            "suppressed_writes": self.suppressed_writes,
+        }
@@ -0,0 +1,22 @@
+"""Runtime data for the Savant Audio integration."""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .coordinator import SavantAudioCoordinator
+
+if TYPE_CHECKING:
+    from .media_player import SavantAudioZone
+
+
+@dataclass
+class SavantAudioEntryData:
+    """Runtime data of one config entry."""
+
+    coordinator: SavantAudioCoordinator
+    # set by the media_player platform, which adds zones on option changes
+    async_add_entities: AddEntitiesCallback | None = None
+    zones: dict[int, SavantAudioZone] = field(default_factory=dict)
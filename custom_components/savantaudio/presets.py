@@ -0,0 +1,43 @@
+"""Persistent presets of Savant Audio zones."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_VERSION = 1
+
+
+class PresetStore:
+    """Named snapshots of the routing, volume, mute and mode of zones.
+
+    A preset maps entity ids to the preset_state of their zones.  Zones are
+    stored by entity id and sources by input number, so a preset survives
+    renaming the sources.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.presets"
+        )
+        self._presets: dict[str, dict[str, dict[str, Any]]] | None = None
+
+    async def async_load(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Return all presets, loading them on first use."""
+        if self._presets is None:
+            self._presets = (await self._store.async_load() or {}).get("presets", {})
+        return self._presets
+
+    async def async_get(self, name: str) -> dict[str, dict[str, Any]] | None:
+        """Return a preset, or None if there is none by that name."""
+        return (await self.async_load()).get(name)
+
+    async def async_set(self, name: str, zones: dict[str, dict[str, Any]]) -> None:
+        """Store a preset, replacing any preset by that name."""
+        presets = await self.async_load()
+        presets[name] = zones
+        await self._store.async_save({"presets": presets})
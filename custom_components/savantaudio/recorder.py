@@ -0,0 +1,12 @@
+"""Integration platform for recorder."""
+from __future__ import annotations
+
+from homeassistant.core import HomeAssistant, callback
+
+from .sensor import UNRECORDED_ATTRIBUTES
+
+
+@callback
+def exclude_attributes(hass: HomeAssistant) -> set[str]:
+    """Exclude the latency histograms of the sensors from being recorded."""
+    return set(UNRECORDED_ATTRIBUTES)
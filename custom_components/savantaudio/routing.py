@@ -0,0 +1,195 @@
+"""Routing of sources across cascaded Savant Audio Switches."""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+import heapq
+import itertools
+import logging
+from typing import Any
+
+from homeassistant.const import CONF_HOST, CONF_PORT
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+from .client import OutputChange, SavantSwitch
+from .const import DEFAULT_PORT
+
+_LOGGER = logging.getLogger(__name__)
+
+CONF_FROM = "from"
+CONF_TO = "to"
+CONF_INPUT = "input"
+CONF_OUTPUT = "output"
+
+# a tie line that already carries another source is only taken over when no
+# idle tie line reaches the switch
+BUSY_COST = 1000
+
+TIE_LINE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_FROM): vol.Schema(
+            {
+                vol.Required(CONF_HOST): cv.string,
+                vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+                vol.Required(CONF_OUTPUT): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+            }
+        ),
+        vol.Required(CONF_TO): vol.Schema(
+            {
+                vol.Required(CONF_HOST): cv.string,
+                vol.Optional(CONF_PORT, default=DEFAULT_PORT): cv.port,
+                vol.Required(CONF_INPUT): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+            }
+        ),
+    }
+)
+
+
+def switch_key(host: str, port: int) -> str:
+    """Return the key of the switch at host:port."""
+    return f"{host}:{port}"
+
+
+@dataclass(frozen=True)
+class TieLine:
+    """An output of one switch wired to an input of another."""
+
+    source: str
+    output: int
+    target: str
+    input: int
+
+
+class TieLineMap:
+    """The tie lines between the switches of an installation."""
+
+    def __init__(self, tie_lines: Iterable[TieLine] = ()) -> None:
+        """Initialize the map."""
+        self._feeding: dict[tuple[str, int], TieLine] = {}
+        self._leaving: dict[str, list[TieLine]] = {}
+        for tie_line in tie_lines:
+            self._feeding[(tie_line.target, tie_line.input)] = tie_line
+            self._leaving.setdefault(tie_line.source, []).append(tie_line)
+
+    @classmethod
+    def from_config(cls, config: list[dict[str, Any]]) -> TieLineMap:
+        """Build the map from validated TIE_LINE_SCHEMA items."""
+        return cls(
+            TieLine(
+                switch_key(item[CONF_FROM][CONF_HOST], item[CONF_FROM][CONF_PORT]),
+                item[CONF_FROM][CONF_OUTPUT],
+                switch_key(item[CONF_TO][CONF_HOST], item[CONF_TO][CONF_PORT]),
+                item[CONF_TO][CONF_INPUT],
+            )
+            for item in config
+        )
+
+    def __len__(self) -> int:
+        """Return the number of tie lines."""
+        return len(self._feeding)
+
+    def feeding(self, target: str, input: int) -> TieLine | None:
+        """Return the tie line wired to an input, if any."""
+        return self._feeding.get((target, input))
+
+    def leaving(self, source: str) -> list[TieLine]:
+        """Return the tie lines wired to outputs of a switch."""
+        return self._leaving.get(source, [])
+
+
+@dataclass
+class RoutePlan:
+    """Link commands that put one source on a set of switches.
+
+    inputs holds the input that carries the source on every reachable
+    switch, links the tie line outputs to link per switch.
+    """
+
+    inputs: dict[SavantSwitch, int] = field(default_factory=dict)
+    links: dict[SavantSwitch, list[OutputChange]] = field(default_factory=dict)
+
+
+def plan_route(
+    tie_lines: TieLineMap,
+    switches: Iterable[SavantSwitch],
+    switch: SavantSwitch,
+    source: int,
+    targets: Iterable[SavantSwitch],
+) -> RoutePlan:
+    """Plan the cheapest routing of input `source` of `switch` to `targets`.
+
+    When the input is itself fed by a tie line, the source is followed
+    upstream first, so zones on the upstream switches link to the origin
+    directly.  The route is a shortest path tree over the tie lines, where
+    a tie line already carrying the source is free and an idle one costs one
+    link command.  Targets that no tie line reaches are left out of the plan.
+    """
+    by_key = {switch_key(s.host, s.port): s for s in switches}
+    key = switch_key(switch.host, switch.port)
+    by_key[key] = switch
+
+    # follow the source upstream to the switch it originates from
+    seen = {key}
+    while (tie_line := tie_lines.feeding(key, source)) is not None:
+        upstream = by_key.get(tie_line.source)
+        if upstream is None or tie_line.source in seen:
+            break
+        if (upstream_source := upstream.state.source(tie_line.output)) is None:
+            break
+        key, source = tie_line.source, upstream_source
+        seen.add(key)
+
+    # Dijkstra over the switches; carried is the input holding the source
+    cost = {key: 0}
+    carried = {key: source}
+    via: dict[str, TieLine] = {}
+    done: set[str] = set()
+    counter = itertools.count()
+    queue = [(0, next(counter), key)]
+    while queue:
+        distance, _, current = heapq.heappop(queue)
+        if current in done:
+            continue
+        done.add(current)
+        state = by_key[current].state
+        for tie_line in tie_lines.leaving(current):
+            if tie_line.target not in by_key or tie_line.target in done:
+                continue
+            linked = state.source(tie_line.output)
+            if linked == carried[current]:
+                step = 0
+            elif linked is None:
+                step = 1
+            else:
+                step = BUSY_COST
+            if distance + step < cost.get(tie_line.target, distance + step + 1):
+                cost[tie_line.target] = distance + step
+                carried[tie_line.target] = tie_line.input
+                via[tie_line.target] = tie_line
+                heapq.heappush(queue, (distance + step, next(counter), tie_line.target))
+
+    plan = RoutePlan()
+    used: set[TieLine] = set()
+    for target in targets:
+        target_key = switch_key(target.host, target.port)
+        if target_key not in carried:
+            continue
+        plan.inputs[target] = carried[target_key]
+        # walk back to the origin, adding every tie line not linked yet
+        while (tie_line := via.get(target_key)) is not None and tie_line not in used:
+            used.add(tie_line)
+            upstream = by_key[tie_line.source]
+            if upstream.state.source(tie_line.output) != carried[tie_line.source]:
+                if upstream.state.source(tie_line.output) is not None:
+                    _LOGGER.info(
+                        "Taking over tie line %s output %d for input %d",
+                        tie_line.source,
+                        tie_line.output,
+                        carried[tie_line.source],
+                    )
+                plan.links.setdefault(upstream, []).append(
+                    OutputChange(tie_line.output, source=carried[tie_line.source])
+                )
+            target_key = tie_line.source
+    return plan
@@ -0,0 +1,145 @@
+"""Prioritized, rate-limited access to the connection of a switch."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+import heapq
+import itertools
+import time
+
+from homeassistant.core import Context, callback
+
+from .const import DEFAULT_COMMAND_BURST, DEFAULT_COMMAND_RATE
+
+
+class Priority(IntEnum):
+    """Priority classes of commands, most urgent first."""
+
+    INTERACTIVE = 0
+    AUTOMATION = 1
+    BACKGROUND = 2
+
+
+# priority of the commands sent from the current task; code that runs on
+# behalf of an automation or a background job sets it around its calls
+command_priority: ContextVar[Priority] = ContextVar(
+    "command_priority", default=Priority.INTERACTIVE
+)
+
+
+@contextmanager
+def use_priority(priority: Priority) -> Iterator[None]:
+    """Send the commands of the enclosed code with `priority`."""
+    token = command_priority.set(priority)
+    try:
+        yield
+    finally:
+        command_priority.reset(token)
+
+
+def context_priority(context: Context | None) -> Priority:
+    """Return the priority of commands caused by a service call.
+
+    Calls made by a user from the UI carry their user id; automations and
+    scripts do not.
+    """
+    if context is not None and context.user_id is not None:
+        return Priority.INTERACTIVE
+    return Priority.AUTOMATION
+
+
+class CommandDropped(ConnectionError):
+    """Raised to a queued command that was dropped before it was sent."""
+
+
+class CommandScheduler:
+    """Hand out the connection of one switch, by priority and at a limited rate.
+
+    Only one holder talks to the switch at a time.  Waiters are served most
+    urgent first and in order within a class, so a user command waits for at
+    most the batch chunk in flight, not for a whole sweep.  A token bucket
+    of `burst` commands refilled at `rate` commands per second keeps the
+    command rate within what the switch sustains.
+    """
+
+    def __init__(
+        self, rate: float = DEFAULT_COMMAND_RATE, burst: int = DEFAULT_COMMAND_BURST
+    ) -> None:
+        """Initialize the scheduler."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._refilled = time.monotonic()
+        self._busy = False
+        self._waiters: list[tuple[Priority, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+
+    def set_rate(self, rate: float, burst: int) -> None:
+        """Change the command rate and the size of the bucket."""
+        self.rate = rate
+        self.burst = burst
+        self._tokens = min(self._tokens, burst)
+
+    @property
+    def waiting(self) -> dict[str, int]:
+        """Return the number of queued holders per priority class."""
+        counts = {priority.name.lower(): 0 for priority in Priority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                counts[priority.name.lower()] += 1
+        return counts
+
+    @asynccontextmanager
+    async def async_slot(
+        self, cost: int = 1, priority: Priority | None = None
+    ) -> AsyncIterator[None]:
+        """Wait for the connection, then for `cost` tokens, and hold it."""
+        if priority is None:
+            priority = command_priority.get()
+        if self._busy or self._waiters:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._order), future))
+            try:
+                await future
+            except asyncio.CancelledError:
+                # the slot may have been handed to us just before the cancel
+                if future.done() and not future.cancelled():
+                    self._release()
+                raise
+        else:
+            self._busy = True
+        try:
+            if (delay := self._take(min(cost, self.burst))) > 0:
+                await asyncio.sleep(delay)
+            yield
+        finally:
+            self._release()
+
+    def _take(self, cost: int) -> float:
+        """Take tokens and return how long to wait until they are paid for."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+        self._tokens -= cost
+        return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._busy = False
+
+    @callback
+    def async_drop(self, priority: Priority = Priority.BACKGROUND) -> int:
+        """Drop queued holders of `priority` and below; return how many."""
+        dropped = 0
+        for waiter_priority, _, future in self._waiters:
+            if waiter_priority >= priority and not future.done():
+                future.set_exception(CommandDropped("command dropped from the queue"))
+                dropped += 1
+        return dropped
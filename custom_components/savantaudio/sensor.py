@@ -0,0 +1,196 @@
+"""Diagnostic sensors for Savant Audio Switches."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import timedelta
+import logging
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import StateType
+
+from .const import DOMAIN, ENTRY_DATA
+from .coordinator import SavantAudioCoordinator
+from .metrics import GET_LINK, LINK, POLL, REFRESH, SET_VOLUME, UNLINK
+
+_LOGGER = logging.getLogger(__name__)
+
+# the metrics are kept in memory; the sensors only publish them this often
+SCAN_INTERVAL = timedelta(minutes=1)
+
+# attributes of the latency sensors that change with every command; they
+# are shown but not recorded, see recorder.py
+UNRECORDED_ATTRIBUTES = frozenset(
+    {"mean_ms", "p50_ms", "p99_ms", "max_ms", "last_ms", "buckets"}
+)
+
+
+@dataclass
+class SavantAudioSensorRequiredKeysMixin:
+    """Mixin for required keys."""
+
+    value_fn: Callable[[SavantAudioCoordinator], StateType]
+
+
+@dataclass
+class SavantAudioSensorEntityDescription(
+    SensorEntityDescription, SavantAudioSensorRequiredKeysMixin
+):
+    """Describes a Savant Audio diagnostic sensor."""
+
+    attributes_fn: Callable[[SavantAudioCoordinator], dict[str, Any]] | None = None
+
+
+def _latency_sensor(operation: str, name: str) -> SavantAudioSensorEntityDescription:
+    def _histogram(coordinator: SavantAudioCoordinator):
+        return coordinator.switch.metrics.latency.get(operation)
+
+    return SavantAudioSensorEntityDescription(
+        key=f"{operation}_latency",
+        name=name,
+        device_class=SensorDeviceClass.DURATION,
+        state_class=SensorStateClass.MEASUREMENT,
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        suggested_display_precision=1,
+        value_fn=lambda coordinator: (
+            histogram.mean if (histogram := _histogram(coordinator)) else None
+        ),
+        attributes_fn=lambda coordinator: (
+            histogram.as_dict() if (histogram := _histogram(coordinator)) else {}
+        ),
+    )
+
+
+SENSORS: tuple[SavantAudioSensorEntityDescription, ...] = (
+    _latency_sensor(LINK, "Link latency"),
+    _latency_sensor(UNLINK, "Unlink latency"),
+    _latency_sensor(SET_VOLUME, "Set volume latency"),
+    _latency_sensor(GET_LINK, "Get link latency"),
+    _latency_sensor(REFRESH, "Refresh latency"),
+    _latency_sensor(POLL, "Poll duration"),
+    SavantAudioSensorEntityDescription(
+        key="pending_commands",
+        name="Pending commands",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.switch.metrics.pending,
+        attributes_fn=lambda coordinator: {
+            "max_pending": coordinator.switch.metrics.max_pending
+        },
+    ),
+    SavantAudioSensorEntityDescription(
+        key="command_errors",
+        name="Command errors",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: sum(coordinator.switch.metrics.errors.values()),
+        attributes_fn=lambda coordinator: dict(coordinator.switch.metrics.errors),
+    ),
+    SavantAudioSensorEntityDescription(
+        key="command_timeouts",
+        name="Command timeouts",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: sum(coordinator.switch.metrics.timeouts.values()),
+        attributes_fn=lambda coordinator: dict(coordinator.switch.metrics.timeouts),
+    ),
+    SavantAudioSensorEntityDescription(
+        key="reconnects",
+        name="Reconnects",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda coordinator: coordinator.supervisor.reconnects,
+    ),
+    SavantAudioSensorEntityDescription(
+        key="event_rate",
+        name="Events",
+        native_unit_of_measurement="events/min",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda coordinator: coordinator.switch.metrics.event_rate,
+        attributes_fn=lambda coordinator: {
+            "total": coordinator.switch.metrics.events
+        },
+    ),
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    config_entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the diagnostic sensors of the switch of a config entry."""
+    entry_data = hass.data[DOMAIN].get(ENTRY_DATA, {}).get(config_entry.entry_id)
+    if entry_data is None:
+        # the media_player platform could not set up the switch
+        return
+    async_add_entities(
+        SavantAudioSensor(entry_data.coordinator, description)
+        for description in SENSORS
+    )
+
+
+class SavantAudioSensor(SensorEntity):
+    """A metric of the connection to a switch."""
+
+    entity_description: SavantAudioSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_has_entity_name = True
+    # published by a timer of our own, which skips the unchanged metrics
+    _attr_should_poll = False
+
+    def __init__(
+        self,
+        coordinator: SavantAudioCoordinator,
+        description: SavantAudioSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._coordinator = coordinator
+        sn = coordinator.switch.attributes["sn"]
+        self._attr_unique_id = f"{sn}_{description.key}"
+        self._attr_device_info = DeviceInfo(identifiers={(DOMAIN, sn)})
+        self._published: tuple[StateType, dict[str, Any]] | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Publish the metric every SCAN_INTERVAL, from the first state on."""
+        await self.async_update()
+        self.async_on_remove(
+            async_track_time_interval(self.hass, self._async_publish, SCAN_INTERVAL)
+        )
+
+    async def async_update(self) -> None:
+        """Read the metric; this does not talk to the switch."""
+        self._update()
+
+    def _update(self) -> bool:
+        """Read the metric and return whether anything that is recorded changed."""
+        description = self.entity_description
+        value = description.value_fn(self._coordinator)
+        attributes = {}
+        if description.attributes_fn is not None:
+            attributes = description.attributes_fn(self._coordinator)
+            self._attr_extra_state_attributes = attributes
+        self._attr_native_value = value
+        recorded = (
+            value,
+            {k: v for k, v in attributes.items() if k not in UNRECORDED_ATTRIBUTES},
+        )
+        if recorded == self._published:
+            return False
+        self._published = recorded
+        return True
+
+    @callback
+    def _async_publish(self, _now=None) -> None:
+        """Write the state, unless nothing that is recorded changed."""
+        if self._update():
+            self.async_write_ha_state()
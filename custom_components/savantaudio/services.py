@@ -0,0 +1,144 @@
+"""Services for the Savant Audio integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_NAME
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.exceptions import HomeAssistantError
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+from .client import OutputChange
+from .const import (
+    DOMAIN,
+    KNOWN_ZONES,
+    PRESETS,
+    SERVICE_BATCH,
+    SERVICE_RESTORE,
+    SERVICE_SNAPSHOT,
+)
+from .exceptions import SavantAudioTimeoutError, SwitchTimeoutError
+from .presets import PresetStore
+from .scheduler import context_priority, use_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+ATTR_CHANGES = "changes"
+
+CHANGE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ENTITY_ID): cv.entity_id,
+        vol.Optional(ATTR_INPUT_SOURCE): vol.Any(None, cv.string),
+        vol.Optional(ATTR_MEDIA_VOLUME_LEVEL): cv.small_float,
+        vol.Optional(ATTR_MEDIA_VOLUME_MUTED): cv.boolean,
+    }
+)
+
+BATCH_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_CHANGES): vol.All(cv.ensure_list, [CHANGE_SCHEMA])}
+)
+
+SNAPSHOT_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Required(ATTR_ENTITY_ID): cv.entity_ids,
+    }
+)
+
+RESTORE_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_NAME): cv.string,
+        vol.Optional(ATTR_ENTITY_ID): cv.entity_ids,
+    }
+)
+
+
+async def async_apply_changes(
+    hass: HomeAssistant, changes: list[tuple], links: dict | None = None
+) -> None:
+    """Apply (zone, OutputChange) pairs, one pipelined batch per switch.
+
+    links maps switches to extra OutputChanges for outputs that are not
+    zones, like the tie lines of a route; they go out in the same batches.
+    """
+    batches: dict = {switch: list(batch) for switch, batch in (links or {}).items()}
+    for zone, change in changes:
+        zone.async_expect_change(change)
+        batches.setdefault(zone.switch, []).append(change)
+    results = await asyncio.gather(
+        *(switch.async_apply(batch) for switch, batch in batches.items()),
+        return_exceptions=True,
+    )
+    # publish every zone once the replies of all batches were parsed
+    for zone, _change in changes:
+        zone.async_confirm()
+    for switch, result in zip(batches, results):
+        if isinstance(result, SwitchTimeoutError):
+            raise SavantAudioTimeoutError(str(result)) from result
+        if isinstance(result, Exception):
+            raise HomeAssistantError(
+                f"Failed to update switch at {switch.host}:{switch.port}: {result}"
+            ) from result
+
+
+def _zone(hass: HomeAssistant, entity_id: str):
+    if (zone := hass.data[DOMAIN].get(KNOWN_ZONES, {}).get(entity_id)) is None:
+        raise HomeAssistantError(f"Unknown Savant zone: {entity_id}")
+    return zone
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration services."""
+    presets = hass.data[DOMAIN].setdefault(PRESETS, PresetStore(hass))
+
+    async def async_batch(call: ServiceCall) -> None:
+        changes = []
+        for item in call.data[ATTR_CHANGES]:
+            zone = _zone(hass, item[ATTR_ENTITY_ID])
+            changes.append((zone, zone.output_change(item)))
+        with use_priority(context_priority(call.context)):
+            await async_apply_changes(hass, changes)
+
+    async def async_snapshot(call: ServiceCall) -> None:
+        await presets.async_set(
+            call.data[ATTR_NAME],
+            {
+                entity_id: _zone(hass, entity_id).preset_state()
+                for entity_id in call.data[ATTR_ENTITY_ID]
+            },
+        )
+
+    async def async_restore(call: ServiceCall) -> None:
+        name = call.data[ATTR_NAME]
+        if (preset := await presets.async_get(name)) is None:
+            raise HomeAssistantError(f"Unknown Savant preset: {name}")
+        entity_ids = call.data.get(ATTR_ENTITY_ID, preset)
+        # only outputs that differ from the preset get commands
+        changes = []
+        for entity_id in entity_ids:
+            if entity_id not in preset:
+                raise HomeAssistantError(f"{entity_id} is not in preset {name}")
+            zone = hass.data[DOMAIN].get(KNOWN_ZONES, {}).get(entity_id)
+            if zone is None:
+                _LOGGER.warning("%s of preset %s is not available", entity_id, name)
+                continue
+            if (change := zone.preset_change(preset[entity_id])) is not None:
+                changes.append((zone, change))
+        _LOGGER.debug("Restoring preset %s: %d zones differ", name, len(changes))
+        with use_priority(context_priority(call.context)):
+            await async_apply_changes(hass, changes)
+
+    hass.services.async_register(DOMAIN, SERVICE_BATCH, async_batch, schema=BATCH_SCHEMA)
+    hass.services.async_register(
+        DOMAIN, SERVICE_SNAPSHOT, async_snapshot, schema=SNAPSHOT_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RESTORE, async_restore, schema=RESTORE_SCHEMA
+    )
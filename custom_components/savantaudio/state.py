@@ -0,0 +1,111 @@
+"""Compact state store for Savant Audio Switches."""
+from __future__ import annotations
+
+from array import array
+from typing import NamedTuple
+
+
+class OutputState(NamedTuple):
+    """State of one output as last reported by the switch."""
+
+    volume: int
+    mute: bool
+    stereo: bool
+    passthru: bool
+    delay: tuple[int, int]
+
+
+class SwitchState:
+    """State of every output and the routing table of one switch.
+
+    Every field is a fixed-size array indexed by output number (slot 0 is
+    unused), and a bitmask records which outputs changed.  Writers set the
+    bit of an output only when a field actually changes; each zone clears
+    its own bit with pop_change when it publishes, so an HA state write only
+    happens for outputs whose state moved.
+    """
+
+    __slots__ = (
+        "size",
+        "volume",
+        "mute",
+        "stereo",
+        "passthru",
+        "delay_left",
+        "delay_right",
+        "link",
+        "changed",
+    )
+
+    def __init__(self, outputs: int) -> None:
+        """Initialize the store for outputs 1..outputs."""
+        self.size = outputs
+        slots = outputs + 1
+        self.volume = array("b", bytes(slots))
+        self.mute = array("B", bytes(slots))
+        self.stereo = array("B", b"\x01" * slots)
+        self.passthru = array("B", bytes(slots))
+        self.delay_left = array("H", bytes(2 * slots))
+        self.delay_right = array("H", bytes(2 * slots))
+        # linked input per output, 0 when disconnected
+        self.link = array("B", bytes(slots))
+        self.changed = 0
+
+    def set_output(self, number: int, state: OutputState) -> bool:
+        """Store the state of an output; return True if it changed."""
+        volume, mute, stereo, passthru, (left, right) = state
+        if (
+            self.volume[number] == volume
+            and self.mute[number] == mute
+            and self.stereo[number] == stereo
+            and self.passthru[number] == passthru
+            and self.delay_left[number] == left
+            and self.delay_right[number] == right
+        ):
+            return False
+        self.volume[number] = volume
+        self.mute[number] = mute
+        self.stereo[number] = stereo
+        self.passthru[number] = passthru
+        self.delay_left[number] = left
+        self.delay_right[number] = right
+        self.changed |= 1 << number
+        return True
+
+    def set_link(self, number: int, source: int | None) -> bool:
+        """Store the input linked to an output; return True if it changed."""
+        source = source or 0
+        if self.link[number] == source:
+            return False
+        self.link[number] = source
+        self.changed |= 1 << number
+        return True
+
+    def output(self, number: int) -> OutputState:
+        """Return the state of an output."""
+        return OutputState(
+            self.volume[number],
+            bool(self.mute[number]),
+            bool(self.stereo[number]),
+            bool(self.passthru[number]),
+            (self.delay_left[number], self.delay_right[number]),
+        )
+
+    def source(self, number: int) -> int | None:
+        """Return the input linked to an output, or None."""
+        return self.link[number] or None
+
+    @property
+    def links(self) -> dict[int, int]:
+        """Return the routing table as output -> input."""
+        return {
+            number: source for number, source in enumerate(self.link) if source
+        }
+
+    def pop_change(self, number: int) -> bool:
+        """Return whether an output changed since the last call, and reset it."""
+        bit = 1 << number
+        if not self.changed & bit:
+            return False
+        self.changed &= ~bit
+        return True
@@ -0,0 +1,76 @@
+"""Wire-level trace of the traffic with a Savant Audio Switch."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable
+import time
+from typing import Any, NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+# every record is truncated to these limits, so a trace of N records never
+# holds more than N * MAX_REPLIES * MAX_LINE characters of protocol text
+MAX_LINE = 80
+MAX_REPLIES = 8
+
+
+class TraceRecord(NamedTuple):
+    """One command and the replies it got."""
+
+    timestamp: float
+    command: str
+    replies: tuple[str, ...]
+    latency: float
+    error: str | None
+    batch: bool
+
+
+class WireTrace:
+    """Ring buffer of the last commands and replies exchanged with a switch."""
+
+    def __init__(self, size: int) -> None:
+        """Initialize the trace."""
+        self._records: deque[TraceRecord] = deque(maxlen=size)
+
+    @property
+    def size(self) -> int:
+        """Return the number of records kept."""
+        return self._records.maxlen
+
+    def record(
+        self,
+        command: str,
+        replies: Iterable[str],
+        started: float,
+        error: BaseException | None = None,
+        batch: bool = False,
+    ) -> None:
+        """Add a command sent at `started` (time.monotonic) and its replies."""
+        now = time.monotonic()
+        replies = tuple(reply[:MAX_LINE] for reply in replies)
+        if len(replies) > MAX_REPLIES:
+            replies = replies[:MAX_REPLIES] + (f"... {len(replies) - MAX_REPLIES} more",)
+        self._records.append(
+            TraceRecord(
+                time.time() - (now - started),
+                command[:MAX_LINE],
+                replies,
+                now - started,
+                None if error is None else repr(error)[:MAX_LINE],
+                batch,
+            )
+        )
+
+    def as_list(self) -> list[dict[str, Any]]:
+        """Return the records, oldest first, for diagnostics."""
+        return [
+            {
+                "time": dt_util.utc_from_timestamp(record.timestamp).isoformat(),
+                "command": record.command,
+                "replies": list(record.replies),
+                "latency_ms": round(record.latency * 1000, 3),
+                "error": record.error,
+                "batch": record.batch,
+            }
+            for record in self._records
+        ]
@@ -0,0 +1,318 @@
+"""Pipelined transport for the Savant Audio Switch protocol."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import suppress
+from dataclasses import dataclass, field
+import logging
+import re
+
+from .const import MAX_IN_FLIGHT, MAX_MISSED_REPLIES
+
+_LOGGER = logging.getLogger(__name__)
+
+SWITCH_COMMAND = re.compile(r"switch-(?:get|set)(\d+)")
+PORT_COMMAND = re.compile(r"(ainput|aoutput)-([a-z]+)-(?:get|set)(\d+)")
+
+
+def reply_prefixes(command: str) -> tuple[str, ...]:
+    """Return the prefixes of the reply lines a command is answered with."""
+    if m := SWITCH_COMMAND.match(command):
+        return (f"switch{m.group(1)}.",)
+    if m := PORT_COMMAND.match(command):
+        kind, key, number = m.groups()
+        if key.startswith("delay"):
+            # every delay command is answered with both channels
+            return (f"{kind}-delayleft{number}:", f"{kind}-delayright{number}:")
+        return (f"{kind}-{key}{number}:",)
+    # status, fwrev and fpga-rev are answered with a line starting with
+    # the command itself
+    return (command,)
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()
+
+
+@dataclass
+class _Request:
+    command: str
+    prefixes: tuple[str, ...]
+    future: asyncio.Future[list[str]]
+    lines: list[str] = field(default_factory=list)
+
+    def matches(self, line: str) -> bool:
+        return line == "err" or line.startswith(self.prefixes)
+
+
+class SwitchTransport:
+    """Connection to a switch that keeps several commands in flight.
+
+    Commands are written without waiting for the replies to the commands
+    before them.  A reader task owns the socket's read side: the switch
+    answers in order, each reply ending with an empty line, so a line
+    belongs to the oldest outstanding command if it is the reply that
+    command expects (same command kind and port number).  Any other line
+    is a notification the switch pushed on its own, even when an empty line
+    follows it; only a matched reply is ended by an empty line.
+
+    Every line, reply or not, is handed to `on_line` in the order it
+    arrived, so the state it carries is applied in wire order.
+
+    At most `window` commands are in flight; a write waits for room, so a
+    command written later never queues behind more than that on the switch.
+
+    A write may give its commands a deadline, counted from the write.  A
+    command past it fails with TimeoutError on its own and leaves the
+    window; its reply, should it still come, is read as stale and not
+    mistaken for the reply of a later command.  The connection is only
+    dropped when MAX_MISSED_REPLIES writes in a row time out.
+
+    The disconnect listeners are told when the switch closed the connection
+    or it was dropped after missed replies, so its owner can reconnect.
+    Only the first write opens the connection by itself; once it was open,
+    a write to a dropped connection fails right away with ConnectionError
+    until connect is called again.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        on_line: Callable[[str, bool], Awaitable[None]],
+        window: int = MAX_IN_FLIGHT,
+    ) -> None:
+        """Initialize the transport."""
+        self.window = window
+        self._host = host
+        self._port = port
+        self._on_line = on_line
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._pending: deque[_Request] = deque()
+        # commands that timed out, oldest first, and the one whose late
+        # reply is being read
+        self._stale: deque[_Request] = deque(maxlen=window)
+        self._stale_reply: _Request | None = None
+        self._deadlines: set[asyncio.TimerHandle] = set()
+        self._missed = 0
+        self._lock = asyncio.Lock()
+        self._room = asyncio.Event()
+        self._disconnect_listeners: list[Callable[[Exception], None]] = []
+        self._opened = False
+        # number of lines the switch pushed without being asked
+        self.pushes = 0
+
+    @property
+    def writer(self) -> asyncio.StreamWriter | None:
+        """Return the write side of the socket, or None when closed."""
+        return self._writer
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of commands waiting for their reply."""
+        return sum(not request.future.done() for request in self._pending)
+
+    def add_disconnect_listener(
+        self, listener: Callable[[Exception], None]
+    ) -> Callable[[], None]:
+        """Call listener when the connection drops; return a remover."""
+        self._disconnect_listeners.append(listener)
+
+        def remove_listener() -> None:
+            if listener in self._disconnect_listeners:
+                self._disconnect_listeners.remove(listener)
+
+        return remove_listener
+
+    async def connect(self) -> None:
+        """Open the connection if it is not open yet."""
+        async with self._lock:
+            await self._connect()
+
+    async def _connect(self) -> None:
+        if self._writer is not None:
+            return
+        _LOGGER.debug("Opening connection to %s:%d", self._host, self._port)
+        self._reader, self._writer = await asyncio.open_connection(self._host, self._port)
+        self._opened = True
+        self._reader_task = asyncio.get_running_loop().create_task(
+            self._async_read(self._reader)
+        )
+
+    async def close(self) -> None:
+        """Close the connection, failing the commands still in flight."""
+        writer = self._writer
+        self.abort(ConnectionResetError("connection closed"))
+        if writer is not None:
+            with suppress(OSError):
+                await writer.wait_closed()
+
+    def abort(self, err: Exception | None = None) -> None:
+        """Drop the connection without waiting; commands in flight fail with err."""
+        if (writer := self._writer) is None:
+            return
+        _LOGGER.debug("Closing connection to %s:%d", self._host, self._port)
+        self._reader = self._writer = None
+        if (task := self._reader_task) is not None and task is not asyncio.current_task():
+            task.cancel()
+        self._reader_task = None
+        writer.close()
+        err = err or ConnectionAbortedError("connection aborted")
+        while self._pending:
+            request = self._pending.popleft()
+            if not request.future.done():
+                request.future.set_exception(err)
+        self._stale.clear()
+        self._stale_reply = None
+        for deadline in self._deadlines:
+            deadline.cancel()
+        self._deadlines.clear()
+        self._missed = 0
+        self._room.set()
+
+    def drop(self, err: Exception) -> None:
+        """Abort a connection that is no longer usable and tell the listeners."""
+        self.abort(err)
+        for listener in list(self._disconnect_listeners):
+            listener(err)
+
+    def _expire(self, requests: list[_Request], timeout: float) -> None:
+        """Fail the requests of a write that are still waiting for a reply."""
+        expired = [request for request in requests if request in self._pending]
+        if not expired:
+            return
+        for request in expired:
+            self._pending.remove(request)
+            if request.lines:
+                # the rest of its reply is still to come
+                self._stale_reply = request
+            else:
+                self._stale.append(request)
+            if not request.future.done():
+                request.future.set_exception(
+                    TimeoutError(f"No reply to {request.command} within {timeout:g}s")
+                )
+        self._room.set()
+        self._missed += 1
+        _LOGGER.debug(
+            "%d commands to %s:%d timed out (%d writes in a row)",
+            len(expired),
+            self._host,
+            self._port,
+            self._missed,
+        )
+        if self._missed >= MAX_MISSED_REPLIES:
+            self.drop(ConnectionAbortedError("switch stopped answering"))
+
+    async def async_write(
+        self, commands: list[str], timeout: float | None = None
+    ) -> asyncio.Future[list[list[str]]]:
+        """Write commands in one go; return a future for the replies of each.
+
+        With a timeout, commands not answered that many seconds after the
+        write fail with TimeoutError.
+        """
+        loop = asyncio.get_running_loop()
+        while self.in_flight and self.in_flight + len(commands) > self.window:
+            self._room.clear()
+            await self._room.wait()
+        async with self._lock:
+            if self._writer is None:
+                if self._opened:
+                    raise ConnectionError(
+                        f"Not connected to switch at {self._host}:{self._port}"
+                    )
+                await self._connect()
+            requests = [
+                _Request(command, reply_prefixes(command), loop.create_future())
+                for command in commands
+            ]
+            self._pending.extend(requests)
+            writer = self._writer
+            writer.write(b"".join(command.encode("ASCII") + b"\r\n" for command in commands))
+            try:
+                await writer.drain()
+            except OSError as err:
+                self.drop(err)
+        replies = asyncio.gather(*(request.future for request in requests))
+        # a caller that gave up on the replies, like one past its deadline,
+        # no longer awaits them; the failure is theirs to report, not ours
+        replies.add_done_callback(_retrieve)
+        if timeout is not None and self._writer is writer:
+            deadline = loop.call_later(timeout, self._expire, requests, timeout)
+            self._deadlines.add(deadline)
+
+            def _answered(future: asyncio.Future) -> None:
+                # a caller that cancelled still leaves its commands on the
+                # wire; the deadline takes them out of the window
+                if not future.cancelled():
+                    deadline.cancel()
+                    self._deadlines.discard(deadline)
+
+            replies.add_done_callback(_answered)
+        return replies
+
+    async def async_request(self, commands: list[str]) -> list[list[str]]:
+        """Send commands and wait for their replies."""
+        return await (await self.async_write(commands))
+
+    async def send(self, command: str) -> AsyncIterator[str]:
+        """Send one command and yield its reply lines, like sa.Connection."""
+        for reply in (await self.async_request([command]))[0]:
+            yield reply
+
+    async def _async_read(self, reader: asyncio.StreamReader) -> None:
+        err: Exception = ConnectionResetError("switch closed the connection")
+        try:
+            while data := await reader.readline():
+                await self._async_line(data.decode("ascii", "replace").strip())
+        except (OSError, asyncio.IncompleteReadError) as exc:
+            err = exc
+        if self._reader is reader:
+            self._reader_task = None
+            self.drop(err)
+
+    def _match_stale(self, line: str) -> bool:
+        """Return whether the line belongs to the late reply of a stale command."""
+        if self._stale_reply is not None and self._stale_reply.matches(line):
+            return True
+        for request in self._stale:
+            if request.matches(line):
+                self._stale.remove(request)
+                self._stale_reply = request
+                _LOGGER.debug("Late reply to %s: %r", request.command, line)
+                return True
+        return False
+
+    async def _async_line(self, line: str) -> None:
+        request = self._pending[0] if self._pending else None
+        if not line:
+            # the end of a reply; notifications may be followed by one too,
+            # which must not end the oldest command
+            if self._stale_reply is not None:
+                self._stale_reply = None
+            elif request is not None and request.lines:
+                self._pending.popleft()
+                self._room.set()
+                self._missed = 0
+                if not request.future.done():
+                    request.future.set_result(request.lines)
+            return
+        # the oldest command waiting comes first: when a late reply and the
+        # reply to a command that is still waiting look alike, the switch is
+        # more likely to have skipped the command that timed out
+        push = False
+        if request is not None and request.matches(line):
+            request.lines.append(line)
+        elif not self._match_stale(line):
+            push = True
+            self.pushes += 1
+        try:
+            await self._on_line(line, push)
+        except Exception:  # pylint: disable=broad-except
+            _LOGGER.exception("Error handling %r from %s:%d", line, self._host, self._port)
@@ -18,6 +18,8 @@ from unittest.mock import patch
 
 import pytest
 
+from .simulator import SwitchSimulator
+
 pytest_plugins = "pytest_homeassistant_custom_component"
 
 
@@ -60,3 +62,31 @@ def error_get_data_fixture():
         side_effect=Exception,
     ):
         yield
+
+
+# This fixture fakes a connected switch: connect() only fills in the device
+# attributes that the integration needs to create its devices.
+@pytest.fixture(name="mock_switch")
+def mock_switch_fixture():
+    """Connect to a fake switch without any network traffic."""
+
+    async def _connect(switch):
+        switch.attributes.update(
+            {"sn": "sn=12345", "fwrev": "1.0", "rev": "rev=A", "pn": "pn=SSA-3220D"}
+        )
+
+    with patch("savantaudio.client.Switch.connect", _connect), patch(
+        "custom_components.savantaudio.client.SavantSwitch.send_command"
+    ) as send_command, patch(
+        "custom_components.savantaudio.client.SavantSwitch.async_send_batch"
+    ):
+        yield send_command
+
+
+# This fixture runs a simulated switch on a local port. Tests use its host and
+# port in the entry config to talk to it over a real TCP connection.
+@pytest.fixture(name="simulator")
+async def simulator_fixture(socket_enabled):
+    """Run a simulated switch."""
+    async with SwitchSimulator() as simulator:
+        yield simulator
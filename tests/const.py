@@ -1,8 +1,28 @@
 """Constants for savantaudio tests."""
-from homeassistant.const import CONF_HOST, CONF_PORT
+from homeassistant.const import CONF_ENABLED, CONF_HOST, CONF_NAME, CONF_PORT
 
-from custom_components.savantaudio.const import DEFAULT_PORT
+from custom_components.savantaudio.const import (
+    CONF_NUMBER,
+    CONF_SOURCES,
+    CONF_ZONES,
+    DEFAULT_PORT,
+    DEFAULT_SOURCE,
+)
 
 # Mock config data to be used across multiple tests
 MOCK_CONFIG = {CONF_HOST: "localhost", CONF_PORT: DEFAULT_PORT}
 BAD_CONFIG = {CONF_PORT: DEFAULT_PORT}
+
+MOCK_ENTRY_CONFIG = {
+    CONF_HOST: "localhost",
+    CONF_PORT: DEFAULT_PORT,
+    CONF_NAME: "Savant",
+    CONF_SOURCES: {
+        "5": {CONF_NAME: "Sonos", CONF_ENABLED: True},
+        "6": {CONF_NAME: "Record Player", CONF_ENABLED: True},
+    },
+    CONF_ZONES: {
+        "savant_living_room": {CONF_NUMBER: 11, CONF_NAME: "Living Room", CONF_ENABLED: True, DEFAULT_SOURCE: 5},
+        "savant_family_room": {CONF_NUMBER: 12, CONF_NAME: "Family Room", CONF_ENABLED: True, DEFAULT_SOURCE: 6},
+    },
+}
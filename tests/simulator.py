@@ -0,0 +1,314 @@
+"""Simulated Savant SSA-3220 audio switch.
+
+Speaks the line protocol of the switch over TCP so the integration can be
+exercised end to end without the hardware, from the tests as well as from
+the benchmarks.  Every reply is a block of lines terminated by an empty
+line.  Unsolicited updates (see `push_link` and `push_output`) are sent as
+single lines without terminator, the way the switch reports changes made
+from another controller.
+
+Run standalone with ``python -m tests.simulator --port 8085``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+import logging
+import random
+import re
+
+_LOGGER = logging.getLogger(__name__)
+
+NUM_INPUTS = 32
+NUM_OUTPUTS = 20
+
+COMMAND = re.compile(r"(ainput|aoutput)-([a-z]+)-(get|set)(\d+)(?::(.*))?$")
+SWITCH_COMMAND = re.compile(r"switch-(get|set)(\d+)(?:\.(\w+))?$")
+COMMAND_NAME = re.compile(r"[a-z\-]*")
+
+
+@dataclass
+class SimulatedOutput:
+    """State of one output."""
+
+    volume: int = -20
+    mute: bool = False
+    mono: bool = False
+    passthru: bool = False
+    delay: list[int] = field(default_factory=lambda: [0, 0])
+
+
+@dataclass
+class SimulatedInput:
+    """State of one input."""
+
+    trim: int = 0
+    coaxial: bool = True
+
+
+@dataclass
+class SimulatorConfig:
+    """Behaviour of the simulated switch.
+
+    latency/jitter: seconds added before every reply.
+    slow_every/slow_delay: every Nth command is answered slow_delay later.
+    drop_after: close the connection after that many commands.
+    max_connections: refuse connections beyond this many, like the device.
+    terminate_pushes: end notifications with an empty line, like a reply.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    slow_every: int = 0
+    slow_delay: float = 0.0
+    drop_after: int = 0
+    max_connections: int = 4
+    serial: str = "000123"
+    delay: bool = True
+    terminate_pushes: bool = False
+
+
+class SwitchSimulator:
+    """Asyncio TCP server that behaves like an SSA-3220(D)."""
+
+    def __init__(self, config: SimulatorConfig | None = None) -> None:
+        """Initialize the simulator."""
+        self.config = config or SimulatorConfig()
+        self.inputs = {n: SimulatedInput() for n in range(1, NUM_INPUTS + 1)}
+        self.outputs = {n: SimulatedOutput() for n in range(1, NUM_OUTPUTS + 1)}
+        self.links: dict[int, int] = {}
+        # set to stop answering while keeping connections open (half-open)
+        self.hang = False
+        self.commands: list[str] = []
+        self.command_counts: Counter[str] = Counter()
+        self.connections = 0
+        self._writers: set[asyncio.StreamWriter] = set()
+        self._server: asyncio.AbstractServer | None = None
+        self._random = random.Random(0)
+
+    @property
+    def host(self) -> str:
+        """Return the address the simulator listens on."""
+        return self._server.sockets[0].getsockname()[0]
+
+    @property
+    def port(self) -> int:
+        """Return the port the simulator listens on."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Start listening."""
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def stop(self) -> None:
+        """Stop listening and close every connection."""
+        self.drop_connections()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> SwitchSimulator:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    def drop_connections(self) -> None:
+        """Close every open connection, like a network blip."""
+        for writer in list(self._writers):
+            writer.close()
+        self._writers.clear()
+
+    def reset_stats(self) -> None:
+        """Forget the commands received so far."""
+        self.commands.clear()
+        self.command_counts.clear()
+
+    def push_link(self, output: int, input: int | None) -> None:
+        """Change a link as another controller would and report it."""
+        if input:
+            self.links[output] = input
+        else:
+            self.links.pop(output, None)
+        self._broadcast(self._link_reply(output))
+
+    def push_output(self, output: int, **changes) -> None:
+        """Change output fields as another controller would and report them."""
+        state = self.outputs[output]
+        for key, value in changes.items():
+            setattr(state, key, value)
+        replies = {
+            "volume": f"aoutput-vol{output}:{state.volume}dB",
+            "mute": f"aoutput-mute{output}:{'on' if state.mute else 'off'}",
+            "mono": f"aoutput-mono{output}:{'on' if state.mono else 'off'}",
+            "passthru": f"aoutput-conf{output}:{'passthru' if state.passthru else 'processed'}",
+        }
+        for key in changes:
+            self._broadcast(replies[key])
+
+    def _broadcast(self, line: str) -> None:
+        data = line.encode("ascii") + b"\r\n"
+        if self.config.terminate_pushes:
+            data += b"\r\n"
+        for writer in self._writers:
+            writer.write(data)
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if len(self._writers) >= self.config.max_connections:
+            writer.close()
+            return
+        self.connections += 1
+        self._writers.add(writer)
+        handled = 0
+        try:
+            while line := await reader.readline():
+                command = line.decode("ascii").strip()
+                if not command:
+                    continue
+                handled += 1
+                self.commands.append(command)
+                self.command_counts[COMMAND_NAME.match(command).group()] += 1
+                if self.hang:
+                    continue
+                await self._delay(handled)
+                replies = self.execute(command)
+                writer.write(
+                    b"".join(reply.encode("ascii") + b"\r\n" for reply in replies)
+                    + b"\r\n"
+                )
+                await writer.drain()
+                if self.config.drop_after and handled >= self.config.drop_after:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _delay(self, handled: int) -> None:
+        delay = self.config.latency
+        if self.config.jitter:
+            delay += self._random.uniform(0, self.config.jitter)
+        if self.config.slow_every and handled % self.config.slow_every == 0:
+            delay += self.config.slow_delay
+        if delay:
+            await asyncio.sleep(delay)
+
+    def _link_reply(self, output: int) -> str:
+        return f"switch{output}.{self.links.get(output, 0)}"
+
+    def execute(self, command: str) -> list[str]:
+        """Apply a command and return its reply lines."""
+        if command == "fwrev":
+            return ["fwrevPrimary; 1.0.5"]
+        if command == "fpga-rev":
+            return ["fpga-rev2.1"]
+        if command == "status":
+            model = (
+                "Standalone-Audio-Switch-With-Delay"
+                if self.config.delay
+                else "Standalone-Audio-Switch"
+            )
+            return [
+                f"statusAPI1.0; pn=SSA-3220D; sn={self.config.serial}; rev=A; ready=yes; {model}"
+            ]
+
+        if m := SWITCH_COMMAND.match(command):
+            output = int(m.group(2))
+            if output not in self.outputs:
+                return ["err"]
+            if m.group(1) == "set":
+                value = m.group(3)
+                if value == "disconnect" or value == "0":
+                    self.links.pop(output, None)
+                elif value and value.isdigit() and int(value) in self.inputs:
+                    self.links[output] = int(value)
+                else:
+                    return ["err"]
+            return [self._link_reply(output)]
+
+        if m := COMMAND.match(command):
+            kind, key, action, number, value = m.groups()
+            number = int(number)
+            if kind == "ainput":
+                return self._execute_input(number, key, action, value)
+            return self._execute_output(number, key, action, value)
+        return ["err"]
+
+    def _execute_input(self, number, key, action, value) -> list[str]:
+        if (state := self.inputs.get(number)) is None:
+            return ["err"]
+        if key == "trim":
+            if action == "set":
+                state.trim = int(value.removesuffix("dB"))
+            return [f"ainput-trim{number}:{state.trim}dB"]
+        if key == "conf":
+            if action == "set":
+                state.coaxial = value == "coaxial"
+            return [f"ainput-conf{number}:{'coaxial' if state.coaxial else 'toslink'}"]
+        return ["err"]
+
+    def _execute_output(self, number, key, action, value) -> list[str]:
+        if (state := self.outputs.get(number)) is None:
+            return ["err"]
+        try:
+            if key == "vol":
+                if action == "set":
+                    volume = int(value.removesuffix("dB"))
+                    if volume < -38 or volume > 0:
+                        return ["err"]
+                    state.volume = volume
+                return [f"aoutput-vol{number}:{state.volume}dB"]
+            if key == "mute":
+                if action == "set":
+                    state.mute = value == "on"
+                return [f"aoutput-mute{number}:{'on' if state.mute else 'off'}"]
+            if key == "mono":
+                if action == "set":
+                    state.mono = value == "on"
+                return [f"aoutput-mono{number}:{'on' if state.mono else 'off'}"]
+            if key == "conf":
+                if action == "set":
+                    state.passthru = value == "passthru"
+                return [f"aoutput-conf{number}:{'passthru' if state.passthru else 'processed'}"]
+            if key in ("delayleft", "delayright", "delayboth"):
+                if not self.config.delay or number > 16:
+                    return ["err"]
+                if action == "set":
+                    delay = int(value.removesuffix("ms"))
+                    if key != "delayright":
+                        state.delay[0] = delay
+                    if key != "delayleft":
+                        state.delay[1] = delay
+                return [
+                    f"aoutput-delayleft{number}:{state.delay[0]}ms",
+                    f"aoutput-delayright{number}:{state.delay[1]}ms",
+                ]
+        except ValueError:
+            return ["err"]
+        return ["err"]
+
+
+async def _main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    args = parser.parse_args()
+
+    simulator = SwitchSimulator(SimulatorConfig(latency=args.latency, jitter=args.jitter))
+    await simulator.start(args.host, args.port)
+    _LOGGER.info("Simulated switch listening on %s:%d", simulator.host, simulator.port)
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
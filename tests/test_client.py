@@ -0,0 +1,51 @@
+"""Tests for the savantaudio client extensions."""
+import asyncio
+from unittest.mock import AsyncMock
+
+from custom_components.savantaudio.client import OutputChange, SavantSwitch
+
+
+async def test_output_events():
+    """Test output replies raise events only when something changed."""
+    switch = SavantSwitch("localhost", 8085)
+    callback = AsyncMock()
+    switch.add_callback(callback)
+
+    await switch.parse("aoutput-vol3:-10dB")
+    callback.assert_awaited_once_with("output-updated", switch.output(3))
+
+    callback.reset_mock()
+    await switch.parse("aoutput-vol3:-10dB")
+    callback.assert_not_awaited()
+
+    await switch.parse("switch3.5")
+    callback.assert_awaited_once_with("link-changed", (3, 5))
+
+
+async def test_batch_is_sent_in_one_write(socket_enabled):
+    """Test a batch goes out in one write and every reply is parsed."""
+    received = []
+
+    async def handle(reader, writer):
+        data = await reader.readuntil(b"switch-set4.disconnect\r\n")
+        received.append(data)
+        writer.write(b"switch3.5\r\n\r\naoutput-vol3:-10dB\r\n\r\nswitch4.0\r\n\r\n")
+        await writer.drain()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    switch = SavantSwitch("127.0.0.1", port)
+    switch.links[4] = 7
+    try:
+        await switch.async_apply(
+            [OutputChange(3, source=5, volume=-10), OutputChange(4, source=0)]
+        )
+    finally:
+        await switch.async_close()
+        server.close()
+
+    assert received == [
+        b"switch-set3.5\r\naoutput-vol-set3:-10dB\r\nswitch-set4.disconnect\r\n"
+    ]
+    assert switch.links == {3: 5}
+    assert switch.output(3).volume == -10
@@ -0,0 +1,43 @@
+"""Tests for the savantaudio command helpers."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from custom_components.savantaudio.commands import OutputCommandCoalescer
+
+
+async def test_volume_writes_are_coalesced(hass):
+    """Test a burst of volume writes sends the first and the last value."""
+    output = MagicMock(set_volume=AsyncMock(), set_mute=AsyncMock())
+    switch = MagicMock()
+    switch.output.return_value = output
+    settled = MagicMock()
+    coalescer = OutputCommandCoalescer(hass, switch, settled, interval=0)
+
+    written = [coalescer.async_set_volume(3, volume) for volume in range(-30, -10)]
+    written.append(coalescer.async_set_mute(3, True))
+
+    await hass.async_block_till_done()
+
+    output.set_volume.assert_awaited_once_with(-11)
+    output.set_mute.assert_awaited_once_with(True)
+    settled.assert_called_once_with(output)
+    # every request is answered by the write that carried its value
+    assert all(future.done() and future.exception() is None for future in written)
+
+
+async def test_failed_write_reaches_every_request(hass):
+    """Test the requests coalesced into a failed write get its error."""
+    output = MagicMock(set_volume=AsyncMock(side_effect=TimeoutError("no reply")))
+    switch = MagicMock()
+    switch.output.return_value = output
+    coalescer = OutputCommandCoalescer(hass, switch, MagicMock(), interval=0)
+
+    first = coalescer.async_set_volume(3, -20)
+    second = coalescer.async_set_volume(3, -10)
+
+    with pytest.raises(TimeoutError):
+        await first
+    with pytest.raises(TimeoutError):
+        await second
+    output.set_volume.assert_awaited_once_with(-10)
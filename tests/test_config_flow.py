@@ -0,0 +1,86 @@
+"""Test the savantaudio config flow."""
+import asyncio
+import time
+from unittest.mock import patch
+
+from homeassistant import config_entries, data_entry_flow
+from homeassistant.const import CONF_ENABLED, CONF_HOST, CONF_NAME, CONF_PORT
+
+from custom_components.savantaudio.const import (
+    CONF_NUMBER,
+    CONF_SOURCES,
+    CONF_ZONES,
+    DOMAIN,
+)
+
+
+async def _async_user_step(hass, simulator):
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"],
+        {CONF_HOST: simulator.host, CONF_PORT: simulator.port, CONF_NAME: "Savant"},
+    )
+
+
+async def test_user_step_probes_the_switch(hass, enable_custom_integrations, simulator):
+    """Test a host is validated with one status command on a closed connection."""
+    with patch("custom_components.savantaudio.async_setup_entry", return_value=True):
+        result = await _async_user_step(hass, simulator)
+        await hass.async_block_till_done()
+
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert result["result"].unique_id == "sn=000123"
+    assert simulator.commands == ["status"]
+    # the probe does not keep its connection
+    for _ in range(50):
+        if not simulator._writers:
+            break
+        await asyncio.sleep(0.01)
+    assert not simulator._writers
+
+
+async def test_user_step_gives_up_on_a_silent_host(hass, enable_custom_integrations, simulator):
+    """Test a host that does not answer is reported within the deadline."""
+    simulator.hang = True
+    start = time.monotonic()
+    with patch("custom_components.savantaudio.config_flow.VALIDATE_TIMEOUT", 0.2):
+        result = await _async_user_step(hass, simulator)
+
+    assert time.monotonic() - start < 1
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["errors"] == {"base": "cannot_connect"}
+
+
+async def test_import_creates_an_entry(hass, enable_custom_integrations, simulator):
+    """Test a switch configured in YAML is imported into one config entry."""
+    config = {
+        CONF_HOST: simulator.host,
+        CONF_PORT: simulator.port,
+        CONF_NAME: "Savant",
+        CONF_SOURCES: {5: {CONF_NAME: "Sonos", CONF_ENABLED: True}},
+        CONF_ZONES: {
+            "savant_living_room": {CONF_NUMBER: 11, CONF_NAME: "Living Room", CONF_ENABLED: True},
+        },
+    }
+    with patch("custom_components.savantaudio.async_setup_entry", return_value=True):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_IMPORT}, data=config
+        )
+        await hass.async_block_till_done()
+
+        assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+        assert result["result"].unique_id == "sn=000123"
+        # source numbers are stored as strings, like the options flow does
+        assert result["data"][CONF_SOURCES] == {"5": {CONF_NAME: "Sonos", CONF_ENABLED: True}}
+        assert result["data"][CONF_ZONES] == config[CONF_ZONES]
+
+        # the next start imports the same switch again
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_IMPORT}, data=config
+        )
+
+    assert result["type"] == data_entry_flow.FlowResultType.ABORT
+    assert result["reason"] == "already_configured"
+    assert len(hass.config_entries.async_entries(DOMAIN)) == 1
@@ -0,0 +1,63 @@
+"""Tests for the savantaudio switch registry."""
+from datetime import timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+import savantaudio.client as sa
+
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.connection import (
+    ConnectionSupervisor,
+    async_get_registry,
+)
+from custom_components.savantaudio.const import RELEASE_DELAY
+
+
+async def test_switch_is_shared_and_closed_after_last_release(hass, bypass_get_data):
+    """Test one switch per host:port, closed once nobody uses it."""
+    registry = async_get_registry(hass)
+
+    with patch.object(SavantSwitch, "async_close", AsyncMock()) as close:
+        first = await registry.async_acquire("localhost", 8085)
+        second = await registry.async_acquire("localhost", 8085)
+        assert first is second
+        assert sa.Switch.connect.await_count == 1
+
+        registry.async_release(first)
+        registry.async_release(second)
+        assert await registry.async_acquire("localhost", 8085) is first
+        registry.async_release(first)
+
+        async_fire_time_changed(hass, dt_util.utcnow() + RELEASE_DELAY + timedelta(seconds=1))
+        await hass.async_block_till_done()
+        close.assert_awaited_once()
+
+    assert await registry.async_acquire("localhost", 8085) is not first
+
+
+async def test_supervisor_reconnects_after_lost_connection(hass):
+    """Test a failed heartbeat reports one outage and reconnects with backoff."""
+    switch = SavantSwitch("localhost", 8085)
+    lost, restored = MagicMock(), AsyncMock()
+    supervisor = ConnectionSupervisor(hass, switch, lost, restored)
+
+    with patch.object(
+        SavantSwitch, "refresh_link", AsyncMock(side_effect=[OSError, OSError, None])
+    ), patch.object(SavantSwitch, "async_open", AsyncMock()), patch(
+        "custom_components.savantaudio.connection.RECONNECT_MIN_DELAY", 0
+    ):
+        await supervisor._async_heartbeat()
+        assert not supervisor.connected
+        lost.assert_called_once()
+        reconnect = supervisor._reconnect_task
+
+        # further failures during the outage are not reported again
+        supervisor.async_connection_lost(OSError())
+        lost.assert_called_once()
+
+        await reconnect
+
+    assert supervisor.connected
+    assert supervisor.reconnects == 1
+    restored.assert_awaited_once()
@@ -0,0 +1,77 @@
+"""Tests for the savantaudio coordinator."""
+from unittest.mock import AsyncMock
+
+import pytest
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.const import DEFAULT_SCAN_INTERVAL
+from custom_components.savantaudio.coordinator import SavantAudioCoordinator
+
+
+def _mock_switch():
+    switch = SavantSwitch("localhost", 8085)
+    switch.async_send_batch = AsyncMock()
+    return switch
+
+
+async def test_refresh_is_one_batch_per_switch(hass):
+    """Test a refresh reads every output and link in a single batch."""
+    switch = _mock_switch()
+    coordinator = SavantAudioCoordinator(hass, switch, "Savant")
+
+    async def _reply(commands, timeout=None):
+        await switch.parse("switch1.5")
+        await switch.parse("aoutput-vol3:-12dB")
+
+    switch.async_send_batch.side_effect = _reply
+    data = await coordinator._async_update_data()
+
+    switch.async_send_batch.assert_awaited_once()
+    commands = switch.async_send_batch.await_args.args[0]
+    # a link, volume, conf, mute and mono per output, delay on outputs 1-16
+    assert len(commands) == 20 * 5 + 16
+    assert len(set(commands)) == len(commands)
+    assert data is switch.state
+    assert data.links == {1: 5}
+    assert data.output(3).volume == -12
+
+
+async def test_refresh_error(hass):
+    """Test connection errors are reported as failed updates."""
+    switch = _mock_switch()
+    switch.async_send_batch.side_effect = OSError
+    coordinator = SavantAudioCoordinator(hass, switch, "Savant")
+
+    with pytest.raises(UpdateFailed):
+        await coordinator._async_update_data()
+
+
+async def test_interval_adapts_to_events(hass):
+    """Test the sweep backs off while events arrive and tightens without them."""
+    switch = _mock_switch()
+    coordinator = SavantAudioCoordinator(hass, switch, "Savant")
+
+    # a line no command is waiting for was pushed by the switch
+    await switch.transport._async_line("switch1.5")
+    await coordinator._async_update_data()
+    assert coordinator.update_interval == DEFAULT_SCAN_INTERVAL * 2
+
+    await coordinator._async_update_data()
+    assert coordinator.update_interval == DEFAULT_SCAN_INTERVAL
+
+
+async def test_own_commands_do_not_stretch_the_interval(hass, simulator):
+    """Test the replies to our own commands are not counted as events."""
+    switch = SavantSwitch(simulator.host, simulator.port)
+    coordinator = SavantAudioCoordinator(hass, switch, "Savant")
+    await switch.connect()
+
+    # the replies change the state, so listeners see events for them
+    await switch.async_send_batch(["switch-set1.5", "aoutput-vol-set3:-12dB", "switch-get1"])
+    await coordinator._async_update_data()
+    assert switch.links[1] == 5
+
+    assert switch.transport.pushes == 0
+    assert coordinator.update_interval == DEFAULT_SCAN_INTERVAL
+    await switch.async_close()
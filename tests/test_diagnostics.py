@@ -0,0 +1,157 @@
+"""Tests for the savantaudio diagnostics."""
+from homeassistant.components.media_player import DOMAIN as MP_DOMAIN
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_HOST,
+    CONF_PORT,
+    EVENT_STATE_CHANGED,
+    SERVICE_TURN_OFF,
+    SERVICE_TURN_ON,
+)
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_capture_events,
+    async_fire_time_changed,
+)
+
+from custom_components.savantaudio.const import (
+    CONF_TRACE,
+    CONF_TRACE_SIZE,
+    DOMAIN,
+    ENTRY_DATA,
+)
+from custom_components.savantaudio.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.savantaudio.recorder import exclude_attributes
+from custom_components.savantaudio.sensor import SCAN_INTERVAL
+from custom_components.savantaudio.trace import MAX_REPLIES, WireTrace
+
+from .const import MOCK_ENTRY_CONFIG
+
+
+async def _setup_and_turn_on(hass, simulator, options=None):
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: simulator.host, CONF_PORT: simulator.port},
+        options=options or {},
+        entry_id="test",
+        unique_id="sn=000123",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    await hass.services.async_call(
+        MP_DOMAIN,
+        SERVICE_TURN_ON,
+        {ATTR_ENTITY_ID: "media_player.savant_living_room"},
+        blocking=True,
+    )
+    return config_entry
+
+
+async def test_metrics_sensors_and_diagnostics(hass, enable_custom_integrations, simulator):
+    """Test command metrics reach the diagnostic sensors and diagnostics."""
+    config_entry = await _setup_and_turn_on(hass, simulator)
+
+    entity_registry = er.async_get(hass)
+    switch_device = dr.async_get(hass).async_get_device({(DOMAIN, "sn=000123")})
+    sensor_id = entity_registry.async_get_entity_id("sensor", DOMAIN, "sn=000123_link_latency")
+    assert entity_registry.async_get(sensor_id).device_id == switch_device.id
+
+    await hass.helpers.entity_component.async_update_entity(sensor_id)
+    state = hass.states.get(sensor_id)
+    assert float(state.state) > 0
+    assert state.attributes["count"] == 1
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    assert diagnostics["data"][CONF_HOST] == "**REDACTED**"
+    assert diagnostics["switch"]["attributes"]["sn"] == "**REDACTED**"
+    metrics = diagnostics["metrics"]
+    assert metrics["latency"]["link"]["count"] == 1
+    # connecting reads the switch in batches, not command by command
+    assert "get_link" not in metrics["latency"]
+    assert metrics["latency"]["batch"]["count"] >= 2
+    assert metrics["pending"] == 0
+    assert diagnostics["connection"] == {
+        "connected": True,
+        "reconnects": 0,
+        "in_flight": 0,
+        "pushes": 0,
+    }
+    assert diagnostics["trace"] is None
+
+
+async def test_wire_trace(hass, enable_custom_integrations, simulator):
+    """Test the wire trace is kept when enabled and bounded in size."""
+    config_entry = await _setup_and_turn_on(
+        hass, simulator, {CONF_TRACE: True, CONF_TRACE_SIZE: 10}
+    )
+
+    trace = (await async_get_config_entry_diagnostics(hass, config_entry))["trace"]
+    assert trace[-1]["command"] == "switch-set11.5"
+    assert trace[-1]["replies"] == ["switch11.5"]
+    assert trace[-1]["latency_ms"] > 0
+
+    wire_trace = WireTrace(2)
+    for n in range(3):
+        wire_trace.record(f"cmd{n}", ["x" * 1000] * 20, 0.0, OSError("boom"))
+    records = wire_trace.as_list()
+    assert [record["command"] for record in records] == ["cmd1", "cmd2"]
+    assert len(records[0]["replies"]) == MAX_REPLIES + 1
+    assert records[0]["error"] == "OSError('boom')"
+
+
+async def test_diagnostics_are_redacted(hass, enable_custom_integrations, simulator):
+    """Test the host and serial number are redacted, in the trace too."""
+    config_entry = await _setup_and_turn_on(
+        hass, simulator, {CONF_TRACE: True, CONF_TRACE_SIZE: 500}
+    )
+    switch = hass.data[DOMAIN][ENTRY_DATA][config_entry.entry_id].coordinator.switch
+    await switch.async_send_batch(["status"])
+    switch.trace.record("status", (), 0.0, OSError(f"connect to {simulator.host} failed"))
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, config_entry)
+    status = next(record for record in diagnostics["trace"] if record["command"] == "status")
+    assert status["replies"][0].startswith("statusAPI1.0; pn=SSA-3220D; **REDACTED**;")
+    assert diagnostics["trace"][-1]["error"] == "OSError('connect to **REDACTED** failed')"
+    assert "000123" not in str(diagnostics)
+    assert simulator.host not in str(diagnostics)
+
+
+async def test_sensors_skip_unchanged_metrics(hass, enable_custom_integrations, simulator):
+    """Test the sensors only write a state when a recorded value changed."""
+    await _setup_and_turn_on(hass, simulator)
+    sensor_id = "sensor.savant_unlink_latency"
+    # publish the turn on
+    async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL)
+    await hass.async_block_till_done()
+    events = async_capture_events(hass, EVENT_STATE_CHANGED)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL * 2)
+    await hass.async_block_till_done()
+    # the poll that ran meanwhile is the only thing that changed
+    changed = {event.data["entity_id"] for event in events}
+    assert {entity_id for entity_id in changed if entity_id.startswith("sensor.")} == {
+        "sensor.savant_poll_duration"
+    }
+    events.clear()
+
+    await hass.services.async_call(
+        MP_DOMAIN,
+        SERVICE_TURN_OFF,
+        {ATTR_ENTITY_ID: "media_player.savant_living_room"},
+        blocking=True,
+    )
+    async_fire_time_changed(hass, dt_util.utcnow() + SCAN_INTERVAL * 3)
+    await hass.async_block_till_done()
+    changed = {event.data["entity_id"] for event in events}
+    assert sensor_id in changed
+    assert "sensor.savant_link_latency" not in changed
+    assert hass.states.get(sensor_id).attributes["count"] == 1
+
+    # the histograms are shown but not recorded
+    assert {"buckets", "last_ms", "p99_ms"} <= exclude_attributes(hass)
+    assert "count" not in exclude_attributes(hass)
@@ -0,0 +1,143 @@
+"""Test the discovery of switches on the local network."""
+import time
+from unittest.mock import patch
+
+from homeassistant import config_entries, data_entry_flow
+from homeassistant.const import CONF_HOST, CONF_NAME, CONF_PORT
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+import pytest_socket
+
+from custom_components.savantaudio.const import DOMAIN
+from custom_components.savantaudio.discovery import (
+    SwitchInfo,
+    async_scan,
+    async_scan_hosts,
+)
+
+from .const import MOCK_ENTRY_CONFIG
+
+# every 127.0.0.0/24 address is local; only the simulator's one listens
+LOOPBACK_HOSTS = [f"127.0.0.{n}" for n in range(1, 255)]
+
+
+@pytest.fixture(name="loopback")
+def loopback_fixture(socket_enabled):
+    """Allow connections to the whole loopback /24 for this test."""
+    pytest_socket.socket_allow_hosts(LOOPBACK_HOSTS, allow_unix_socket=True)
+
+
+async def test_scan_finds_the_switch(simulator, loopback):
+    """Test a /24 is scanned quickly and the switch is fingerprinted."""
+    start = time.monotonic()
+    found = await async_scan(LOOPBACK_HOSTS, simulator.port)
+    assert time.monotonic() - start < 2
+
+    assert found == [SwitchInfo("127.0.0.1", simulator.port, "000123", "SSA-3220D")]
+    assert found[0].unique_id == "sn=000123"
+    # the probe reads the status and nothing else
+    assert simulator.commands == ["status"]
+
+
+async def test_scan_skips_known_hosts(simulator, loopback):
+    """Test hosts that are set up already are not probed."""
+    assert await async_scan(LOOPBACK_HOSTS, simulator.port, skip={"127.0.0.1"}) == []
+    assert simulator.connections == 0
+
+
+async def test_scan_hosts(hass):
+    """Test the hosts of the configured networks are scanned, except our own."""
+    hosts = await async_scan_hosts(hass)
+
+    assert len(hosts) == 253
+    assert "10.10.10.1" in hosts
+    assert "10.10.10.10" not in hosts
+
+
+async def test_flow_picks_a_discovered_switch(
+    hass, enable_custom_integrations, simulator, loopback
+):
+    """Test a switch found on the network is set up from the config flow."""
+
+    async def scan(hosts, skip):
+        return await async_scan(hosts, simulator.port, skip)
+
+    with patch(
+        "custom_components.savantaudio.config_flow.async_scan_hosts",
+        return_value=["127.0.0.1", "127.0.0.2"],
+    ), patch("custom_components.savantaudio.config_flow.async_scan", side_effect=scan):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        assert result["type"] == data_entry_flow.FlowResultType.FORM
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_HOST: "", CONF_NAME: "Basement"}
+        )
+        assert result["type"] == data_entry_flow.FlowResultType.FORM
+        assert result["step_id"] == "pick_switch"
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_HOST: "127.0.0.1"}
+        )
+        await hass.async_block_till_done()
+
+    assert result["type"] == data_entry_flow.FlowResultType.CREATE_ENTRY
+    assert result["data"] == {
+        CONF_HOST: "127.0.0.1",
+        CONF_PORT: simulator.port,
+        CONF_NAME: "Basement",
+    }
+    assert result["result"].unique_id == "sn=000123"
+
+
+async def test_flow_skips_configured_switches(hass, enable_custom_integrations, simulator):
+    """Test a switch that is set up already is not offered again."""
+    MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: "127.0.0.1", CONF_PORT: simulator.port},
+        unique_id="sn=000123",
+    ).add_to_hass(hass)
+
+    with patch(
+        "custom_components.savantaudio.config_flow.async_scan_hosts",
+        return_value=["127.0.0.1"],
+    ):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_HOST: ""}
+        )
+
+    assert result["type"] == data_entry_flow.FlowResultType.FORM
+    assert result["step_id"] == "user"
+    assert result["errors"] == {"base": "no_devices_found"}
+    assert simulator.connections == 0
+
+
+async def test_flow_skips_hosts_of_other_flows(hass, enable_custom_integrations, simulator):
+    """Test a host another flow is setting up is not probed."""
+    simulator.hang = True
+    with patch("custom_components.savantaudio.config_flow.VALIDATE_TIMEOUT", 0.1):
+        other = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        other = await hass.config_entries.flow.async_configure(
+            other["flow_id"], {CONF_HOST: simulator.host, CONF_PORT: simulator.port}
+        )
+    assert other["errors"] == {"base": "cannot_connect"}
+
+    with patch(
+        "custom_components.savantaudio.config_flow.async_scan_hosts",
+        return_value=[simulator.host],
+    ):
+        result = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_HOST: ""}
+        )
+
+    assert result["errors"] == {"base": "no_devices_found"}
+    # only the other flow connected
+    assert simulator.connections == 1
@@ -0,0 +1,45 @@
+"""Tests for the savantaudio event dispatcher."""
+from unittest.mock import MagicMock
+
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.dispatcher import SavantAudioDispatcher
+
+
+async def test_events_are_routed_by_output():
+    """Test each event only reaches the listener of its output."""
+    switch = SavantSwitch("localhost", 8085)
+    dispatcher = SavantAudioDispatcher(switch)
+    dispatcher.async_start()
+    zone3, zone4, everything = MagicMock(), MagicMock(), MagicMock()
+    dispatcher.async_add_output_listener(3, zone3)
+    remove_zone4 = dispatcher.async_add_output_listener(4, zone4)
+    dispatcher.async_add_listener(everything)
+
+    await switch.parse("switch3.5")
+    zone3.assert_called_once_with("link-changed", (3, 5))
+    zone4.assert_not_called()
+    everything.assert_called_once()
+
+    remove_zone4()
+    await switch.parse("aoutput-mute4:on")
+    zone4.assert_not_called()
+    assert everything.call_count == 2
+
+
+async def test_stop_unregisters_listeners():
+    """Test a stopped dispatcher drops its listeners and ignores events."""
+    switch = SavantSwitch("localhost", 8085)
+    dispatcher = SavantAudioDispatcher(switch)
+    dispatcher.async_start()
+    zone3 = MagicMock()
+    dispatcher.async_add_output_listener(3, zone3)
+
+    dispatcher.async_stop()
+    await switch.parse("switch3.5")
+    zone3.assert_not_called()
+
+    # restarting does not register a second callback on the switch
+    dispatcher.async_start()
+    dispatcher.async_add_output_listener(3, zone3)
+    await switch.parse("switch3.6")
+    zone3.assert_called_once_with("link-changed", (3, 6))
@@ -1,56 +1,251 @@
 """Initialization tests for savantaudio."""
+import asyncio
+from unittest.mock import patch
 
+from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    DOMAIN as MP_DOMAIN,
+    SERVICE_SELECT_SOURCE,
+)
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_HOST,
+    CONF_PORT,
+    STATE_OFF,
+    STATE_ON,
+    STATE_UNAVAILABLE,
+)
+from homeassistant.helpers import device_registry as dr
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
 
-from unittest.mock import AsyncMock
+from custom_components.savantaudio.const import (
+    DOMAIN,
+    ENTRY_DATA,
+    KNOWN_ZONES,
+    RELEASE_DELAY,
+)
 
-from pytest_homeassistant_custom_component.common import MockConfigEntry
+from .const import MOCK_ENTRY_CONFIG
 
-# from custom_components.savantaudio import async_setup_entry, async_unload_entry
-from custom_components.savantaudio.const import DOMAIN
 
-from .const import MOCK_CONFIG
+def _entry_for(simulator):
+    return MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: simulator.host, CONF_PORT: simulator.port},
+        entry_id="test",
+        unique_id="sn=000123",
+    )
 
-# We can pass fixtures as defined in conftest.py to tell pytest to use the fixture
-# for a given test. We can also leverage fixtures and mocks that are available in
-# Home Assistant using the pytest_homeassistant_custom_component plugin.
-# Assertions allow you to verify that the return value of whatever is on the left
-# side of the assertion matches with the right side.
-# async def test_setup_unload_and_reload_entry(hass, bypass_get_data):
-#     """Test entry setup and unload."""
-#     m_instance = AsyncMock()
-#     m_instance.getitem = AsyncMock()
 
-#     # Create a mock entry so we don't have to go through config flow
-#     config_entry = MockConfigEntry(
-#         domain=DOMAIN, data=MOCK_CONFIG, entry_id="test", unique_id="savantaudio-test"
-#     )
+async def test_setup_unload_and_reload_entry(hass, enable_custom_integrations, simulator):
+    """Test entry setup and unload against the simulated switch."""
+    simulator.links[11] = 5
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
 
-#     config_entry.add_to_hass(hass)
-#     assert await hass.config_entries.async_setup(config_entry.entry_id)
-#     await hass.async_block_till_done()
+    assert config_entry.state is ConfigEntryState.LOADED
+    assert hass.states.get("media_player.savant_living_room").state == STATE_ON
+    assert hass.states.get("media_player.savant_living_room").attributes["source"] == "Sonos"
+    assert hass.states.get("media_player.savant_family_room").state == STATE_OFF
 
-# # Unload the entry and verify that the data has been removed
-# assert await async_unload_entry(hass, config_entry)
-# assert config_entry.entry_id not in hass.data[DOMAIN]
+    # a reload reuses the connection of the registry
+    assert await hass.config_entries.async_reload(config_entry.entry_id)
+    await hass.async_block_till_done()
+    assert simulator.connections == 1
 
+    # Unload the entry and verify that the data has been removed
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert config_entry.entry_id not in hass.data[DOMAIN]
+    assert config_entry.entry_id not in hass.data[DOMAIN][ENTRY_DATA]
 
-# async def test_setup_entry_exception(hass, error_on_get_data):
-#     """Test ConfigEntryNotReady when API raises an exception during entry setup."""
-#     config_entry = MockConfigEntry(domain=DOMAIN, data=MOCK_CONFIG, entry_id="test")
 
-#     # In this case we are testing the condition where async_setup_entry raises
-#     # ConfigEntryNotReady using the `error_on_get_data` fixture which simulates
-#     # an error.
-#     with pytest.raises(ServiceNotFound):
-#         assert await async_setup_entry(hass, config_entry)
+async def test_updates_from_other_controllers(hass, enable_custom_integrations, simulator):
+    """Test changes reported by the switch reach the zones."""
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    commands = len(simulator.commands)
 
+    # the switch pushes the changes; no command or refresh asks for them
+    simulator.push_link(12, 6)
+    simulator.push_output(12, volume=-5)
+    for _ in range(100):
+        state = hass.states.get("media_player.savant_family_room")
+        if state.attributes.get("volume_level") == (38 - 5) / 38:
+            break
+        await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
 
-# async def test_setup_entry_missing_data(hass, bypass_get_data):
-#     """Test ConfigEntryNotReady when API raises an exception during entry setup."""
-#     config_entry = MockConfigEntry(domain=DOMAIN, data=BAD_CONFIG, entry_id="test")
+    assert len(simulator.commands) == commands
+    state = hass.states.get("media_player.savant_family_room")
+    assert state.state == STATE_ON
+    assert state.attributes["source"] == "Record Player"
+    assert state.attributes["volume_level"] == (38 - 5) / 38
 
-#     # In this case we are testing the condition where async_setup_entry raises
-#     # ConfigEntryNotReady using the `error_on_get_data` fixture which simulates
-#     # an error.
-#     with pytest.raises(RequiredParameterMissing):
-#         assert await async_setup_entry(hass, config_entry)
+
+async def test_dropped_connection_is_resynced(hass, enable_custom_integrations, simulator):
+    """Test a connection the switch closed marks the zones unavailable until resynced."""
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator
+    entity_id = "media_player.savant_living_room"
+
+    with patch("custom_components.savantaudio.connection.RECONNECT_MIN_DELAY", 0.05):
+        simulator.drop_connections()
+        simulator.reset_stats()
+        for _ in range(50):
+            if hass.states.get(entity_id).state == STATE_UNAVAILABLE:
+                break
+            await asyncio.sleep(0.01)
+        assert hass.states.get(entity_id).state == STATE_UNAVAILABLE
+        # nothing but the supervisor opens the connection again
+        assert coordinator.switch.transport.writer is None
+
+        simulator.links[11] = 5
+        # the sweep is throttled by the command rate and takes about a second
+        for _ in range(300):
+            if hass.states.get(entity_id).state == STATE_ON:
+                break
+            await asyncio.sleep(0.01)
+
+    assert hass.states.get(entity_id).state == STATE_ON
+    assert coordinator.supervisor.reconnects == 1
+    assert simulator.connections == 2
+    # the whole switch was read again
+    assert simulator.command_counts["switch-get"] >= 20
+
+
+async def test_refresh_only_writes_changed_zones(hass, enable_custom_integrations, simulator):
+    """Test a sweep only writes the state of zones whose output changed."""
+    simulator.links.update({11: 5, 12: 6})
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator
+    living_room = hass.states.get("media_player.savant_living_room")
+    family_room = hass.states.get("media_player.savant_family_room")
+
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("media_player.savant_living_room") is living_room
+    assert hass.states.get("media_player.savant_family_room") is family_room
+
+    simulator.outputs[12].volume = -3
+    await coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get("media_player.savant_living_room") is living_room
+    assert hass.states.get("media_player.savant_family_room").attributes["volume_level"] == 35 / 38
+
+
+async def test_unchanged_state_is_not_written(hass, enable_custom_integrations, simulator):
+    """Test a command that does not change the zone does not write its state."""
+    simulator.links[11] = 5
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    metrics = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator.switch.metrics
+    living_room = hass.states.get("media_player.savant_living_room")
+
+    await hass.services.async_call(
+        MP_DOMAIN,
+        SERVICE_SELECT_SOURCE,
+        {ATTR_ENTITY_ID: "media_player.savant_living_room", ATTR_INPUT_SOURCE: "Sonos"},
+        blocking=True,
+    )
+    assert hass.states.get("media_player.savant_living_room") is living_room
+    assert metrics.suppressed_writes >= 1
+    assert simulator.command_counts["switch-set"] == 1
+
+
+async def test_unreachable_switch_does_not_hold_up_others(
+    hass, enable_custom_integrations, simulator, unused_tcp_port
+):
+    """Test an entry for a dead switch is retried on its own."""
+    good = _entry_for(simulator)
+    dead = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: "127.0.0.1", CONF_PORT: unused_tcp_port},
+        entry_id="dead",
+        unique_id="sn=999",
+    )
+    dead.add_to_hass(hass)
+    good.add_to_hass(hass)
+    # setting up the integration sets up both entries
+    await hass.config_entries.async_setup(good.entry_id)
+    await hass.async_block_till_done()
+
+    assert dead.state is ConfigEntryState.SETUP_RETRY
+    assert good.state is ConfigEntryState.LOADED
+    assert set(hass.data[DOMAIN][ENTRY_DATA]) == {"test"}
+    assert set(hass.data[DOMAIN][KNOWN_ZONES]) == {
+        "media_player.savant_living_room",
+        "media_player.savant_family_room",
+    }
+
+
+async def test_cached_attributes_are_read_again(
+    hass, enable_custom_integrations, simulator, hass_storage
+):
+    """Test a setup from the cache updates the device from the switch."""
+    hass_storage[f"{DOMAIN}.test"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.test",
+        "data": {
+            "attributes": {"sn": "sn=000123", "fwrev": "0.9.1", "rev": "rev=A"},
+            "model": "SSA-3220D",
+            "links": {},
+            "outputs": {},
+        },
+    }
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+
+    coordinator = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator
+    # the switch is read in the background
+    for _ in range(300):
+        if coordinator.switch.loaded:
+            break
+        await asyncio.sleep(0.01)
+    await hass.async_block_till_done()
+    assert coordinator.switch.loaded
+    assert coordinator.last_update_success
+    assert simulator.command_counts["fwrev"] == 1
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "sn=000123")})
+    assert device.sw_version == "1.0.5"
+
+
+async def test_failed_setup_releases_the_switch(
+    hass, enable_custom_integrations, simulator
+):
+    """Test the connection is closed when the setup fails after connecting."""
+    config_entry = _entry_for(simulator)
+    config_entry.add_to_hass(hass)
+    with patch(
+        "homeassistant.config_entries.ConfigEntries.async_forward_entry_setups",
+        side_effect=RuntimeError("platform failed"),
+    ):
+        assert not await hass.config_entries.async_setup(config_entry.entry_id)
+    assert config_entry.state is ConfigEntryState.SETUP_ERROR
+    assert "test" not in hass.data[DOMAIN][ENTRY_DATA]
+
+    async_fire_time_changed(hass, dt_util.utcnow() + RELEASE_DELAY)
+    await hass.async_block_till_done()
+    for _ in range(50):
+        if not simulator._writers:
+            break
+        await asyncio.sleep(0.01)
+    assert not simulator._writers
@@ -0,0 +1,259 @@
+"""Tests for the savantaudio media players."""
+from copy import deepcopy
+from datetime import timedelta
+from unittest.mock import patch
+
+from homeassistant.components.media_player import (
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+    DOMAIN as MP_DOMAIN,
+)
+from homeassistant.const import (
+    ATTR_ENTITY_ID,
+    CONF_ENABLED,
+    CONF_HOST,
+    CONF_NAME,
+    CONF_PORT,
+    SERVICE_TURN_ON,
+    SERVICE_VOLUME_MUTE,
+    SERVICE_VOLUME_SET,
+    STATE_OFF,
+    STATE_ON,
+    STATE_UNAVAILABLE,
+)
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
+
+from custom_components.savantaudio.const import (
+    CONF_COMMAND_TIMEOUT,
+    CONF_REFRESH_TIMEOUT,
+    CONF_ZONES,
+    CONFIRM_TIMEOUT,
+    DOMAIN,
+    ENTRY_DATA,
+)
+from custom_components.savantaudio.exceptions import SavantAudioTimeoutError
+
+from .const import MOCK_ENTRY_CONFIG
+
+
+async def _setup_entry(hass):
+    config_entry = MockConfigEntry(
+        domain=DOMAIN, data=MOCK_ENTRY_CONFIG, entry_id="test", unique_id="sn=12345"
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return config_entry
+
+
+async def test_options_are_applied_without_reload(
+    hass, enable_custom_integrations, mock_switch
+):
+    """Test renaming and toggling zones keeps the other zones running."""
+    config_entry = await _setup_entry(hass)
+    family_room = hass.data[DOMAIN]["entry_data"]["test"].zones[12]
+    mock_switch.reset_mock()
+
+    zones = deepcopy(MOCK_ENTRY_CONFIG[CONF_ZONES])
+    zones["savant_living_room"][CONF_ENABLED] = False
+    zones["savant_family_room"][CONF_NAME] = "Den"
+    zones["savant_kitchen"] = {"number": 13, CONF_NAME: "Kitchen", CONF_ENABLED: True}
+    hass.config_entries.async_update_entry(config_entry, options={CONF_ZONES: zones})
+    await hass.async_block_till_done()
+
+    entry_data = hass.data[DOMAIN]["entry_data"]["test"]
+    assert set(entry_data.zones) == {12, 13}
+    assert entry_data.zones[12] is family_room
+    assert hass.states.get("media_player.savant_family_room").name == "Den"
+    assert hass.states.get("media_player.savant_kitchen") is not None
+    assert er.async_get(hass).async_get("media_player.savant_living_room") is None
+    mock_switch.assert_not_awaited()
+
+
+async def test_optimistic_state_is_confirmed_or_rolled_back(
+    hass, enable_custom_integrations, mock_switch
+):
+    """Test commands show up at once and are rolled back without a reply."""
+    await _setup_entry(hass)
+    entity_id = "media_player.savant_living_room"
+    assert hass.states.get(entity_id).state == STATE_OFF
+
+    # the switch does not answer: the zone turns on, then rolls back
+    await hass.services.async_call(
+        MP_DOMAIN, SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    assert hass.states.get(entity_id).state == STATE_ON
+    async_fire_time_changed(hass, dt_util.utcnow() + CONFIRM_TIMEOUT + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_OFF
+
+    # the switch confirms the link: the state sticks
+    zone = hass.data[DOMAIN]["entry_data"]["test"].zones[11]
+
+    async def _reply(command):
+        await zone.switch.parse("switch11.5")
+
+    mock_switch.side_effect = _reply
+    await hass.services.async_call(
+        MP_DOMAIN, SERVICE_TURN_ON, {ATTR_ENTITY_ID: entity_id}, blocking=True
+    )
+    async_fire_time_changed(hass, dt_util.utcnow() + CONFIRM_TIMEOUT + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    assert hass.states.get(entity_id).state == STATE_ON
+    assert hass.states.get(entity_id).attributes["source"] == "Sonos"
+
+
+async def test_rollback_only_drops_the_values_of_its_command(
+    hass, enable_custom_integrations, mock_switch
+):
+    """Test a command that is not confirmed leaves the values of others alone."""
+    await _setup_entry(hass)
+    entity_id = "media_player.savant_living_room"
+    zone = hass.data[DOMAIN]["entry_data"]["test"].zones[11]
+
+    with patch(
+        "custom_components.savantaudio.media_player.CONFIRM_TIMEOUT", timedelta(seconds=1)
+    ):
+        zone.async_expect(volume=-10, mute=True)
+    # a later command sets the mute again, and the source
+    zone.async_expect(mute=True, source=5)
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=2))
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.attributes.get(ATTR_MEDIA_VOLUME_LEVEL) != 28 / 38
+    assert state.attributes[ATTR_MEDIA_VOLUME_MUTED] is True
+    assert state.attributes["source"] == "Sonos"
+
+    async_fire_time_changed(hass, dt_util.utcnow() + CONFIRM_TIMEOUT + timedelta(seconds=1))
+    await hass.async_block_till_done()
+    state = hass.states.get(entity_id)
+    assert state.state == STATE_OFF
+    assert state.attributes.get(ATTR_MEDIA_VOLUME_MUTED) is not True
+
+
+async def test_setup_from_cache_when_switch_is_offline(
+    hass, enable_custom_integrations, hass_storage
+):
+    """Test the zones are created from the cache while the switch is down."""
+    hass_storage[f"{DOMAIN}.test"] = {
+        "version": 1,
+        "key": f"{DOMAIN}.test",
+        "data": {
+            "attributes": {"sn": "sn=12345", "fwrev": "1.0", "rev": "rev=A"},
+            "model": "SSA-3220D",
+            "links": {"11": 5},
+            "outputs": {
+                "11": {"volume": -10, "mute": False, "stereo": True, "passthru": False, "delay": [0, 0]}
+            },
+        },
+    }
+    with patch(
+        "custom_components.savantaudio.transport.SwitchTransport.connect",
+        side_effect=OSError("switch offline"),
+    ) as connect:
+        await _setup_entry(hass)
+        connect.assert_awaited()
+
+    # the zones exist with their cached state, marked unavailable
+    entry = er.async_get(hass).async_get("media_player.savant_living_room")
+    assert entry.unique_id == "sn=12345_11"
+    assert hass.states.get("media_player.savant_living_room").state == STATE_UNAVAILABLE
+    zone = hass.data[DOMAIN][ENTRY_DATA]["test"].zones[11]
+    assert zone.source == "Sonos"
+    coordinator = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator
+    assert coordinator.last_update_success is False
+    assert "switch offline" in str(coordinator.last_exception)
+    await hass.config_entries.async_unload("test")
+    await hass.async_block_till_done()
+
+
+async def test_hung_switch_times_out(hass, enable_custom_integrations, simulator):
+    """Test a command to a switch that stopped answering fails with a timeout."""
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: simulator.host, CONF_PORT: simulator.port},
+        options={CONF_COMMAND_TIMEOUT: 0.2},
+        entry_id="test",
+        unique_id="sn=000123",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    switch = hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator.switch
+
+    simulator.hang = True
+    with pytest.raises(SavantAudioTimeoutError):
+        await hass.services.async_call(
+            MP_DOMAIN,
+            SERVICE_TURN_ON,
+            {ATTR_ENTITY_ID: "media_player.savant_living_room"},
+            blocking=True,
+        )
+    assert hass.states.get("media_player.savant_living_room").state == STATE_OFF
+    assert switch.metrics.timeouts["link"] == 1
+    # one command that timed out does not cost the connection
+    assert switch.transport.writer is not None
+    assert switch.transport.in_flight == 0
+
+    simulator.hang = False
+    await hass.services.async_call(
+        MP_DOMAIN,
+        SERVICE_TURN_ON,
+        {ATTR_ENTITY_ID: "media_player.savant_living_room"},
+        blocking=True,
+    )
+    assert hass.states.get("media_player.savant_living_room").state == STATE_ON
+
+
+async def test_coalesced_writes_time_out(hass, enable_custom_integrations, simulator):
+    """Test volume and mute calls wait for their write and report its timeout."""
+    simulator.links[11] = 5
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, CONF_HOST: simulator.host, CONF_PORT: simulator.port},
+        options={CONF_COMMAND_TIMEOUT: 0.2, CONF_REFRESH_TIMEOUT: 0.5},
+        entry_id="test",
+        unique_id="sn=000123",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    entity_id = "media_player.savant_living_room"
+
+    await hass.services.async_call(
+        MP_DOMAIN,
+        SERVICE_VOLUME_SET,
+        {ATTR_ENTITY_ID: entity_id, ATTR_MEDIA_VOLUME_LEVEL: 0.5},
+        blocking=True,
+    )
+    # the call returns once the switch confirmed the write
+    assert simulator.outputs[11].volume == -19
+
+    simulator.hang = True
+    # the resyncs after the rollbacks time out too; the connection is kept
+    # through them so both calls reach the switch
+    with patch("custom_components.savantaudio.transport.MAX_MISSED_REPLIES", 10):
+        with pytest.raises(SavantAudioTimeoutError):
+            await hass.services.async_call(
+                MP_DOMAIN,
+                SERVICE_VOLUME_SET,
+                {ATTR_ENTITY_ID: entity_id, ATTR_MEDIA_VOLUME_LEVEL: 1.0},
+                blocking=True,
+            )
+        assert hass.states.get(entity_id).attributes[ATTR_MEDIA_VOLUME_LEVEL] == 19 / 38
+        with pytest.raises(SavantAudioTimeoutError):
+            await hass.services.async_call(
+                MP_DOMAIN,
+                SERVICE_VOLUME_MUTE,
+                {ATTR_ENTITY_ID: entity_id, ATTR_MEDIA_VOLUME_MUTED: True},
+                blocking=True,
+            )
+        assert hass.states.get(entity_id).attributes[ATTR_MEDIA_VOLUME_MUTED] is False
+        await hass.async_block_till_done()
@@ -0,0 +1,58 @@
+"""Tests for the savantaudio command metrics."""
+import pytest
+
+from custom_components.savantaudio.metrics import (
+    GET_LINK,
+    LINK,
+    OTHER,
+    REFRESH,
+    SET_VOLUME,
+    UNLINK,
+    LatencyHistogram,
+    SwitchMetrics,
+    command_operation,
+)
+
+
+@pytest.mark.parametrize(
+    ("command", "operation"),
+    [
+        ("switch-set3.5", LINK),
+        ("switch-set3.disconnect", UNLINK),
+        ("switch-get3", GET_LINK),
+        ("aoutput-vol-set3:-10dB", SET_VOLUME),
+        ("aoutput-mono-get3", REFRESH),
+        ("fwrev", REFRESH),
+        ("bogus", OTHER),
+    ],
+)
+def test_command_operation(command, operation):
+    """Test commands are counted under the operation they implement."""
+    assert command_operation(command) == operation
+
+
+def test_latency_histogram():
+    """Test the histogram buckets and summarizes samples."""
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) is None
+    for seconds in (0.0005, 0.003, 0.003, 0.004, 0.150):
+        histogram.record(seconds)
+    assert histogram.count == 5
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(99) == 200
+    assert histogram.max == pytest.approx(150)
+    assert histogram.as_dict()["buckets"]["<=5ms"] == 3
+
+
+def test_measure_counts_errors_and_queue_depth():
+    """Test failed operations are counted but not timed."""
+    metrics = SwitchMetrics()
+    with metrics.measure(LINK):
+        with metrics.measure(LINK):
+            assert metrics.pending == 2
+    with pytest.raises(OSError), metrics.measure(UNLINK):
+        raise OSError
+    assert metrics.latency[LINK].count == 2
+    assert UNLINK not in metrics.latency
+    assert metrics.errors == {UNLINK: 1}
+    assert (metrics.pending, metrics.max_pending) == (0, 2)
@@ -0,0 +1,138 @@
+"""Test routing across cascaded switches."""
+from homeassistant.components.media_player import ATTR_GROUP_MEMBERS, SERVICE_JOIN
+from homeassistant.const import ATTR_ENTITY_ID, CONF_HOST, CONF_NAME, CONF_PORT
+from homeassistant.setup import async_setup_component
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.savantaudio.const import CONF_TIE_LINES, CONF_ZONES, DOMAIN
+from custom_components.savantaudio.routing import TieLine, TieLineMap, plan_route
+from custom_components.savantaudio.state import SwitchState
+
+from .const import MOCK_ENTRY_CONFIG
+from .simulator import SimulatorConfig, SwitchSimulator
+
+
+class FakeSwitch:
+    """Just enough of a switch for the planner."""
+
+    def __init__(self, port):
+        self.host = "10.0.0.1"
+        self.port = port
+        self.state = SwitchState(20)
+
+
+def _key(switch):
+    return f"{switch.host}:{switch.port}"
+
+
+def _links(plan):
+    return {
+        switch.port: [(change.number, change.source) for change in changes]
+        for switch, changes in plan.links.items()
+    }
+
+
+def test_route_over_idle_tie_lines():
+    """Test a source is carried over a chain of switches."""
+    a, b, c = FakeSwitch(1), FakeSwitch(2), FakeSwitch(3)
+    tie_lines = TieLineMap(
+        [TieLine(_key(a), 20, _key(b), 32), TieLine(_key(b), 20, _key(c), 32)]
+    )
+    plan = plan_route(tie_lines, [a, b, c], a, 5, [a, c])
+    assert plan.inputs == {a: 5, c: 32}
+    assert _links(plan) == {1: [(20, 5)], 2: [(20, 32)]}
+
+
+def test_route_prefers_tie_lines_already_carrying_the_source():
+    """Test a tie line linked to the source needs no command."""
+    a, b = FakeSwitch(1), FakeSwitch(2)
+    tie_lines = TieLineMap(
+        [TieLine(_key(a), 19, _key(b), 31), TieLine(_key(a), 20, _key(b), 32)]
+    )
+    a.state.set_link(20, 5)
+    plan = plan_route(tie_lines, [a, b], a, 5, [b])
+    assert plan.inputs == {b: 32}
+    assert plan.links == {}
+
+    # a tie line busy with another source is avoided
+    a.state.set_link(20, 6)
+    plan = plan_route(tie_lines, [a, b], a, 5, [b])
+    assert plan.inputs == {b: 31}
+    assert _links(plan) == {1: [(19, 5)]}
+
+
+def test_route_follows_the_source_upstream():
+    """Test a zone fed over a tie line groups with zones on the origin switch."""
+    a, b = FakeSwitch(1), FakeSwitch(2)
+    tie_lines = TieLineMap([TieLine(_key(a), 20, _key(b), 32)])
+    a.state.set_link(20, 5)
+    plan = plan_route(tie_lines, [a, b], b, 32, [a, b])
+    assert plan.inputs == {a: 5, b: 32}
+    assert plan.links == {}
+
+
+def test_unreachable_switch_is_left_out():
+    """Test switches without a tie line are not in the plan."""
+    a, b = FakeSwitch(1), FakeSwitch(2)
+    plan = plan_route(TieLineMap(), [a, b], a, 5, [a, b])
+    assert plan.inputs == {a: 5}
+
+
+async def test_join_across_switches(hass, enable_custom_integrations, socket_enabled):
+    """Test joining zones of two cascaded switches."""
+    async with SwitchSimulator(SimulatorConfig(serial="000001")) as upstairs, SwitchSimulator(
+        SimulatorConfig(serial="000002")
+    ) as downstairs:
+        upstairs.links[11] = 5
+        for simulator, name in ((upstairs, "Up"), (downstairs, "Down")):
+            MockConfigEntry(
+                domain=DOMAIN,
+                data={
+                    **MOCK_ENTRY_CONFIG,
+                    CONF_NAME: name,
+                    CONF_HOST: simulator.host,
+                    CONF_PORT: simulator.port,
+                    CONF_ZONES: {
+                        f"{name.lower()}_{zone_id.split('_', 1)[1]}": zone
+                        for zone_id, zone in MOCK_ENTRY_CONFIG[CONF_ZONES].items()
+                    },
+                },
+                entry_id=name,
+                unique_id=f"sn={simulator.config.serial}",
+            ).add_to_hass(hass)
+        assert await async_setup_component(
+            hass,
+            DOMAIN,
+            {
+                DOMAIN: {
+                    CONF_TIE_LINES: [
+                        {
+                            "from": {CONF_HOST: upstairs.host, CONF_PORT: upstairs.port, "output": 20},
+                            "to": {CONF_HOST: downstairs.host, CONF_PORT: downstairs.port, "input": 32},
+                        }
+                    ]
+                }
+            },
+        )
+        await hass.async_block_till_done()
+        await hass.services.async_call(
+            "media_player",
+            SERVICE_JOIN,
+            {
+                ATTR_ENTITY_ID: "media_player.up_living_room",
+                ATTR_GROUP_MEMBERS: [
+                    "media_player.up_family_room",
+                    "media_player.down_living_room",
+                    "media_player.down_family_room",
+                ],
+            },
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+
+        assert upstairs.links == {11: 5, 12: 5, 20: 5}
+        assert downstairs.links == {11: 32, 12: 32}
+        assert hass.states.get("media_player.down_living_room").state == "on"
+
+        for entry in hass.config_entries.async_entries(DOMAIN):
+            assert await hass.config_entries.async_unload(entry.entry_id)
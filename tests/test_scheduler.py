@@ -0,0 +1,127 @@
+"""Test the command scheduler."""
+import asyncio
+import time
+
+import pytest
+
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.scheduler import (
+    CommandDropped,
+    CommandScheduler,
+    Priority,
+    use_priority,
+)
+
+from .simulator import SimulatorConfig, SwitchSimulator
+
+
+async def test_most_urgent_waiter_goes_first():
+    """Test queued holders are served by priority, then in order."""
+    scheduler = CommandScheduler(rate=1000, burst=100)
+    order = []
+
+    async def hold(name, priority):
+        async with scheduler.async_slot(priority=priority):
+            order.append(name)
+            await asyncio.sleep(0)
+
+    async with scheduler.async_slot():
+        tasks = [
+            asyncio.create_task(hold("sweep 1", Priority.BACKGROUND)),
+            asyncio.create_task(hold("automation", Priority.AUTOMATION)),
+            asyncio.create_task(hold("sweep 2", Priority.BACKGROUND)),
+            asyncio.create_task(hold("user", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.waiting == {"interactive": 1, "automation": 1, "background": 2}
+    await asyncio.gather(*tasks)
+
+    assert order == ["user", "automation", "sweep 1", "sweep 2"]
+
+
+async def test_priority_follows_the_context():
+    """Test the priority is taken from the calling task."""
+    scheduler = CommandScheduler()
+    order = []
+
+    async def hold(name):
+        async with scheduler.async_slot():
+            order.append(name)
+
+    async with scheduler.async_slot():
+        with use_priority(Priority.BACKGROUND):
+            background = asyncio.create_task(hold("background"))
+        interactive = asyncio.create_task(hold("interactive"))
+        await asyncio.sleep(0)
+    await asyncio.gather(background, interactive)
+
+    assert order == ["interactive", "background"]
+
+
+async def test_rate_is_limited():
+    """Test commands beyond the burst wait for tokens."""
+    scheduler = CommandScheduler(rate=100, burst=10)
+    start = time.monotonic()
+    async with scheduler.async_slot(10):
+        pass
+    assert time.monotonic() - start < 0.05
+    async with scheduler.async_slot(5):
+        pass
+    assert time.monotonic() - start >= 0.04
+
+
+async def test_background_waits_behind_interactive_when_throttled():
+    """Test a user command goes before a sweep once the bucket is empty."""
+    scheduler = CommandScheduler(rate=100, burst=10)
+    start = time.monotonic()
+    served = {}
+
+    async def hold(name, cost, priority):
+        async with scheduler.async_slot(cost, priority):
+            served[name] = time.monotonic() - start
+
+    # the first chunk of a sweep empties the bucket
+    async with scheduler.async_slot(10, Priority.BACKGROUND):
+        sweep = asyncio.create_task(hold("sweep", 10, Priority.BACKGROUND))
+        user = asyncio.create_task(hold("user", 1, Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+    await asyncio.gather(sweep, user)
+
+    assert list(served) == ["user", "sweep"]
+    # the user command waits for one token, the sweep for ten more
+    assert served["user"] < 0.05
+    assert served["sweep"] >= 0.1
+
+
+async def test_background_work_is_dropped():
+    """Test queued background holders can be dropped."""
+    scheduler = CommandScheduler()
+
+    async def hold(priority):
+        async with scheduler.async_slot(priority=priority):
+            pass
+
+    async with scheduler.async_slot():
+        background = asyncio.create_task(hold(Priority.BACKGROUND))
+        interactive = asyncio.create_task(hold(Priority.INTERACTIVE))
+        await asyncio.sleep(0)
+        assert scheduler.async_drop(Priority.BACKGROUND) == 1
+    await interactive
+    with pytest.raises(CommandDropped):
+        await background
+
+
+async def test_user_command_overtakes_sweep(socket_enabled):
+    """Test a user command gets in between the chunks of a sweep."""
+    async with SwitchSimulator(SimulatorConfig(latency=0.002)) as simulator:
+        switch = SavantSwitch(simulator.host, simulator.port)
+        sweep = asyncio.create_task(switch.async_read_snapshot())
+        await asyncio.sleep(0.01)
+        await switch.link(11, 5)
+        assert not sweep.done()
+        await sweep
+        await switch.async_close()
+
+    assert switch.state.source(11) == 5
+    link = simulator.commands.index("switch-set11.5")
+    assert link < len(simulator.commands) - 20
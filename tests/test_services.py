@@ -0,0 +1,116 @@
+"""Test the savantaudio services."""
+from homeassistant.components.media_player import DOMAIN as MP_DOMAIN
+from homeassistant.const import ATTR_ENTITY_ID, ATTR_NAME
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.savantaudio.const import (
+    DOMAIN,
+    ENTRY_DATA,
+    KNOWN_ZONES,
+    SERVICE_RESTORE,
+    SERVICE_SNAPSHOT,
+)
+
+from .const import MOCK_ENTRY_CONFIG
+
+LIVING_ROOM = "media_player.savant_living_room"
+FAMILY_ROOM = "media_player.savant_family_room"
+
+
+async def _setup_entry(hass, simulator):
+    config_entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={**MOCK_ENTRY_CONFIG, "host": simulator.host, "port": simulator.port},
+        entry_id="test",
+        unique_id="sn=000123",
+    )
+    config_entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(config_entry.entry_id)
+    await hass.async_block_till_done()
+    return config_entry
+
+
+async def test_snapshot_and_restore(hass, enable_custom_integrations, simulator, hass_storage):
+    """Test a preset is stored and only the differences are restored."""
+    simulator.links[11] = 5
+    simulator.outputs[11].volume = -10
+    await _setup_entry(hass, simulator)
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SNAPSHOT,
+        {ATTR_NAME: "dinner", ATTR_ENTITY_ID: [LIVING_ROOM, FAMILY_ROOM]},
+        blocking=True,
+    )
+    preset = hass_storage[f"{DOMAIN}.presets"]["data"]["presets"]["dinner"]
+    assert preset[LIVING_ROOM]["source"] == 5
+    assert preset[LIVING_ROOM]["volume"] == -10
+    assert preset[FAMILY_ROOM]["source"] is None
+
+    # another controller changes the living room
+    simulator.push_link(11, 6)
+    simulator.push_output(11, volume=-20)
+    await hass.data[DOMAIN][ENTRY_DATA]["test"].coordinator.async_refresh()
+    await hass.async_block_till_done()
+    assert hass.states.get(LIVING_ROOM).attributes["source"] == "Record Player"
+
+    simulator.reset_stats()
+    await hass.services.async_call(
+        DOMAIN, SERVICE_RESTORE, {ATTR_NAME: "dinner"}, blocking=True
+    )
+    await hass.async_block_till_done()
+
+    assert simulator.commands == ["switch-set11.5", "aoutput-vol-set11:-10dB"]
+    assert simulator.links == {11: 5}
+    state = hass.states.get(LIVING_ROOM)
+    assert state.attributes["source"] == "Sonos"
+    assert state.attributes["volume_level"] == pytest.approx(28 / 38)
+
+    # nothing differs any more
+    simulator.reset_stats()
+    await hass.services.async_call(
+        DOMAIN, SERVICE_RESTORE, {ATTR_NAME: "dinner"}, blocking=True
+    )
+    assert simulator.commands == []
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN, SERVICE_RESTORE, {ATTR_NAME: "unknown"}, blocking=True
+        )
+
+
+async def test_renamed_zones_are_found(hass, enable_custom_integrations, simulator, hass_storage):
+    """Test services find zones by the entity id the user gave them."""
+    entity_registry = er.async_get(hass)
+    entity_registry.async_get_or_create(
+        MP_DOMAIN, DOMAIN, "sn=000123_11", suggested_object_id="lounge"
+    )
+    config_entry = await _setup_entry(hass, simulator)
+    assert hass.states.get("media_player.lounge") is not None
+
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SNAPSHOT,
+        {ATTR_NAME: "dinner", ATTR_ENTITY_ID: ["media_player.lounge"]},
+        blocking=True,
+    )
+    assert "media_player.lounge" in hass_storage[f"{DOMAIN}.presets"]["data"]["presets"]["dinner"]
+
+    # renamed while running
+    entity_registry.async_update_entity("media_player.lounge", new_entity_id="media_player.den")
+    await hass.async_block_till_done()
+    known_zones = hass.data[DOMAIN][KNOWN_ZONES]
+    assert "media_player.lounge" not in known_zones
+    assert known_zones["media_player.den"].number == 11
+    await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SNAPSHOT,
+        {ATTR_NAME: "dinner", ATTR_ENTITY_ID: ["media_player.den"]},
+        blocking=True,
+    )
+
+    assert await hass.config_entries.async_unload(config_entry.entry_id)
+    assert known_zones == {}
@@ -0,0 +1,36 @@
+"""Tests for the savantaudio state store."""
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.state import OutputState, SwitchState
+
+
+def test_only_real_changes_are_flagged():
+    """Test the change bits are only set when a field moves."""
+    state = SwitchState(20)
+    assert state.output(4) == OutputState(0, False, True, False, (0, 0))
+
+    assert not state.set_output(4, OutputState(0, False, True, False, (0, 0)))
+    assert not state.pop_change(4)
+
+    assert state.set_output(4, OutputState(-12, True, True, False, (0, 0)))
+    assert state.set_link(7, 3)
+    assert not state.set_link(7, 3)
+    assert state.pop_change(4)
+    assert not state.pop_change(4)
+    assert state.pop_change(7)
+    assert state.changed == 0
+
+    assert state.set_link(7, None)
+    assert state.source(7) is None
+    assert state.links == {}
+
+
+async def test_switch_replies_update_the_store():
+    """Test solicited and unsolicited replies land in the store."""
+    switch = SavantSwitch("localhost", 8085)
+    await switch.parse("switch3.5")
+    await switch.parse("aoutput-vol3:-10dB")
+    await switch.parse("aoutput-delayleft3:12ms")
+
+    assert switch.state.links == {3: 5}
+    assert switch.state.output(3) == OutputState(-10, False, True, False, (12, 0))
+    assert switch.state.changed == 1 << 3
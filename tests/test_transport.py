@@ -0,0 +1,222 @@
+"""Tests for the pipelined switch transport."""
+import asyncio
+
+import pytest
+
+from custom_components.savantaudio.client import SavantSwitch
+from custom_components.savantaudio.const import MAX_MISSED_REPLIES
+from custom_components.savantaudio.transport import SwitchTransport, reply_prefixes
+
+from .simulator import SimulatorConfig, SwitchSimulator
+
+
+def test_reply_prefixes():
+    """Test replies are expected by command kind and port number."""
+    assert reply_prefixes("switch-set3.5") == ("switch3.",)
+    assert reply_prefixes("aoutput-vol-set12:-10dB") == ("aoutput-vol12:",)
+    assert reply_prefixes("aoutput-delayboth-get2") == (
+        "aoutput-delayleft2:",
+        "aoutput-delayright2:",
+    )
+    assert reply_prefixes("status") == ("status",)
+
+
+async def test_replies_are_told_apart_from_notifications(socket_enabled):
+    """Test commands are pipelined and pushed lines are not taken as replies."""
+    received = []
+
+    async def handle(reader, writer):
+        received.append(await reader.readuntil(b"aoutput-vol-get4\r\n"))
+        # a notification arrives before and between the replies
+        writer.write(
+            b"switch7.2\r\n"
+            b"switch3.5\r\n\r\n"
+            b"aoutput-mute9:on\r\n"
+            b"aoutput-vol4:-10dB\r\n\r\n"
+        )
+        await writer.drain()
+
+    lines = []
+
+    async def on_line(line, push):
+        lines.append((line, push))
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    transport = SwitchTransport("127.0.0.1", server.sockets[0].getsockname()[1], on_line)
+    try:
+        replies = await asyncio.gather(
+            transport.async_request(["switch-get3"]),
+            transport.async_request(["aoutput-vol-get4"]),
+        )
+    finally:
+        await transport.close()
+        server.close()
+
+    # the second command was written before the first was answered
+    assert received == [b"switch-get3\r\naoutput-vol-get4\r\n"]
+    assert replies == [[["switch3.5"]], [["aoutput-vol4:-10dB"]]]
+    assert lines == [
+        ("switch7.2", True),
+        ("switch3.5", False),
+        ("aoutput-mute9:on", True),
+        ("aoutput-vol4:-10dB", False),
+    ]
+    assert transport.pushes == 2
+
+
+async def test_terminated_notification_does_not_end_a_reply(socket_enabled):
+    """Test a notification followed by an empty line is not taken as a reply."""
+    config = SimulatorConfig(latency=0.05, terminate_pushes=True)
+    async with SwitchSimulator(config) as simulator:
+        lines = []
+
+        async def on_line(line, push):
+            lines.append((line, push))
+
+        transport = SwitchTransport(simulator.host, simulator.port, on_line)
+        try:
+            request = asyncio.ensure_future(
+                transport.async_request(["status", "aoutput-vol-get1"])
+            )
+            await asyncio.sleep(0.02)
+            # pushed while the status command is waiting for its reply
+            simulator.push_link(3, 5)
+            replies = await request
+        finally:
+            await transport.close()
+
+    assert replies[0][0].startswith("statusAPI1.0;")
+    assert replies[1] == ["aoutput-vol1:-20dB"]
+    assert lines[0] == ("switch3.5", True)
+    assert [push for _, push in lines[1:]] == [False, False]
+    assert transport.pushes == 1
+
+
+async def test_commands_in_flight_fail_when_the_connection_drops(socket_enabled):
+    """Test a dropped connection fails every outstanding command."""
+
+    async def handle(reader, writer):
+        await reader.readline()
+        writer.close()
+
+    async def on_line(line, push):
+        pass
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    transport = SwitchTransport("127.0.0.1", server.sockets[0].getsockname()[1], on_line)
+    try:
+        with pytest.raises(ConnectionResetError):
+            await transport.async_request(["switch-get1", "switch-get2"])
+        assert transport.in_flight == 0
+        assert transport.writer is None
+    finally:
+        server.close()
+
+
+async def test_timed_out_command_leaves_the_connection_alone(socket_enabled):
+    """Test a command past its deadline fails alone and its late reply is stale."""
+
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            number = line.decode().strip().removeprefix("switch-get")
+            if number == "1":
+                await asyncio.sleep(0.2)
+            writer.write(f"switch{number}.5\r\n\r\n".encode())
+            await writer.drain()
+
+    lines = []
+
+    async def on_line(line, push):
+        lines.append((line, push))
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    transport = SwitchTransport("127.0.0.1", server.sockets[0].getsockname()[1], on_line)
+    try:
+        with pytest.raises(TimeoutError):
+            await (await transport.async_write(["switch-get1"], 0.05))
+        assert transport.in_flight == 0
+        assert transport.writer is not None
+
+        # written before the late reply arrives, answered after it
+        replies = await transport.async_request(["switch-get2"])
+    finally:
+        await transport.close()
+        server.close()
+
+    assert replies == [["switch2.5"]]
+    assert lines == [("switch1.5", False), ("switch2.5", False)]
+    assert transport.pushes == 0
+
+
+async def test_connection_is_dropped_after_repeated_timeouts(socket_enabled):
+    """Test a switch that stopped answering loses its connection."""
+
+    async def handle(reader, writer):
+        while await reader.readline():
+            pass
+
+    async def on_line(line, push):
+        pass
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    transport = SwitchTransport("127.0.0.1", server.sockets[0].getsockname()[1], on_line)
+    try:
+        await transport.connect()
+        for attempt in range(MAX_MISSED_REPLIES):
+            assert transport.writer is not None
+            with pytest.raises(TimeoutError):
+                await (await transport.async_write([f"switch-get{attempt + 1}"], 0.01))
+        assert transport.writer is None
+    finally:
+        await transport.close()
+        server.close()
+
+
+async def test_dropped_connection_is_reported_and_not_reopened(socket_enabled):
+    """Test a write to a connection the switch closed fails until connect is called."""
+
+    async def on_line(line, push):
+        pass
+
+    async with SwitchSimulator() as simulator:
+        transport = SwitchTransport(simulator.host, simulator.port, on_line)
+        lost = asyncio.Event()
+        transport.add_disconnect_listener(lambda err: lost.set())
+        try:
+            assert await transport.async_request(["switch-get1"]) == [["switch1.0"]]
+            simulator.drop_connections()
+            await asyncio.wait_for(lost.wait(), 1)
+
+            with pytest.raises(ConnectionError):
+                await transport.async_write(["switch-get1"])
+            assert simulator.connections == 1
+
+            await transport.connect()
+            assert await transport.async_request(["switch-get1"]) == [["switch1.0"]]
+        finally:
+            await transport.close()
+
+
+async def test_notifications_are_read_while_idle(socket_enabled):
+    """Test changes pushed by the switch arrive without sending a command."""
+    async with SwitchSimulator() as simulator:
+        switch = SavantSwitch(simulator.host, simulator.port)
+        await switch.connect()
+        events = []
+
+        async def callback(event, obj):
+            events.append(event)
+
+        switch.add_callback(callback)
+        simulator.push_link(3, 7)
+        simulator.push_output(3, volume=-12)
+        for _ in range(50):
+            if len(events) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await switch.async_close()
+
+    assert events == ["link-changed", "output-updated"]
+    assert switch.state.source(3) == 7
+    assert switch.state.volume[3] == -12
+    assert switch.attributes["sn"] == "sn=000123"